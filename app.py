@@ -1,191 +1,186 @@
 """
 CIHI Mental Health Dashboard
 Main application entry point - modular version with enhanced sidebar
+
+create_app(config) builds the Dash app; python app.py runs it on the
+development server with debug tooling, and wsgi.py serves it with gunicorn.
 """
 
 import dash
+import flask
 from dash import dcc, html, callback, Input, Output
+import logging
 import sys
 
+# Set up logging before anything else logs. It is synchronous until the
+# process is about to serve: gunicorn's master imports this module and forks
+# its workers, which start the background writer in post_fork
+from utils.logging_config import configure_logging
+configure_logging(background=False)
+
 # Import our modular components
-from utils.config import STYLE_CONTENT, STYLE_NAV_BUTTON_BASE, STYLE_NAV_BUTTON_ACTIVE, COLORS
-from utils.data_loader import load_table3_data, load_table4_data, load_table10_data, load_table11_data, load_table12_data, load_table13_data, combine_mental_health_other_data
-from components.sidebar import create_sidebar
+from utils import config as app_config
+from utils.config import STYLE_CONTENT, APP_SETTINGS
+from utils.data_registry import registry, current_snapshot
+from utils.warmup import start_warmup, warm_figure_cache, warmup_status
+from utils.figure_cache import configure_json_engine
+from utils.layout_cache import layout_cache
+from utils.response_cache import install_response_cache, skip_response_cache
+from utils.result_store import result_store
+from utils.single_flight import single_flight
+from components.sidebar import create_sidebar, register_callbacks as sidebar_callbacks
 # Import page modules directly to avoid circular imports
 from components.pages.provincial_overview import create_layout as provincial_layout, register_callbacks as provincial_callbacks
 from components.pages.demographics import create_layout as demographics_layout, register_callbacks as demographics_callbacks
 from components.pages.health_equity import create_layout as health_equity_layout, register_callbacks as health_equity_callbacks
 from components.pages.clinical_patterns import create_layout as clinical_patterns_layout, register_callbacks as clinical_patterns_callbacks
 
-# Initialize the Dash app
-app = dash.Dash(__name__, suppress_callback_exceptions=True)
-app.title = "CIHI Mental Health Dashboard"
-
-# Load data on startup
-print("=" * 60)
-print("🚀 STARTING CIHI MENTAL HEALTH DASHBOARD")
-print("=" * 60)
-print("Loading CIHI Mental Health Data...")
+logger = logging.getLogger(__name__)
 
 # Test basic functionality first
 try:
-    print("🔧 Testing basic imports...")
+    logger.info("🔧 Testing basic imports...")
     import pandas as pd
-    import plotly.express as px
-    print("✅ All imports successful")
+    logger.info("✅ All imports successful")
 except Exception as e:
-    print(f"❌ Import error: {e}")
+    logger.critical("❌ Import error: %s", e)
     sys.exit(1)
 
-# Load data
-TABLE3_DF = load_table3_data()
-TABLE4_DF = load_table4_data()
-TABLE10_DF = load_table10_data()
-TABLE11_DF = load_table11_data()
-TABLE12_DF = load_table12_data()
-TABLE13_DF = load_table13_data()
-
-if not TABLE3_DF.empty:
-    print(f"✅ Loaded Table 3: {len(TABLE3_DF)} records")
-    print(f"✅ Provinces available: {sorted(TABLE3_DF['Province'].unique())}")
-else:
-    print("⚠️ WARNING: Table 3 data not loaded")
-
-if not TABLE4_DF.empty:
-    print(f"✅ Loaded Table 4: {len(TABLE4_DF)} records")
-else:
-    print("⚠️ WARNING: Table 4 data not loaded")
-
-if not TABLE10_DF.empty:
-    print(f"✅ Loaded Table 10: {len(TABLE10_DF)} records")
-    print(f"✅ Age groups available: {sorted(TABLE10_DF['Age_Group'].unique())}")
-else:
-    print("⚠️ WARNING: Table 10 data not loaded")
-
-if not TABLE11_DF.empty:
-    print(f"✅ Loaded Table 11: {len(TABLE11_DF)} records")
-    print(f"✅ Residence types available: {sorted(TABLE11_DF['Residence_Type'].unique())}")
-else:
-    print("⚠️ WARNING: Table 11 data not loaded")
-
-if not TABLE12_DF.empty:
-    print(f"✅ Loaded Table 12: {len(TABLE12_DF)} records")
-    print(f"✅ Income quintiles available: {sorted(TABLE12_DF['Income_Quintile'].unique())}")
-if not TABLE13_DF.empty:
-    print(f"✅ Loaded Table 13: {len(TABLE13_DF)} records")
-    print(f"✅ Diagnoses available: {sorted(TABLE13_DF['Diagnosis'].unique())}")
-else:
-    print("⚠️ WARNING: Table 13 data not loaded")
-
-# Combine datasets for comparison
-COMBINED_DF = combine_mental_health_other_data(TABLE3_DF, TABLE4_DF)
-if not COMBINED_DF.empty:
-    print(f"✅ Combined dataset created: {len(COMBINED_DF)} records")
-else:
-    print("⚠️ WARNING: Combined dataset not created")
-
-print("=" * 60)
-
-# Main app layout with enhanced sidebar
-app.layout = html.Div([
-    dcc.Location(id='url', refresh=False),
-    
-    # Enhanced sidebar navigation
-    create_sidebar(),
-    
-    # Main content area with updated margin
-    html.Div(id='page-content', style=STYLE_CONTENT)
-])
-
-# Register callbacks for all pages
-provincial_callbacks(app, TABLE3_DF, COMBINED_DF)
-demographics_callbacks(app, TABLE10_DF)
-health_equity_callbacks(app, TABLE11_DF, TABLE12_DF)
-clinical_patterns_callbacks(app, TABLE13_DF)
-
-# Main page routing callback
-@app.callback(
-    Output('page-content', 'children'),
-    [Input('url', 'pathname')]
-)
-def display_page(pathname):
-    """Update page content based on URL path"""
-    if pathname == '/demographics':
-        return demographics_layout(TABLE10_DF)
-    elif pathname == '/equity':
-        return health_equity_layout(TABLE11_DF, TABLE12_DF)
-    elif pathname == '/clinical':
-        return clinical_patterns_layout(TABLE13_DF)
-    else:  # Default to provincial overview
-        return provincial_layout(TABLE3_DF, COMBINED_DF)
-
-# Enhanced navigation highlighting callback
-@app.callback(
-    [Output('nav-provincial', 'children'),
-     Output('nav-demographics', 'children'),
-     Output('nav-equity', 'children'),
-     Output('nav-clinical', 'children')],
-    [Input('url', 'pathname')]
-)
-def update_nav_styles(pathname):
-    """Update navigation button styles based on active page"""
-    
-    def create_nav_item(icon_class, text, is_active=False):
-        """Helper function to create navigation item with proper styling"""
-        style = STYLE_NAV_BUTTON_ACTIVE if is_active else STYLE_NAV_BUTTON_BASE
+# Page layouts by path, each built from the tables of one snapshot
+PAGE_LAYOUTS = {
+    '/': lambda snapshot: provincial_layout(snapshot.get('table3'), snapshot.get('combined')),
+    '/demographics': lambda snapshot: demographics_layout(snapshot.get('table10')),
+    '/equity': lambda snapshot: health_equity_layout(snapshot.get('table11'), snapshot.get('table12')),
+    '/clinical': lambda snapshot: clinical_patterns_layout(snapshot.get('table13'))
+}
+# Tables each page is built from
+PAGE_TABLES = {
+    '/': ['table3', 'combined'],
+    '/demographics': ['table10'],
+    '/equity': ['table11', 'table12'],
+    '/clinical': ['table13']
+}
+
+def create_app(config=None):
+    """
+    Create the dashboard's Dash app.
+
+    config maps setting names from APP_SETTINGS to values overriding
+    utils/config.py; the resolved settings are kept in app.server.config.
+    No background thread is started here: start_background_tasks(app)
+    starts the figure cache warm-up and the data watcher. Until it does,
+    /ready reports the server ready with a cold figure cache.
+    """
+    settings = {name: getattr(app_config, name) for name in APP_SETTINGS}
+    settings.update(config or {})
+
+    configure_json_engine()
+
+    # Initialize the Dash app
+    app = dash.Dash(__name__, suppress_callback_exceptions=True)
+    app.title = "CIHI Mental Health Dashboard"
+    app.server.config.update(settings)
+    install_response_cache(app.server, cache=settings['RESPONSE_CACHE_ENABLED'],
+                           compress=settings['RESPONSE_COMPRESSION_ENABLED'],
+                           store=result_store if settings['RESULT_STORE_ENABLED'] else None,
+                           flights=single_flight if settings['SINGLE_FLIGHT_ENABLED'] else None)
+
+    logger.info("=" * 60)
+    logger.info("🚀 STARTING CIHI MENTAL HEALTH DASHBOARD")
+    logger.info("=" * 60)
+
+    @app.server.route('/ready')
+    def ready():
+        """Readiness probe: 503 until the figure cache warm-up has finished"""
+        status = warmup_status()
+        return flask.jsonify(status.as_dict()), 200 if status.ready else 503
+
+    # Main app layout with enhanced sidebar
+    app.layout = html.Div([
+        dcc.Location(id='url', refresh=False),
         
-        return html.Div([
-            html.I(className=icon_class, style={
-                'fontSize': '16px',
-                'marginRight': '12px',
-                'width': '20px',
-                'textAlign': 'center'
-            }),
-            html.Span(text, style={'fontSize': '14px', 'fontWeight': '500'})
-        ], style=style)
-    
-    # Determine which page is active and style accordingly
-    if pathname == '/demographics':
-        return (
-            create_nav_item("fas fa-chart-line", "Provincial Overview", False),
-            create_nav_item("fas fa-users", "Demographics", True),
-            create_nav_item("fas fa-balance-scale", "Health Equity", False),
-            create_nav_item("fas fa-th", "Clinical Patterns", False)
-        )
-    elif pathname == '/equity':
-        return (
-            create_nav_item("fas fa-chart-line", "Provincial Overview", False),
-            create_nav_item("fas fa-users", "Demographics", False),
-            create_nav_item("fas fa-balance-scale", "Health Equity", True),
-            create_nav_item("fas fa-th", "Clinical Patterns", False)
-        )
-    elif pathname == '/clinical':
-        return (
-            create_nav_item("fas fa-chart-line", "Provincial Overview", False),
-            create_nav_item("fas fa-users", "Demographics", False),
-            create_nav_item("fas fa-balance-scale", "Health Equity", False),
-            create_nav_item("fas fa-th", "Clinical Patterns", True)
-        )
-    else:  # Provincial overview (default)
-        return (
-            create_nav_item("fas fa-chart-line", "Provincial Overview", True),
-            create_nav_item("fas fa-users", "Demographics", False),
-            create_nav_item("fas fa-balance-scale", "Health Equity", False),
-            create_nav_item("fas fa-th", "Clinical Patterns", False)
-        )
-
-# Run the app
+        # Enhanced sidebar navigation
+        create_sidebar(),
+        
+        # Main content area with updated margin
+        html.Div(id='page-content', style=STYLE_CONTENT)
+    ])
+
+    # Register callbacks for the sidebar and all pages
+    sidebar_callbacks(app)
+    provincial_callbacks(app)
+    demographics_callbacks(app)
+    health_equity_callbacks(app)
+    clinical_patterns_callbacks(app)
+
+    # Main page routing callback
+    @app.callback(
+        Output('page-content', 'children'),
+        [Input('url', 'pathname')]
+    )
+    def display_page(pathname):
+        """Update page content based on URL path"""
+        # Read every table from one snapshot so a data refresh can't mix versions
+        snapshot = current_snapshot()
+        page = pathname if pathname in PAGE_LAYOUTS else '/'  # Default to provincial overview
+        # A page showing "data not available" placeholders may be a passing failure
+        if any(snapshot.get(table_name).empty for table_name in PAGE_TABLES[page]):
+            skip_response_cache()
+        return layout_cache.get(page, snapshot, PAGE_LAYOUTS[page])
+
+    if settings['PRELOAD_DATA']:
+        # Everything loaded here is inherited by processes forked afterwards
+        if settings['WARMUP_ENABLED']:
+            warm_figure_cache()
+        else:
+            registry.load_all()
+        registry.memory_report()
+    else:
+        # Tables are loaded lazily by the data registry when a page first needs them
+        logger.info("📦 Data will be loaded on demand by the data registry")
+    if not settings['WARMUP_ENABLED']:
+        warmup_status().update(state='disabled')
+    elif not warmup_status().ready:
+        warmup_status().update(state='not-started')
+    logger.info("=" * 60)
+    return app
+
+def start_background_tasks(app):
+    """
+    Start this process's background threads: the figure cache warm-up (or
+    table prefetch) and the data file watcher.
+
+    Threads do not survive a fork, so under gunicorn each worker calls this
+    after it is forked (see gunicorn.conf.py). A warm-up already finished by
+    the factory is not repeated.
+    """
+    settings = app.server.config
+    # Delay lets the server bind and answer the first request before we compete for CPU
+    if settings['WARMUP_ENABLED']:
+        if not warmup_status().ready:
+            # Loads every table too, so it replaces the plain prefetch
+            start_warmup(delay=settings['PREFETCH_DELAY_SECONDS'])
+    elif settings['PREFETCH_DATA']:
+        registry.prefetch(delay=settings['PREFETCH_DELAY_SECONDS'])
+
+    if settings['DATA_RELOAD_ENABLED']:
+        registry.watch()
+
+# Run the app on the development server
 if __name__ == '__main__':
-    print(f"\n🚀 Starting CIHI Mental Health Dashboard...")
-    print(f"📊 Dashboard will be available at: http://localhost:8050")
-    print(f"📄 Pages: Provincial Overview, Demographics, Health Equity, Clinical Patterns")
-    print(f"🧩 Modular architecture: components, utils, pages")
-    print(f"✨ Enhanced UI: Modern sidebar with professional styling")
+    configure_logging()
+    app = create_app({'DEBUG': True})
+
+    logger.info("🚀 Starting CIHI Mental Health Dashboard...")
+    logger.info("📊 Dashboard will be available at: http://localhost:8050")
+    logger.info("📄 Pages: Provincial Overview, Demographics, Health Equity, Clinical Patterns")
+    logger.info("🧩 Modular architecture: components, utils, pages")
+    logger.info("✨ Enhanced UI: Modern sidebar with professional styling")
+    
+    start_background_tasks(app)
     
     try:
-        app.run(debug=True, dev_tools_hot_reload=False, dev_tools_ui=True)
+        app.run(debug=app.server.config['DEBUG'], dev_tools_hot_reload=False, dev_tools_ui=True)
     except Exception as e:
-        print(f"\n❌ CRITICAL ERROR starting app: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
\ No newline at end of file
+        logger.critical("❌ CRITICAL ERROR starting app: %s", e, exc_info=True)
+        sys.exit(1)
@@ -0,0 +1,58 @@
+/* CIHI Mental Health Dashboard - Clientside callbacks */
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    cihi: {
+        /* Figure for a year from a year-figures store: the base figure with
+           the year's diff applied (see utils/figure_patch.py) */
+        switchYear: function(year, store) {
+            if (!store) {
+                return window.dash_clientside.no_update;
+            }
+            var ops = store.years[year || store['default']];
+            if (!ops) {
+                return window.dash_clientside.no_update;
+            }
+            var figure = JSON.parse(JSON.stringify(store.base));
+            ops.forEach(function(op) {
+                var path = op[0];
+                var parent = figure;
+                for (var i = 0; i < path.length - 1; i++) {
+                    parent = parent[path[i]];
+                }
+                var key = path[path.length - 1];
+                if (op.length === 1) {
+                    if (Array.isArray(parent)) {
+                        parent.splice(key, 1);
+                    } else {
+                        delete parent[key];
+                    }
+                } else if (op.length === 3) {
+                    parent.splice(key, 0, JSON.parse(JSON.stringify(op[1])));
+                } else {
+                    // Copied so Plotly never mutates the store's values
+                    parent[key] = JSON.parse(JSON.stringify(op[1]));
+                }
+            });
+            return figure;
+        },
+
+        /* Same, from a store holding one year-figures store per display option */
+        switchYearVariant: function(year, variant, stores) {
+            if (!stores || !stores[variant]) {
+                return window.dash_clientside.no_update;
+            }
+            return window.dash_clientside.cihi.switchYear(year, stores[variant]);
+        },
+
+        /* className of each sidebar link for a URL path, given the links'
+           hrefs in order; unknown paths highlight the overview like the
+           page router does (see assets/style.css) */
+        navClasses: function(pathname) {
+            var hrefs = Array.prototype.slice.call(arguments, 1);
+            var active = hrefs.indexOf(pathname) === -1 ? '/' : pathname;
+            return hrefs.map(function(href) {
+                return href === active ? 'nav-link active' : 'nav-link';
+            });
+        }
+    }
+});
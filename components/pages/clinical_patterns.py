@@ -2,13 +2,29 @@
 Clinical Patterns page layout and callbacks - Updated with horizontal controls
 """
 
-from dash import html, dcc, callback, Input, Output
-import traceback
-from utils.config import COLORS, STYLE_CARD
+from dash import html, dcc, callback, Input, Output, State
+import logging
+from utils.config import COLORS, STYLE_CARD, CLINICAL_DIAGNOSES
 from utils.chart_helpers import create_placeholder_chart, create_clinical_diagnostic_heatmap
+from utils.data_registry import get_table
+from utils.figure_cache import figure_response
+from utils.response_cache import skip_response_cache
+from utils.figure_patch import figure_update
+from utils.table_index import data_version
+
+logger = logging.getLogger(__name__)
+
+def get_year_options(table13_df=None):
+    """Fiscal years available in Table 13, most recent first"""
+    if table13_df is None or table13_df.empty:
+        years = ['2023-24', '2022-23', '2021-22']
+    else:
+        years = sorted(table13_df['Year'].unique(), reverse=True)
+    return [{'label': year, 'value': year} for year in years]
 
 def create_layout(table13_df=None):
     """Create Clinical Patterns page layout with horizontal controls"""
+    year_options = get_year_options(table13_df)
     return html.Div([
         html.H2("🏥 Clinical Patterns", style={'color': COLORS['success'], 'marginBottom': '30px'}),
         
@@ -52,12 +68,8 @@ def create_layout(table13_df=None):
                     html.Label("Select Year:", style={'fontWeight': 'bold', 'marginBottom': '10px', 'display': 'block'}),
                     dcc.RadioItems(
                         id='clinical-year-selector',
-                        options=[
-                            {'label': '2023-24', 'value': '2023-24'},
-                            {'label': '2022-23', 'value': '2022-23'},
-                            {'label': '2021-22', 'value': '2021-22'}
-                        ],
-                        value='2023-24',
+                        options=year_options,
+                        value=year_options[0]['value'],
                         inline=False,
                         style={'marginBottom': '10px'}
                     )
@@ -85,7 +97,7 @@ def create_layout(table13_df=None):
                             {'label': 'Anxiety disorders', 'value': 'Anxiety disorders'},
                             {'label': 'Personality disorders', 'value': 'Personality disorders'}
                         ],
-                        value=['Neurocognitive disorders', 'Substance-related disorders', 'Schizophrenic and psychotic disorders', 'Mood disorders', 'Anxiety disorders', 'Personality disorders'],
+                        value=CLINICAL_DIAGNOSES,
                         inline=False,
                         style={'fontSize': '12px'}  # Smaller font for better fit
                     )
@@ -109,47 +121,62 @@ def create_layout(table13_df=None):
             # Heatmap visualization
             dcc.Graph(
                 id='clinical-heatmap',
-                figure=create_clinical_diagnostic_heatmap('2023-24', 'Female', ['Neurocognitive disorders', 'Substance-related disorders', 'Schizophrenic and psychotic disorders', 'Mood disorders', 'Anxiety disorders', 'Personality disorders'], table13_df) if table13_df is not None and not table13_df.empty else create_placeholder_chart("Clinical Diagnostic Heat Map", height=600)
-            )
+                figure=figure_response(create_clinical_diagnostic_heatmap(year_options[0]['value'], 'Female', CLINICAL_DIAGNOSES, table13_df)) if table13_df is not None and not table13_df.empty else create_placeholder_chart("Clinical Diagnostic Heat Map", height=600)
+            ),
+            # What the heatmap shows, so callbacks can send only what changes
+            dcc.Store(id='clinical-heatmap-shown', data={'year': year_options[0]['value'], 'sex': 'Female', 'diagnoses': CLINICAL_DIAGNOSES,
+                                                         'version': data_version(table13_df)} if table13_df is not None and not table13_df.empty else None)
         ], style=STYLE_CARD)
     ])
 
-def register_callbacks(app, table13_df=None):
-    """Register callbacks for Clinical Patterns page"""
+def register_callbacks(app):
+    """Register callbacks for Clinical Patterns page (tables come from the data registry)"""
     
     @app.callback(
-        Output('clinical-heatmap', 'figure'),
+        [Output('clinical-heatmap', 'figure'),
+         Output('clinical-heatmap-shown', 'data')],
         [Input('clinical-year-selector', 'value'),
          Input('clinical-sex-selector', 'value'),
-         Input('clinical-diagnosis-filter', 'value')]
+         Input('clinical-diagnosis-filter', 'value')],
+        [State('clinical-heatmap-shown', 'data')]
     )
-    def update_clinical_heatmap(selected_year, selected_sex, selected_diagnoses):
+    def update_clinical_heatmap(selected_year, selected_sex, selected_diagnoses, shown):
         """Update clinical heatmap based on selections"""
-        print(f"🔄 Clinical heatmap callback triggered with year: {selected_year}, sex: {selected_sex}, diagnoses: {len(selected_diagnoses) if selected_diagnoses else 0}")
+        logger.debug("🔄 Clinical heatmap callback triggered with year: %s, sex: %s, diagnoses: %s", selected_year, selected_sex, len(selected_diagnoses) if selected_diagnoses else 0)
         
         try:
             if not selected_year:
                 selected_year = '2023-24'
-                print(f"⚠️ No year selected, defaulting to: {selected_year}")
+                logger.debug("⚠️ No year selected, defaulting to: %s", selected_year)
             
             if not selected_sex:
                 selected_sex = 'Female'
-                print(f"⚠️ No sex selected, defaulting to: {selected_sex}")
+                logger.debug("⚠️ No sex selected, defaulting to: %s", selected_sex)
             
             if not selected_diagnoses:
                 selected_diagnoses = ['Mood disorders', 'Anxiety disorders', 'Substance-related disorders']
-                print(f"⚠️ No diagnoses selected, defaulting to: {selected_diagnoses}")
+                logger.debug("⚠️ No diagnoses selected, defaulting to: %s", selected_diagnoses)
             
-            if table13_df is None or table13_df.empty:
-                print("⚠️ Table 13 DataFrame is empty, showing placeholder")
-                return create_placeholder_chart("Clinical diagnostic data not available - please check data files")
+            table13_df = get_table('table13')
+            if table13_df.empty:
+                logger.warning("⚠️ Table 13 DataFrame is empty, showing placeholder")
+                skip_response_cache()
+                return create_placeholder_chart("Clinical diagnostic data not available - please check data files"), None
             
             result = create_clinical_diagnostic_heatmap(selected_year, selected_sex, selected_diagnoses, table13_df)
-            print("✅ Clinical heatmap callback completed successfully")
-            return result
+            if result is None:
+                raise RuntimeError("chart builder failed, see the error logged above")
+            
+            # Patch the shown heatmap unless the data changed since
+            version = data_version(table13_df)
+            previous = None
+            if shown and shown.get('version') == version:
+                previous = create_clinical_diagnostic_heatmap(shown['year'], shown['sex'], shown['diagnoses'], table13_df)
+            logger.debug("✅ Clinical heatmap callback completed successfully")
+            return figure_update(result, previous), {'year': selected_year, 'sex': selected_sex,
+                                                     'diagnoses': selected_diagnoses, 'version': version}
             
         except Exception as e:
-            print(f"❌ ERROR in clinical heatmap callback: {str(e)}")
-            print(f"🔍 Full error traceback:")
-            traceback.print_exc()
-            return create_placeholder_chart(f"Clinical heatmap callback error: {str(e)}")
\ No newline at end of file
+            logger.exception("❌ ERROR in clinical heatmap callback: %s", e)
+            skip_response_cache()
+            return create_placeholder_chart(f"Clinical heatmap callback error: {str(e)}"), None
\ No newline at end of file
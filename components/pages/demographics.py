@@ -2,10 +2,26 @@
 Demographics page layout and callbacks - Updated with radio items for year selection
 """
 
-from dash import html, dcc, callback, Input, Output
-import traceback
-from utils.config import COLORS, STYLE_CARD, FISCAL_YEARS_DISPLAY
+from dash import html, dcc, callback, Input, Output, State, ClientsideFunction
+import logging
+from utils.config import COLORS, STYLE_CARD, FISCAL_YEARS_DISPLAY, CLIENTSIDE_YEAR_SWITCHING
 from utils.chart_helpers import create_placeholder_chart, create_age_gender_chart
+from utils.data_registry import get_table
+from utils.figure_cache import figure_response
+from utils.response_cache import skip_response_cache
+from utils.figure_patch import year_figures
+
+logger = logging.getLogger(__name__)
+
+DISPLAY_OPTIONS = ['Absolute Rates', 'Gender Ratio (F:M)']
+
+def age_gender_year_figures(table10_df):
+    """Age/gender chart of every year and display option, for switching in the browser"""
+    return {
+        display_option: year_figures(lambda year: create_age_gender_chart(year, display_option, False, table10_df),
+                                     FISCAL_YEARS_DISPLAY, '2023-24')
+        for display_option in DISPLAY_OPTIONS
+    }
 
 def create_layout(table10_df=None):
     """Create Demographics page layout with radio items for year selection"""
@@ -82,41 +98,55 @@ def create_layout(table10_df=None):
             
             dcc.Graph(
                 id='demographics-chart',
-                figure=create_age_gender_chart('2023-24', 'Absolute Rates', False, table10_df) if table10_df is not None and not table10_df.empty else create_placeholder_chart("Age and Gender Analysis - Data not available", height=500)
-            )
+                figure=figure_response(create_age_gender_chart('2023-24', 'Absolute Rates', False, table10_df)) if table10_df is not None and not table10_df.empty else create_placeholder_chart("Age and Gender Analysis - Data not available", height=500)
+            ),
+            dcc.Store(id='demographics-year-figures', data=age_gender_year_figures(table10_df) if CLIENTSIDE_YEAR_SWITCHING and table10_df is not None and not table10_df.empty else None)
         ], style=STYLE_CARD)
     ])
 
-def register_callbacks(app, table10_df=None):
-    """Register callbacks for Demographics page"""
+def register_callbacks(app):
+    """Register callbacks for Demographics page (tables come from the data registry)"""
     
-    @app.callback(
-        Output('demographics-chart', 'figure'),
-        [Input('demographics-year-selector', 'value'),
-         Input('demographics-display-option', 'value')]
-    )
-    def update_demographics_chart(selected_year, display_option):
-        """Update demographics chart based on selections"""
-        print(f"🔄 Demographics callback triggered with year: {selected_year}, option: {display_option}")
+    # Demographics chart: years and display options switch in the browser, or on the server
+    if CLIENTSIDE_YEAR_SWITCHING:
+        app.clientside_callback(
+            ClientsideFunction(namespace='cihi', function_name='switchYearVariant'),
+            Output('demographics-chart', 'figure'),
+            [Input('demographics-year-selector', 'value'),
+             Input('demographics-display-option', 'value')],
+            [State('demographics-year-figures', 'data')]
+        )
+    else:
+        @app.callback(
+            Output('demographics-chart', 'figure'),
+            [Input('demographics-year-selector', 'value'),
+             Input('demographics-display-option', 'value')]
+        )
+        def update_demographics_chart(selected_year, display_option):
+            """Update demographics chart based on selections"""
+            logger.debug("🔄 Demographics callback triggered with year: %s, option: %s", selected_year, display_option)
         
-        try:
-            if not selected_year:
-                selected_year = '2023-24'
-                print(f"⚠️ No year selected, defaulting to: {selected_year}")
+            try:
+                if not selected_year:
+                    selected_year = '2023-24'
+                    logger.debug("⚠️ No year selected, defaulting to: %s", selected_year)
             
-            # Always disable confidence intervals since we removed the option
-            show_ci = False
+                # Always disable confidence intervals since we removed the option
+                show_ci = False
             
-            if table10_df is None or table10_df.empty:
-                print("⚠️ Table 10 DataFrame is empty, showing placeholder")
-                return create_placeholder_chart("Age/gender data not available - please check data files")
+                table10_df = get_table('table10')
+                if table10_df.empty:
+                    logger.warning("⚠️ Table 10 DataFrame is empty, showing placeholder")
+                    skip_response_cache()
+                    return create_placeholder_chart("Age/gender data not available - please check data files")
             
-            result = create_age_gender_chart(selected_year, display_option, show_ci, table10_df)
-            print("✅ Demographics callback completed successfully")
-            return result
+                result = create_age_gender_chart(selected_year, display_option, show_ci, table10_df)
+                if result is None:
+                    raise RuntimeError("chart builder failed, see the error logged above")
+                logger.debug("✅ Demographics callback completed successfully")
+                return figure_response(result)
             
-        except Exception as e:
-            print(f"❌ ERROR in demographics callback: {str(e)}")
-            print(f"🔍 Full error traceback:")
-            traceback.print_exc()
-            return create_placeholder_chart(f"Demographics callback error: {str(e)}")
\ No newline at end of file
+            except Exception as e:
+                logger.exception("❌ ERROR in demographics callback: %s", e)
+                skip_response_cache()
+                return create_placeholder_chart(f"Demographics callback error: {str(e)}")
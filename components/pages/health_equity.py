@@ -2,13 +2,30 @@
 Health Equity page layout and callbacks - Updated with radio items and donut chart
 """
 
-from dash import html, dcc, callback, Input, Output
-import traceback
-from utils.config import COLORS, STYLE_CARD
+from dash import html, dcc, callback, Input, Output, State, ClientsideFunction
+import logging
+from utils.config import COLORS, STYLE_CARD, FISCAL_YEARS_DISPLAY, CLIENTSIDE_YEAR_SWITCHING
 from utils.chart_helpers import create_placeholder_chart, create_urban_rural_disparity_chart, create_income_gradient_chart, create_income_quintile_contribution_donut
+from utils.data_registry import get_table
+from utils.figure_cache import figure_response
+from utils.response_cache import skip_response_cache
+from utils.figure_patch import year_figures
+
+logger = logging.getLogger(__name__)
+
+def donut_year_figures(table12_df):
+    """Income quintile donut of every year, for switching years in the browser"""
+    return year_figures(lambda year: create_income_quintile_contribution_donut(year, table12_df),
+                        FISCAL_YEARS_DISPLAY, '2023-24')
 
 def create_layout(table11_df=None, table12_df=None):
     """Create Health Equity page layout with radio items for Income Quintile year selection and donut chart"""
+    has_table11 = table11_df is not None and not table11_df.empty
+    has_table12 = table12_df is not None and not table12_df.empty
+    # Builders return None when they fail; the page then shows the placeholder
+    urban_rural = create_urban_rural_disparity_chart('Absolute Rates', False, True, False, table11_df) if has_table11 else None
+    gradient = create_income_gradient_chart(table12_df) if has_table12 else None
+    donut = create_income_quintile_contribution_donut('2023-24', table12_df) if has_table12 else None
     return html.Div([
         html.H2("⚖️ Health Equity", style={'color': COLORS['accent'], 'marginBottom': '30px'}),
         
@@ -21,7 +38,7 @@ def create_layout(table11_df=None, table12_df=None):
             html.P("Comparison of mental health hospitalization rates between urban and rural/remote areas."),
             
             dcc.Graph(
-                figure=create_urban_rural_disparity_chart('Absolute Rates', False, True, False, table11_df) if table11_df is not None and not table11_df.empty else create_placeholder_chart("Urban vs Rural Disparities - Data not available")
+                figure=figure_response(urban_rural) if urban_rural is not None else create_placeholder_chart("Urban vs Rural Disparities - Data not available")
             )
         ], style=STYLE_CARD),
         
@@ -32,7 +49,7 @@ def create_layout(table11_df=None, table12_df=None):
             
             dcc.Graph(
                 id='income-gradient-chart',
-                figure=create_income_gradient_chart(table12_df) if table12_df is not None and not table12_df.empty else create_placeholder_chart("Income Gradient Analysis - Data not available", height=600)
+                figure=figure_response(gradient) if gradient is not None else create_placeholder_chart("Income Gradient Analysis - Data not available", height=600)
             )
         ], style=STYLE_CARD),
         
@@ -72,37 +89,50 @@ def create_layout(table11_df=None, table12_df=None):
             
             dcc.Graph(
                 id='income-contribution-donut-chart',
-                figure=create_income_quintile_contribution_donut('2023-24', table12_df) if table12_df is not None and not table12_df.empty else create_placeholder_chart("Income Quintile Contribution Analysis")
-            )
+                figure=figure_response(donut) if donut is not None else create_placeholder_chart("Income Quintile Contribution Analysis")
+            ),
+            dcc.Store(id='income-donut-year-figures', data=donut_year_figures(table12_df) if CLIENTSIDE_YEAR_SWITCHING and table12_df is not None and not table12_df.empty else None)
         ], style=STYLE_CARD)
     ])
 
-def register_callbacks(app, table11_df=None, table12_df=None):
-    """Register callbacks for Health Equity page"""
+def register_callbacks(app):
+    """Register callbacks for Health Equity page (tables come from the data registry)"""
     
-    @app.callback(
-        Output('income-contribution-donut-chart', 'figure'),
-        [Input('income-donut-year-selector', 'value')]
-    )
-    def update_income_contribution_donut_chart(selected_year):
-        """Update income contribution donut chart based on year selection"""
-        print(f"🔄 Income contribution donut callback triggered with year: {selected_year}")
+    # Income contribution donut: years switch in the browser, or on the server
+    if CLIENTSIDE_YEAR_SWITCHING:
+        app.clientside_callback(
+            ClientsideFunction(namespace='cihi', function_name='switchYear'),
+            Output('income-contribution-donut-chart', 'figure'),
+            [Input('income-donut-year-selector', 'value')],
+            [State('income-donut-year-figures', 'data')]
+        )
+    else:
+        @app.callback(
+            Output('income-contribution-donut-chart', 'figure'),
+            [Input('income-donut-year-selector', 'value')]
+        )
+        def update_income_contribution_donut_chart(selected_year):
+            """Update income contribution donut chart based on year selection"""
+            logger.debug("🔄 Income contribution donut callback triggered with year: %s", selected_year)
         
-        try:
-            if not selected_year:
-                selected_year = '2023-24'
-                print(f"⚠️ No year selected, defaulting to: {selected_year}")
+            try:
+                if not selected_year:
+                    selected_year = '2023-24'
+                    logger.debug("⚠️ No year selected, defaulting to: %s", selected_year)
             
-            if table12_df is None or table12_df.empty:
-                print("⚠️ Table 12 DataFrame is empty, showing placeholder")
-                return create_placeholder_chart("Income quintile data not available - please check data files")
+                table12_df = get_table('table12')
+                if table12_df.empty:
+                    logger.warning("⚠️ Table 12 DataFrame is empty, showing placeholder")
+                    skip_response_cache()
+                    return create_placeholder_chart("Income quintile data not available - please check data files")
             
-            result = create_income_quintile_contribution_donut(selected_year, table12_df)
-            print("✅ Income contribution donut callback completed successfully")
-            return result
+                result = create_income_quintile_contribution_donut(selected_year, table12_df)
+                if result is None:
+                    raise RuntimeError("chart builder failed, see the error logged above")
+                logger.debug("✅ Income contribution donut callback completed successfully")
+                return figure_response(result)
             
-        except Exception as e:
-            print(f"❌ ERROR in income contribution donut callback: {str(e)}")
-            print(f"🔍 Full error traceback:")
-            traceback.print_exc()
-            return create_placeholder_chart(f"Income contribution donut callback error: {str(e)}")
\ No newline at end of file
+            except Exception as e:
+                logger.exception("❌ ERROR in income contribution donut callback: %s", e)
+                skip_response_cache()
+                return create_placeholder_chart(f"Income contribution donut callback error: {str(e)}")
@@ -2,11 +2,23 @@
 Provincial Overview page layout and callbacks - Updated with checklist for province selection
 """
 
-from dash import dcc, html, callback, Input, Output
-import traceback
-from utils.config import COLORS, STYLE_CARD
+from dash import dcc, html, callback, Input, Output, State, ClientsideFunction
+import logging
+from utils.config import COLORS, STYLE_CARD, FISCAL_YEARS_DISPLAY, CLIENTSIDE_YEAR_SWITCHING, PROVINCES
 from utils.chart_helpers import create_placeholder_chart, create_provincial_trends_chart, create_mental_health_vs_other_chart, create_provincial_contribution_pie_chart
 from utils.data_loader import get_province_options, get_default_provinces
+from utils.data_registry import get_table
+from utils.figure_cache import figure_response
+from utils.response_cache import skip_response_cache
+from utils.figure_patch import year_figures, figure_update
+from utils.table_index import data_version
+
+logger = logging.getLogger(__name__)
+
+def pie_year_figures(table3_df):
+    """Pie chart of every year, for switching years in the browser"""
+    return year_figures(lambda year: create_provincial_contribution_pie_chart(year, 'Rate per 100,000', table3_df),
+                        FISCAL_YEARS_DISPLAY, '2023-24')
 
 def create_layout(table3_df, combined_df=None):
     """Create Provincial Overview page layout with checklist for province selection"""
@@ -27,22 +39,7 @@ def create_layout(table3_df, combined_df=None):
                     html.Label("Select Provinces/Territories:", style={'fontWeight': 'bold', 'marginBottom': '10px', 'display': 'block'}),
                     dcc.Checklist(
                         id='province-selector',
-                        options=[
-                            {'label': 'Alberta', 'value': 'Alberta'},
-                            {'label': 'British Columbia', 'value': 'British Columbia'},
-                            {'label': 'Manitoba', 'value': 'Manitoba'},
-                            {'label': 'New Brunswick', 'value': 'New Brunswick'},
-                            {'label': 'Newfoundland and Labrador', 'value': 'Newfoundland and Labrador'},
-                            {'label': 'Northwest Territories', 'value': 'Northwest Territories'},
-                            {'label': 'Nova Scotia', 'value': 'Nova Scotia'},
-                            {'label': 'Nunavut', 'value': 'Nunavut'},
-                            {'label': 'Ontario', 'value': 'Ontario'},
-                            {'label': 'Prince Edward Island', 'value': 'Prince Edward Island'},
-                            {'label': 'Quebec', 'value': 'Quebec'},
-                            {'label': 'Saskatchewan', 'value': 'Saskatchewan'},
-                            {'label': 'Yukon', 'value': 'Yukon'},
-                            {'label': 'Canada', 'value': 'Canada'}
-                        ],
+                        options=[{'label': province, 'value': province} for province in PROVINCES],
                         value=['Alberta'],  # Default to Alberta only
                         inline=False,
                         style={'fontSize': '12px', 'marginBottom': '10px'}
@@ -61,8 +58,10 @@ def create_layout(table3_df, combined_df=None):
             
             dcc.Graph(
                 id='provincial-trends-chart',
-                figure=create_provincial_trends_chart(['Alberta'], 'Rate per 100,000', table3_df) if not table3_df.empty else create_placeholder_chart("Provincial Hospitalization Trends - Data not available")
-            )
+                figure=figure_response(create_provincial_trends_chart(['Alberta'], 'Rate per 100,000', table3_df)) if not table3_df.empty else create_placeholder_chart("Provincial Hospitalization Trends - Data not available")
+            ),
+            # What the chart shows, so callbacks can send only the traces that change
+            dcc.Store(id='provincial-trends-shown', data={'provinces': ['Alberta'], 'version': data_version(table3_df)} if not table3_df.empty else None)
         ], style=STYLE_CARD),
         
         # Visual Element 2: Mental Health vs Other Conditions
@@ -109,7 +108,7 @@ def create_layout(table3_df, combined_df=None):
             
             dcc.Graph(
                 id='comparison-chart',
-                figure=create_mental_health_vs_other_chart('Canada', 'Rate per 100,000', combined_df) if combined_df is not None and not combined_df.empty else create_placeholder_chart("Mental Health vs Other Conditions Comparison - Data not available")
+                figure=figure_response(create_mental_health_vs_other_chart('Canada', 'Rate per 100,000', combined_df)) if combined_df is not None and not combined_df.empty else create_placeholder_chart("Mental Health vs Other Conditions Comparison - Data not available")
             )
         ], style=STYLE_CARD),
         
@@ -149,41 +148,53 @@ def create_layout(table3_df, combined_df=None):
             
             dcc.Graph(
                 id='provincial-pie-chart',
-                figure=create_provincial_contribution_pie_chart('2023-24', 'Rate per 100,000', table3_df) if not table3_df.empty else create_placeholder_chart("Provincial Contribution Pie Chart - Data not available")
-            )
+                figure=figure_response(create_provincial_contribution_pie_chart('2023-24', 'Rate per 100,000', table3_df)) if not table3_df.empty else create_placeholder_chart("Provincial Contribution Pie Chart - Data not available")
+            ),
+            dcc.Store(id='pie-year-figures', data=pie_year_figures(table3_df) if CLIENTSIDE_YEAR_SWITCHING and not table3_df.empty else None)
         ], style=STYLE_CARD)
     ])
 
-def register_callbacks(app, table3_df, combined_df=None):
-    """Register callbacks for Provincial Overview page"""
+def register_callbacks(app):
+    """Register callbacks for Provincial Overview page (tables come from the data registry)"""
     
     @app.callback(
-        Output('provincial-trends-chart', 'figure'),
-        [Input('province-selector', 'value')]
+        [Output('provincial-trends-chart', 'figure'),
+         Output('provincial-trends-shown', 'data')],
+        [Input('province-selector', 'value')],
+        [State('provincial-trends-shown', 'data')]
     )
-    def update_provincial_trends_chart(selected_provinces):
+    def update_provincial_trends_chart(selected_provinces, shown):
         """Update provincial trends chart based on province selection (fixed to Rate per 100,000)"""
-        print(f"🔄 Callback triggered with provinces: {selected_provinces}")
+        logger.debug("🔄 Callback triggered with provinces: %s", selected_provinces)
         
         try:
             if not selected_provinces or len(selected_provinces) == 0:
                 selected_provinces = ['Alberta']
-                print(f"⚠️ No provinces selected, defaulting to: {selected_provinces}")
+                logger.debug("⚠️ No provinces selected, defaulting to: %s", selected_provinces)
             
+            table3_df = get_table('table3')
             if table3_df.empty:
-                print("⚠️ TABLE3_DF is empty, showing placeholder")
-                return create_placeholder_chart("Data not available - please check data/table_03.json file")
+                logger.warning("⚠️ TABLE3_DF is empty, showing placeholder")
+                skip_response_cache()
+                return create_placeholder_chart("Data not available - please check data/table_03.json file"), None
             
             # Always use "Rate per 100,000" as the metric
             result = create_provincial_trends_chart(selected_provinces, 'Rate per 100,000', table3_df)
-            print("✅ Callback completed successfully")
-            return result
+            if result is None:
+                raise RuntimeError("chart builder failed, see the error logged above")
+            
+            # Patch the shown figure (adding or removing traces) unless the data changed since
+            version = data_version(table3_df)
+            previous = None
+            if shown and shown.get('version') == version:
+                previous = create_provincial_trends_chart(shown['provinces'], 'Rate per 100,000', table3_df)
+            logger.debug("✅ Callback completed successfully")
+            return figure_update(result, previous), {'provinces': selected_provinces, 'version': version}
             
         except Exception as e:
-            print(f"❌ ERROR in callback: {str(e)}")
-            print(f"🔍 Full error traceback:")
-            traceback.print_exc()
-            return create_placeholder_chart(f"Callback error: {str(e)}")
+            logger.exception("❌ ERROR in callback: %s", e)
+            skip_response_cache()
+            return create_placeholder_chart(f"Callback error: {str(e)}"), None
     
     # Callback for mental health vs other conditions comparison chart
     @app.callback(
@@ -192,53 +203,67 @@ def register_callbacks(app, table3_df, combined_df=None):
     )
     def update_comparison_chart(selected_province):
         """Update comparison chart based on province selection (fixed to Rate per 100,000)"""
-        print(f"🔄 Comparison callback triggered with province: {selected_province}")
+        logger.debug("🔄 Comparison callback triggered with province: %s", selected_province)
         
         try:
             if not selected_province:
                 selected_province = 'Canada'
-                print(f"⚠️ No province selected, defaulting to: {selected_province}")
+                logger.debug("⚠️ No province selected, defaulting to: %s", selected_province)
             
-            if combined_df is None or combined_df.empty:
-                print("⚠️ Combined DataFrame is empty, showing placeholder")
+            combined_df = get_table('combined')
+            if combined_df.empty:
+                logger.warning("⚠️ Combined DataFrame is empty, showing placeholder")
+                skip_response_cache()
                 return create_placeholder_chart("Comparison data not available - please check data files")
             
             # Always use "Rate per 100,000" as the metric
             result = create_mental_health_vs_other_chart(selected_province, 'Rate per 100,000', combined_df)
-            print("✅ Comparison callback completed successfully")
-            return result
+            if result is None:
+                raise RuntimeError("chart builder failed, see the error logged above")
+            logger.debug("✅ Comparison callback completed successfully")
+            return figure_response(result)
             
         except Exception as e:
-            print(f"❌ ERROR in comparison callback: {str(e)}")
-            print(f"🔍 Full error traceback:")
-            traceback.print_exc()
+            logger.exception("❌ ERROR in comparison callback: %s", e)
+            skip_response_cache()
             return create_placeholder_chart(f"Comparison callback error: {str(e)}")
     
-    # Callback for provincial contribution pie chart
-    @app.callback(
-        Output('provincial-pie-chart', 'figure'),
-        [Input('pie-year-selector', 'value')]
-    )
-    def update_pie_chart(selected_year):
-        """Update pie chart based on year selection (fixed to Rate per 100,000)"""
-        print(f"🔄 Pie chart callback triggered with year: {selected_year}")
+    # Provincial contribution pie chart: years switch in the browser, or on the server
+    if CLIENTSIDE_YEAR_SWITCHING:
+        app.clientside_callback(
+            ClientsideFunction(namespace='cihi', function_name='switchYear'),
+            Output('provincial-pie-chart', 'figure'),
+            [Input('pie-year-selector', 'value')],
+            [State('pie-year-figures', 'data')]
+        )
+    else:
+        @app.callback(
+            Output('provincial-pie-chart', 'figure'),
+            [Input('pie-year-selector', 'value')]
+        )
+        def update_pie_chart(selected_year):
+            """Update pie chart based on year selection (fixed to Rate per 100,000)"""
+            logger.debug("🔄 Pie chart callback triggered with year: %s", selected_year)
         
-        try:
-            if not selected_year:
-                selected_year = '2023-24'
-                print(f"⚠️ No year selected, defaulting to: {selected_year}")
+            try:
+                if not selected_year:
+                    selected_year = '2023-24'
+                    logger.debug("⚠️ No year selected, defaulting to: %s", selected_year)
             
-            if table3_df.empty:
-                print("⚠️ Table 3 DataFrame is empty, showing placeholder")
-                return create_placeholder_chart("Provincial data not available - please check data files")
+                table3_df = get_table('table3')
+                if table3_df.empty:
+                    logger.warning("⚠️ Table 3 DataFrame is empty, showing placeholder")
+                    skip_response_cache()
+                    return create_placeholder_chart("Provincial data not available - please check data files")
             
-            # Always use "Rate per 100,000" as the metric
-            result = create_provincial_contribution_pie_chart(selected_year, 'Rate per 100,000', table3_df)
-            print("✅ Pie chart callback completed successfully")
-            return result
+                # Always use "Rate per 100,000" as the metric
+                result = create_provincial_contribution_pie_chart(selected_year, 'Rate per 100,000', table3_df)
+                if result is None:
+                    raise RuntimeError("chart builder failed, see the error logged above")
+                logger.debug("✅ Pie chart callback completed successfully")
+                return figure_response(result)
             
-        except Exception as e:
-            print(f"❌ ERROR in pie chart callback: {str(e)}")
-            print(f"🔍 Full error traceback:")
-            traceback.print_exc()
-            return create_placeholder_chart(f"Pie chart callback error: {str(e)}")
\ No newline at end of file
+            except Exception as e:
+                logger.exception("❌ ERROR in pie chart callback: %s", e)
+                skip_response_cache()
+                return create_placeholder_chart(f"Pie chart callback error: {str(e)}")
@@ -2,133 +2,42 @@
 Enhanced sidebar navigation component for CIHI Mental Health Dashboard
 """
 
-from dash import dcc, html
+from dash import dcc, html, Input, Output, State, ClientsideFunction
 from utils.config import COLORS
 
+# Navigation items: (link id, path, icon class, label)
+NAV_ITEMS = [
+    ('nav-provincial', '/', "fas fa-chart-line", "Provincial Overview"),
+    ('nav-demographics', '/demographics', "fas fa-users", "Demographics"),
+    ('nav-equity', '/equity', "fas fa-balance-scale", "Health Equity"),
+    ('nav-clinical', '/clinical', "fas fa-th", "Clinical Patterns")
+]
+
+def create_nav_item(link_id, href, icon_class, text):
+    """Create one navigation link; its look, active or not, is in assets/style.css"""
+    return dcc.Link([
+        html.Div([
+            html.I(className=icon_class, style={
+                'fontSize': '16px',
+                'marginRight': '12px',
+                'width': '20px',
+                'textAlign': 'center'
+            }),
+            html.Span(text, style={'fontSize': '14px', 'fontWeight': '500'})
+        ], className='nav-item')
+    ], href=href, id=link_id, className='nav-link', style={'textDecoration': 'none'})
+
 def create_sidebar():
     """Create modern, aesthetically pleasing sidebar navigation component with better contrast"""
     return html.Div([
         # Navigation menu - starting right away
-        html.Nav([
-            # Provincial Overview
-            dcc.Link([
-                html.Div([
-                    html.I(className="fas fa-chart-line", style={
-                        'fontSize': '18px',
-                        'marginRight': '15px',
-                        'width': '24px',
-                        'textAlign': 'center',
-                        'color': 'inherit'
-                    }),
-                    html.Span("Provincial Overview", style={
-                        'fontSize': '15px', 
-                        'fontWeight': '600',
-                        'color': 'inherit'
-                    })
-                ], style={
-                    'display': 'flex',
-                    'alignItems': 'center',
-                    'padding': '16px 24px',
-                    'borderRadius': '12px',
-                    'transition': 'all 0.3s ease',
-                    'margin': '0 16px 8px 16px',
-                    'backgroundColor': 'transparent',
-                    'border': '2px solid transparent',
-                    'color': 'white'
-                }, className='nav-item')
-            ], href='/', id='nav-provincial', style={'textDecoration': 'none'}),
-            
-            # Demographics
-            dcc.Link([
-                html.Div([
-                    html.I(className="fas fa-users", style={
-                        'fontSize': '18px',
-                        'marginRight': '15px',
-                        'width': '24px',
-                        'textAlign': 'center',
-                        'color': 'inherit'
-                    }),
-                    html.Span("Demographics", style={
-                        'fontSize': '15px', 
-                        'fontWeight': '600',
-                        'color': 'inherit'
-                    })
-                ], style={
-                    'display': 'flex',
-                    'alignItems': 'center',
-                    'padding': '16px 24px',
-                    'borderRadius': '12px',
-                    'transition': 'all 0.3s ease',
-                    'margin': '0 16px 8px 16px',
-                    'backgroundColor': 'transparent',
-                    'border': '2px solid transparent',
-                    'color': 'white'
-                }, className='nav-item')
-            ], href='/demographics', id='nav-demographics', style={'textDecoration': 'none'}),
-            
-            # Health Equity
-            dcc.Link([
-                html.Div([
-                    html.I(className="fas fa-balance-scale", style={
-                        'fontSize': '18px',
-                        'marginRight': '15px',
-                        'width': '24px',
-                        'textAlign': 'center',
-                        'color': 'inherit'
-                    }),
-                    html.Span("Health Equity", style={
-                        'fontSize': '15px', 
-                        'fontWeight': '600',
-                        'color': 'inherit'
-                    })
-                ], style={
-                    'display': 'flex',
-                    'alignItems': 'center',
-                    'padding': '16px 24px',
-                    'borderRadius': '12px',
-                    'transition': 'all 0.3s ease',
-                    'margin': '0 16px 8px 16px',
-                    'backgroundColor': 'transparent',
-                    'border': '2px solid transparent',
-                    'color': 'white'
-                }, className='nav-item')
-            ], href='/equity', id='nav-equity', style={'textDecoration': 'none'}),
-            
-            # Clinical Patterns
-            dcc.Link([
-                html.Div([
-                    html.I(className="fas fa-th", style={
-                        'fontSize': '18px',
-                        'marginRight': '15px',
-                        'width': '24px',
-                        'textAlign': 'center',
-                        'color': 'inherit'
-                    }),
-                    html.Span("Clinical Patterns", style={
-                        'fontSize': '15px', 
-                        'fontWeight': '600',
-                        'color': 'inherit'
-                    })
-                ], style={
-                    'display': 'flex',
-                    'alignItems': 'center',
-                    'padding': '16px 24px',
-                    'borderRadius': '12px',
-                    'transition': 'all 0.3s ease',
-                    'margin': '0 16px 8px 16px',
-                    'backgroundColor': 'transparent',
-                    'border': '2px solid transparent',
-                    'color': 'white'
-                }, className='nav-item')
-            ], href='/clinical', id='nav-clinical', style={'textDecoration': 'none'})
-            
-        ], style={
+        html.Nav([create_nav_item(*item) for item in NAV_ITEMS], style={
             'display': 'flex',
             'flexDirection': 'column',
             'gap': '0px',
             'paddingTop': '30px'
         })
-        
+
     ], style={
         'position': 'fixed',
         'top': 0,
@@ -139,4 +48,16 @@ def create_sidebar():
         'boxShadow': '4px 0 20px rgba(0, 0, 0, 0.15)',
         'zIndex': 1000,
         'fontFamily': '"Segoe UI", Tahoma, Geneva, Verdana, sans-serif'
-    })
\ No newline at end of file
+    })
+
+def register_callbacks(app):
+    """Register the sidebar callbacks"""
+
+    # Active item highlighting runs in the browser, so navigating costs a
+    # single server callback (the page content)
+    app.clientside_callback(
+        ClientsideFunction(namespace='cihi', function_name='navClasses'),
+        [Output(link_id, 'className') for link_id, _, _, _ in NAV_ITEMS],
+        [Input('url', 'pathname')],
+        [State(link_id, 'href') for link_id, _, _, _ in NAV_ITEMS]
+    )
@@ -0,0 +1,34 @@
+"""
+Gunicorn settings for CIHI Mental Health Dashboard
+
+    gunicorn -c gunicorn.conf.py wsgi:server
+
+Environment: CIHI_BIND (default 0.0.0.0:8050), CIHI_WORKERS (default one
+per CPU), CIHI_THREADS (default 4 per worker).
+"""
+
+import gc
+import os
+
+bind = os.environ.get('CIHI_BIND', '0.0.0.0:8050')
+# Chart building is CPU-bound: one worker per core, a few threads each for
+# requests that wait on I/O or a cache
+workers = int(os.environ.get('CIHI_WORKERS', os.cpu_count() or 1))
+threads = int(os.environ.get('CIHI_THREADS', 4))
+# Import wsgi.py (loading the data) in the master, before forking the workers
+preload_app = True
+timeout = 60
+
+def when_ready(server):
+    # Move everything preloaded out of the garbage collector's reach, so
+    # collections in the workers don't write to (and so copy) the shared pages
+    gc.freeze()
+
+def post_fork(server, worker):
+    # The master logs synchronously and starts no threads, so the workers
+    # start their own logging writer and background tasks
+    from utils.logging_config import configure_logging
+    from app import start_background_tasks
+    import wsgi
+    configure_logging()
+    start_background_tasks(wsgi.app)
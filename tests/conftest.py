@@ -0,0 +1,13 @@
+"""
+Test setup for CIHI Mental Health Dashboard
+
+Tests import the app's packages and read data/ by relative path, so they run
+from the repository root whatever directory pytest was started in.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
@@ -0,0 +1,111 @@
+"""
+Chart builder tests for CIHI Mental Health Dashboard
+
+The builders assemble figures from plain dicts and skip Plotly's property
+validation on every call (utils/chart_helpers.py). These tests run that
+validation once on each builder's output, and compare the output with
+reference_figures.json: the figures the plotly.express and validated
+builders produced for the same data before the fast path, except the
+heatmap, whose cell labels have been a texttemplate since it was vectorized.
+
+Run from the repository root with: python -m pytest
+"""
+
+import base64
+import json
+import math
+import os
+import numpy as np
+import plotly.io as pio
+import pytest
+from utils import chart_helpers
+from utils.chart_helpers import validate_figure
+from utils.data_registry import get_table
+
+REFERENCE_PATH = os.path.join(os.path.dirname(__file__), 'reference_figures.json')
+
+DIAGNOSES = ['Neurocognitive disorders', 'Substance-related disorders', 'Schizophrenic and psychotic disorders',
+             'Mood disorders', 'Anxiety disorders', 'Personality disorders']
+
+# Reference name: (builder, arguments before the table, table)
+CASES = {
+    'trends-alberta': ('create_provincial_trends_chart', (['Alberta'], 'Rate per 100,000'), 'table3'),
+    'trends-cases': ('create_provincial_trends_chart', (['Alberta'], 'Number of Cases'), 'table3'),
+    'comparison-canada': ('create_mental_health_vs_other_chart', ('Canada', 'Rate per 100,000'), 'combined'),
+    'comparison-ontario-cases': ('create_mental_health_vs_other_chart', ('Ontario', 'Number of Cases'), 'combined'),
+    'pie': ('create_provincial_contribution_pie_chart', ('2023-24', 'Rate per 100,000'), 'table3'),
+    'pie-cases': ('create_provincial_contribution_pie_chart', ('2021-22', 'Number of Cases'), 'table3'),
+    'age-gender-absolute-rates-false': ('create_age_gender_chart', ('2023-24', 'Absolute Rates', False), 'table10'),
+    'age-gender-absolute-rates-true': ('create_age_gender_chart', ('2023-24', 'Absolute Rates', True), 'table10'),
+    'age-gender-gender-ratio-f-m-false': ('create_age_gender_chart', ('2023-24', 'Gender Ratio (F:M)', False), 'table10'),
+    'age-gender-gender-ratio-f-m-true': ('create_age_gender_chart', ('2023-24', 'Gender Ratio (F:M)', True), 'table10'),
+    'age-gender-both-false': ('create_age_gender_chart', ('2023-24', 'Both', False), 'table10'),
+    'age-gender-both-true': ('create_age_gender_chart', ('2023-24', 'Both', True), 'table10'),
+    'urban-rural-absolute-rates': ('create_urban_rural_disparity_chart', ('Absolute Rates', True, True, True), 'table11'),
+    'urban-rural-ratio-view-rural-urban': ('create_urban_rural_disparity_chart',
+                                           ('Ratio View (Rural:Urban)', True, True, True), 'table11'),
+    'urban-rural-both': ('create_urban_rural_disparity_chart', ('Both', True, True, True), 'table11'),
+    'donut': ('create_income_quintile_contribution_donut', ('2023-24',), 'table12'),
+    'heatmap': ('create_clinical_diagnostic_heatmap', ('2023-24', 'Female', DIAGNOSES), 'table13'),
+    'gradient': ('create_income_gradient_chart', (), 'table12'),
+}
+
+@pytest.fixture(scope='module')
+def reference_figures():
+    with open(REFERENCE_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def build(case):
+    builder_name, args, table_name = CASES[case]
+    # Bypass the figure cache: each test builds its own figure
+    return getattr(chart_helpers, builder_name).uncached(*args, get_table(table_name))
+
+def to_plain(figure):
+    """A figure as JSON-native data, typed arrays decoded to lists"""
+    return _decode(json.loads(pio.to_json(figure, validate=False, engine='json')))
+
+def _decode(value):
+    if isinstance(value, dict):
+        if 'bdata' in value and 'dtype' in value:
+            array = np.frombuffer(base64.b64decode(value['bdata']), dtype=np.dtype(value['dtype']))
+            if 'shape' in value:
+                array = array.reshape([int(n) for n in str(value['shape']).split(',')])
+            return array.tolist()
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+def differences(actual, expected, path='figure'):
+    """Describe where actual differs from expected; numbers compare to a relative 1e-9"""
+    if isinstance(actual, dict) and isinstance(expected, dict):
+        for key in sorted(set(actual) | set(expected)):
+            if key not in actual:
+                yield f"{path}.{key} is missing"
+            elif key not in expected:
+                yield f"{path}.{key} is unexpected"
+            else:
+                yield from differences(actual[key], expected[key], f"{path}.{key}")
+    elif isinstance(actual, list) and isinstance(expected, list):
+        if len(actual) != len(expected):
+            yield f"{path} has {len(actual)} items, expected {len(expected)}"
+        else:
+            for i, (item, expected_item) in enumerate(zip(actual, expected)):
+                yield from differences(item, expected_item, f"{path}[{i}]")
+    elif (isinstance(actual, (int, float)) and isinstance(expected, (int, float))
+          and not isinstance(actual, bool) and not isinstance(expected, bool)):
+        if not (math.isclose(actual, expected, rel_tol=1e-9) or (actual != actual and expected != expected)):
+            yield f"{path} is {actual!r}, expected {expected!r}"
+    elif actual != expected:
+        yield f"{path} is {str(actual)[:80]!r}, expected {str(expected)[:80]!r}"
+
+@pytest.mark.parametrize('case', CASES)
+def test_builder_output_is_valid(case):
+    figure = build(case)
+    assert figure is not None, f"{CASES[case][0]} failed, see the error logged"
+    validate_figure(figure)
+
+@pytest.mark.parametrize('case', CASES)
+def test_builder_output_matches_reference(case, reference_figures):
+    found = list(differences(to_plain(build(case)), _decode(reference_figures[case])))
+    assert not found, '\n'.join(found[:20])
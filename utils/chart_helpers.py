@@ -2,78 +2,149 @@
 Chart helper functions for CIHI Mental Health Dashboard
 """
 
-import plotly.express as px
+import functools
+import logging
 import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.colors import qualitative
 import pandas as pd
 import numpy as np
-from utils.config import COLORS
+from utils.config import COLORS, PROVINCES
+from utils.logging_config import SAMPLED
+from utils.table_index import select_rows
+from utils.table_cube import get_table13_cube
+from utils.figure_cache import cached_figure
+from utils.response_cache import skip_response_cache
+
+logger = logging.getLogger(__name__)
+
+# Income quintile colours, red (lowest income, highest rates) to green
+# (highest income, lowest rates), and their legend labels
+QUINTILE_COLORS = {
+    'Q1': '#E74C3C',  # Red
+    'Q2': '#FF8C00',  # Orange
+    'Q3': '#FFD700',  # Yellow/Gold
+    'Q4': '#90EE90',  # Light Green
+    'Q5': '#228B22'   # Green
+}
+QUINTILE_LABELS = {
+    'Q1': 'Q1 (Lowest Income)',
+    'Q2': 'Q2 (Lower-Middle Income)',
+    'Q3': 'Q3 (Middle Income)',
+    'Q4': 'Q4 (Upper-Middle Income)',
+    'Q5': 'Q5 (Highest Income)'
+}
+
+@functools.lru_cache(maxsize=1)
+def _template():
+    """The default Plotly template as plain JSON, built once instead of per figure"""
+    return pio.templates[pio.templates.default].to_plotly_json()
+
+def _figure(data, layout):
+    """
+    Wrap plain trace and layout dicts in a Figure without validating them.
+
+    The builders below write their dicts the way Plotly would normalise them
+    (titles as {'text': ...}, NumPy arrays for columns, the keys plotly.express
+    would add), so the result matches a validated figure; validate_figure()
+    checks that once rather than on every call.
+    """
+    return go.Figure(dict(data=data, layout=dict(layout, template=_template())), _validate=False)
+
+def validate_figure(fig):
+    """Rebuild a figure with full property validation; raises ValueError on an invalid property"""
+    return go.Figure(fig.to_dict())
 
 def create_placeholder_chart(title, height=400):
     """Create a placeholder chart"""
-    fig = go.Figure()
-    fig.add_annotation(
-        text=f"{title}<br><br>Visualization will be implemented here",
-        xref="paper", yref="paper",
-        x=0.5, y=0.5,
-        xanchor='center', yanchor='middle',
-        showarrow=False,
-        font=dict(size=16, color=COLORS['primary'])
-    )
-    fig.update_layout(
-        title=title,
+    return _figure([], dict(
+        title=dict(text=title),
+        annotations=[dict(
+            text=f"{title}<br><br>Visualization will be implemented here",
+            xref="paper", yref="paper",
+            x=0.5, y=0.5,
+            xanchor='center', yanchor='middle',
+            showarrow=False,
+            font=dict(size=16, color=COLORS['primary'])
+        )],
         xaxis=dict(showgrid=False, showticklabels=False, zeroline=False),
         yaxis=dict(showgrid=False, showticklabels=False, zeroline=False),
         plot_bgcolor='white',
         paper_bgcolor='white',
         height=height
-    )
-    return fig
+    ))
 
+@functools.lru_cache(maxsize=1)
+def _province_palette():
+    """Trend line colours: the template's colorway, extended so every province has its own"""
+    return tuple(_template()['layout']['colorway']) + tuple(qualitative.Dark24)
+
+@cached_figure(unordered=('selected_provinces',))
 def create_provincial_trends_chart(selected_provinces, selected_metric, df):
     """Create the provincial trends line chart"""
-    print(f"🔄 Creating chart for provinces: {selected_provinces}, metric: {selected_metric}")
+    logger.info("🔄 Creating chart for provinces: %s, metric: %s", selected_provinces, selected_metric, extra=SAMPLED)
     
     try:
         if df.empty:
-            print("❌ DataFrame is empty")
+            logger.warning("❌ DataFrame is empty")
             return create_placeholder_chart("Provincial Hospitalization Trends - Data not available")
         
-        print(f"✅ DataFrame has {len(df)} records")
+        logger.debug("✅ DataFrame has %s records", len(df))
         
         # Filter data for selected provinces
-        filtered_df = df[df['Province'].isin(selected_provinces)]
-        print(f"🔍 Filtered to {len(filtered_df)} records for selected provinces")
+        filtered_df = select_rows(df, where={'Province': list(selected_provinces)})
+        logger.debug("🔍 Filtered to %s records for selected provinces", len(filtered_df))
         
         if filtered_df.empty:
-            print("❌ No data after filtering")
+            logger.debug("❌ No data after filtering")
             return create_placeholder_chart("Please select at least one province")
         
         # Determine y-axis column based on metric selection
         y_column = 'Rate' if selected_metric == 'Rate per 100,000' else 'N'
         y_title = 'Rate per 100,000 population' if selected_metric == 'Rate per 100,000' else 'Number of Cases'
         
-        print(f"📊 Using column: {y_column}, title: {y_title}")
-        
-        # Create line chart
-        fig = px.line(
-            filtered_df, 
-            x='Year', 
-            y=y_column,
-            color='Province',
-            title=f'Mental Health Hospitalizations by Province ({selected_metric})',
-            markers=True,
-            line_shape='linear'
-        )
-        
-        # Customize layout
-        fig.update_layout(
-            xaxis_title='Fiscal Year',
-            yaxis_title=y_title,
+        logger.debug("📊 Using column: %s, title: %s", y_column, y_title)
+        
+        # One line per province in order of appearance, styled as
+        # px.line(color='Province', markers=True) would. Each province keeps
+        # the colour of its place in PROVINCES whatever else is selected, so
+        # ticking one more province adds a trace without recolouring the others
+        years = filtered_df['Year'].to_numpy()
+        values = filtered_df[y_column].to_numpy()
+        palette = _province_palette()
+        color_order = PROVINCES + [province for province in df['Province'].cat.categories if province not in PROVINCES]
+        province_rows = filtered_df.groupby('Province', observed=True, sort=False).indices
+        traces = []
+        for province, rows in province_rows.items():
+            traces.append(dict(
+                type='scatter',
+                x=years[rows],
+                y=values[rows],
+                mode='lines+markers',
+                name=province,
+                legendgroup=province,
+                showlegend=True,
+                line=dict(color=palette[color_order.index(province) % len(palette)], dash='solid', shape='linear'),
+                marker=dict(symbol='circle'),
+                orientation='v',
+                xaxis='x',
+                yaxis='y',
+                hovertemplate=f'Province={province}<br>Year=%{{x}}<br>{y_column}=%{{y}}<extra></extra>'
+            ))
+
+        fig = _figure(traces, dict(
+            title=dict(text=f'Mental Health Hospitalizations by Province ({selected_metric})'),
+            xaxis=dict(anchor='y', domain=[0.0, 1.0], title=dict(text='Fiscal Year'),
+                       showgrid=True, gridwidth=1, gridcolor='lightgray'),
+            yaxis=dict(anchor='x', domain=[0.0, 1.0], title=dict(text=y_title),
+                       showgrid=True, gridwidth=1, gridcolor='lightgray'),
             hovermode='x unified',
             plot_bgcolor='white',
             paper_bgcolor='white',
             font=dict(size=12),
             legend=dict(
+                title=dict(text='Province'),
+                tracegroupgap=0,
                 orientation="v",
                 yanchor="top",
                 y=1,
@@ -82,36 +153,31 @@ def create_provincial_trends_chart(selected_provinces, selected_metric, df):
                 font=dict(size=14)
             ),
             margin=dict(r=150)  # Add right margin for legend
-        )
-        
-        # Add grid lines
-        fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='lightgray')
-        fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='lightgray')
-        
-        print("✅ Chart created successfully")
+        ))
+
+        logger.debug("✅ Chart created successfully")
         return fig
         
     except Exception as e:
-        print(f"❌ ERROR creating chart: {str(e)}")
-        import traceback
-        print(f"🔍 Full error traceback:")
-        traceback.print_exc()
+        logger.exception("❌ ERROR creating chart: %s", e)
+        skip_response_cache()
 
+@cached_figure()
 def create_mental_health_vs_other_chart(selected_province, selected_metric, combined_df):
     """Create mental health vs other conditions stacked area chart"""
-    print(f"🔄 Creating comparison chart for province: {selected_province}, metric: {selected_metric}")
+    logger.info("🔄 Creating comparison chart for province: %s, metric: %s", selected_province, selected_metric, extra=SAMPLED)
     
     try:
         if combined_df.empty:
-            print("❌ Combined DataFrame is empty")
+            logger.warning("❌ Combined DataFrame is empty")
             return create_placeholder_chart("Mental Health vs Other Conditions - Data not available")
         
         # Filter data for selected province
-        filtered_df = combined_df[combined_df['Province'] == selected_province]
-        print(f"🔍 Filtered to {len(filtered_df)} records for {selected_province}")
+        filtered_df = select_rows(combined_df, where={'Province': selected_province})
+        logger.debug("🔍 Filtered to %s records for %s", len(filtered_df), selected_province)
         
         if filtered_df.empty:
-            print("❌ No data after filtering")
+            logger.debug("❌ No data after filtering")
             return create_placeholder_chart(f"No data available for {selected_province}")
         
         # Determine which columns to use based on metric selection
@@ -126,52 +192,53 @@ def create_mental_health_vs_other_chart(selected_province, selected_metric, comb
             total_col = 'Total_N'
             y_title = 'Number of Cases'
         
-        print(f"📊 Using columns: {mh_col}, {other_col}, {total_col}")
-        
-        # Create stacked area chart using plotly graph objects
-        fig = go.Figure()
-        
-        # Add Mental Health area (bottom layer)
-        fig.add_trace(go.Scatter(
-            x=filtered_df['Year'],
-            y=filtered_df[mh_col],
-            fill='tonexty',
-            mode='lines+markers',
-            name='Mental Health',
-            line=dict(color='#E74C3C', width=2),
-            fillcolor='rgba(231, 76, 60, 0.3)',
-            hovertemplate=f'<b>Mental Health</b><br>Year: %{{x}}<br>{y_title}: %{{y:,.0f}}<extra></extra>'
-        ))
-        
-        # Add Other Conditions area (middle layer)
-        fig.add_trace(go.Scatter(
-            x=filtered_df['Year'],
-            y=filtered_df[total_col],
-            fill='tonexty',
-            mode='lines+markers',
-            name='Other Conditions',
-            line=dict(color='#3498DB', width=2),
-            fillcolor='rgba(52, 152, 219, 0.3)',
-            hovertemplate=f'<b>Other Conditions</b><br>Year: %{{x}}<br>{y_title}: %{{customdata:,.0f}}<extra></extra>',
-            customdata=filtered_df[other_col]
-        ))
-        
-        # Add total boundary line
-        fig.add_trace(go.Scatter(
-            x=filtered_df['Year'],
-            y=filtered_df[total_col],
-            mode='lines',
-            name='Total',
-            line=dict(color='#2C3E50', width=3, dash='dash'),
-            hovertemplate=f'<b>Total</b><br>Year: %{{x}}<br>{y_title}: %{{y:,.0f}}<br>MH as % of Total: %{{customdata:.1f}}%<extra></extra>',
-            customdata=filtered_df['MH_Percentage']
-        ))
+        logger.debug("📊 Using columns: %s, %s, %s", mh_col, other_col, total_col)
         
-        # Update layout
-        fig.update_layout(
-            title=f'Mental Health vs Other Conditions Hospitalizations - {selected_province} ({selected_metric})',
-            xaxis_title='Fiscal Year',
-            yaxis_title=y_title,
+        years = filtered_df['Year'].to_numpy()
+        totals = filtered_df[total_col].to_numpy()
+
+        # Stacked area chart: Mental Health area (bottom layer), Other
+        # Conditions area (middle layer) and the total boundary line
+        traces = [
+            dict(
+                type='scatter',
+                x=years,
+                y=filtered_df[mh_col].to_numpy(),
+                fill='tonexty',
+                mode='lines+markers',
+                name='Mental Health',
+                line=dict(color='#E74C3C', width=2),
+                fillcolor='rgba(231, 76, 60, 0.3)',
+                hovertemplate=f'<b>Mental Health</b><br>Year: %{{x}}<br>{y_title}: %{{y:,.0f}}<extra></extra>'
+            ),
+            dict(
+                type='scatter',
+                x=years,
+                y=totals,
+                fill='tonexty',
+                mode='lines+markers',
+                name='Other Conditions',
+                line=dict(color='#3498DB', width=2),
+                fillcolor='rgba(52, 152, 219, 0.3)',
+                hovertemplate=f'<b>Other Conditions</b><br>Year: %{{x}}<br>{y_title}: %{{customdata:,.0f}}<extra></extra>',
+                customdata=filtered_df[other_col].to_numpy()
+            ),
+            dict(
+                type='scatter',
+                x=years,
+                y=totals,
+                mode='lines',
+                name='Total',
+                line=dict(color='#2C3E50', width=3, dash='dash'),
+                hovertemplate=f'<b>Total</b><br>Year: %{{x}}<br>{y_title}: %{{y:,.0f}}<br>MH as % of Total: %{{customdata:.1f}}%<extra></extra>',
+                customdata=filtered_df['MH_Percentage'].to_numpy()
+            )
+        ]
+
+        fig = _figure(traces, dict(
+            title=dict(text=f'Mental Health vs Other Conditions Hospitalizations - {selected_province} ({selected_metric})'),
+            xaxis=dict(title=dict(text='Fiscal Year'), showgrid=True, gridwidth=1, gridcolor='lightgray'),
+            yaxis=dict(title=dict(text=y_title), showgrid=True, gridwidth=1, gridcolor='lightgray'),
             hovermode='x unified',
             plot_bgcolor='white',
             paper_bgcolor='white',
@@ -185,40 +252,32 @@ def create_mental_health_vs_other_chart(selected_province, selected_metric, comb
                 font=dict(size=14)
             ),
             margin=dict(r=150)
-        )
-        
-        # Add grid lines
-        fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='lightgray')
-        fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='lightgray')
-        
-        print("✅ Comparison chart created successfully")
+        ))
+
+        logger.debug("✅ Comparison chart created successfully")
         return fig
         
     except Exception as e:
-        print(f"❌ ERROR creating comparison chart: {str(e)}")
-        import traceback
-        print(f"🔍 Full error traceback:")
-        traceback.print_exc()
+        logger.exception("❌ ERROR creating comparison chart: %s", e)
+        skip_response_cache()
 
+@cached_figure()
 def create_provincial_contribution_pie_chart(selected_year, selected_metric, table3_df):
     """Create provincial contribution pie chart"""
-    print(f"🔄 Creating pie chart for year: {selected_year}, metric: {selected_metric}")
+    logger.info("🔄 Creating pie chart for year: %s, metric: %s", selected_year, selected_metric, extra=SAMPLED)
     
     try:
         if table3_df.empty:
-            print("❌ Table 3 DataFrame is empty")
+            logger.warning("❌ Table 3 DataFrame is empty")
             return create_placeholder_chart("Provincial Contribution - Data not available")
         
         # Filter data for selected year and exclude Canada total
-        filtered_df = table3_df[
-            (table3_df['Year'] == selected_year) & 
-            (table3_df['Province'] != 'Canada')
-        ].copy()
+        filtered_df = select_rows(table3_df, where={'Year': selected_year}, exclude={'Province': 'Canada'})
         
-        print(f"🔍 Filtered to {len(filtered_df)} provinces for year {selected_year}")
+        logger.debug("🔍 Filtered to %s provinces for year %s", len(filtered_df), selected_year)
         
         if filtered_df.empty:
-            print("❌ No data after filtering")
+            logger.debug("❌ No data after filtering")
             return create_placeholder_chart(f"No provincial data available for {selected_year}")
         
         # Determine which column to use based on metric selection
@@ -245,33 +304,32 @@ def create_provincial_contribution_pie_chart(selected_year, selected_metric, tab
                 "<extra></extra>"
             )
         
-        print(f"📊 Using column: {value_col} for {title_suffix}")
+        logger.debug("📊 Using column: %s for %s", value_col, title_suffix)
         
         # Sort by value for better visual presentation
         filtered_df = filtered_df.sort_values(value_col, ascending=False)
         
-        # Create pie chart
-        fig = px.pie(
-            filtered_df,
-            values=value_col,
-            names='Province',
-            title=f'Provincial Mental Health Hospitalization Contributions - {selected_year}<br><sub>{title_suffix}</sub>',
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        
-        # Customize the pie chart
-        fig.update_traces(
+        # Create pie chart, with the keys px.pie would add
+        provinces = filtered_df['Province'].to_numpy()
+        fig = _figure([dict(
+            type='pie',
+            labels=provinces,
+            values=filtered_df[value_col].to_numpy(),
+            domain=dict(x=[0.0, 1.0], y=[0.0, 1.0]),
+            name='',
+            legendgroup='',
+            showlegend=True,
             textposition='inside',
             textinfo='percent+label',
             hovertemplate=hover_template,
-            customdata=filtered_df['Rate'] if selected_metric == 'Number of Cases (N)' else filtered_df['N'],
-            pull=[0.1 if province == 'Alberta' else 0 for province in filtered_df['Province']]
-        )
-        
-        # Update layout
-        fig.update_layout(
+            customdata=filtered_df['Rate' if selected_metric == 'Number of Cases (N)' else 'N'].to_numpy(),
+            pull=[0.1 if province == 'Alberta' else 0 for province in provinces]
+        )], dict(
+            title=dict(text=f'Provincial Mental Health Hospitalization Contributions - {selected_year}<br><sub>{title_suffix}</sub>'),
+            piecolorway=qualitative.Set3,
             font=dict(size=12),
             legend=dict(
+                tracegroupgap=0,
                 orientation="v",
                 yanchor="middle",
                 y=0.5,
@@ -283,114 +341,155 @@ def create_provincial_contribution_pie_chart(selected_year, selected_metric, tab
             showlegend=True,
             height=600,
             width=1000
-        )
-        
-        print("✅ Pie chart created successfully")
+        ))
+
+        logger.debug("✅ Pie chart created successfully")
         return fig
         
     except Exception as e:
-        print(f"❌ ERROR creating pie chart: {str(e)}")
-        import traceback
-        print(f"🔍 Full error traceback:")
-        traceback.print_exc()
+        logger.exception("❌ ERROR creating pie chart: %s", e)
+        skip_response_cache()
 
+def _single_bar(x, y, y_label, color):
+    """A single-colour bar trace as px.bar(x='Age_Group', y=...) builds it"""
+    return dict(
+        type='bar',
+        x=x,
+        y=y,
+        name='',
+        legendgroup='',
+        showlegend=False,
+        marker=dict(color=color, pattern=dict(shape='')),
+        orientation='v',
+        textposition='auto',
+        xaxis='x',
+        yaxis='y',
+        hovertemplate=f'Age Group=%{{x}}<br>{y_label}=%{{y}}<extra></extra>'
+    )
+
+@cached_figure()
 def create_age_gender_chart(selected_year, display_option, show_ci, table10_df):
     """Create age and gender patterns bar chart"""
-    print(f"🔄 Creating age/gender chart for year: {selected_year}, option: {display_option}, CI: {show_ci}")
+    logger.info("🔄 Creating age/gender chart for year: %s, option: %s, CI: %s", selected_year, display_option, show_ci, extra=SAMPLED)
     
     try:
         if table10_df.empty:
-            print("❌ Table 10 DataFrame is empty")
+            logger.warning("❌ Table 10 DataFrame is empty")
             return create_placeholder_chart("Age and Gender Analysis - Data not available")
         
         # Filter data for selected year and exclude 'Total' sex category
-        filtered_df = table10_df[
-            (table10_df['Year'] == selected_year) & 
-            (table10_df['Sex'] != 'Total')
-        ].copy()
+        filtered_df = select_rows(table10_df, where={'Year': selected_year}, exclude={'Sex': 'Total'})
         
-        print(f"🔍 Filtered to {len(filtered_df)} records for year {selected_year}")
+        logger.debug("🔍 Filtered to %s records for year %s", len(filtered_df), selected_year)
         
         if filtered_df.empty:
-            print("❌ No data after filtering")
+            logger.debug("❌ No data after filtering")
             return create_placeholder_chart(f"No age/gender data available for {selected_year}")
         
+        # Row positions of each sex from one groupby pass
+        age_groups = filtered_df['Age_Group'].to_numpy()
+        rates = filtered_df['Rate'].to_numpy()
+        sex_rows = filtered_df.groupby('Sex', observed=True, sort=False).indices
+        no_rows = np.empty(0, dtype=np.intp)
+        
         if display_option == "Absolute Rates":
-            # Create grouped bar chart
-            fig = px.bar(
-                filtered_df,
-                x='Age_Group',
-                y='Rate',
-                color='Sex',
-                title=f'Mental Health Hospitalizations by Age and Gender - {selected_year}',
-                labels={'Rate': 'Rate per 100,000 population', 'Age_Group': 'Age Group'},
-                color_discrete_map={'Female': '#4CAF50', 'Male': '#2196F3'},  # Green for Female, Blue for Male
-                barmode='group'
+            # Grouped bars, one trace per sex in order of appearance, as
+            # px.bar(color='Sex', barmode='group') would build them
+            hover_template = (
+                "<b>%{fullData.name}</b><br>"
+                "Age Group: %{x}<br>"
+                "Rate: %{y:,.0f} per 100k<br>"
+                "<extra></extra>"
             )
+            sex_colors = {'Female': '#4CAF50', 'Male': '#2196F3'}  # Green for Female, Blue for Male
+            traces = []
+            for sex, rows in sex_rows.items():
+                traces.append(dict(
+                    type='bar',
+                    x=age_groups[rows],
+                    y=rates[rows],
+                    name=sex,
+                    legendgroup=sex,
+                    offsetgroup=sex,
+                    alignmentgroup='True',
+                    showlegend=True,
+                    marker=dict(color=sex_colors[sex], pattern=dict(shape='')),
+                    orientation='v',
+                    textposition='auto',
+                    xaxis='x',
+                    yaxis='y',
+                    hovertemplate=hover_template
+                ))
             
             # Add error bars if requested
             if show_ci:
-                # Add error bars manually
+                # Add error bars manually, from the same rows
+                error_plus = filtered_df['CI_Upper'].to_numpy() - rates
+                error_minus = rates - filtered_df['CI_Lower'].to_numpy()
                 for sex in ['Female', 'Male']:
-                    sex_data = filtered_df[filtered_df['Sex'] == sex]
-                    fig.add_bar(
-                        x=sex_data['Age_Group'],
-                        y=sex_data['Rate'],
+                    rows = sex_rows.get(sex, no_rows)
+                    traces.append(dict(
+                        type='bar',
+                        x=age_groups[rows],
+                        y=rates[rows],
                         error_y=dict(
                             type='data',
                             symmetric=False,
-                            array=sex_data['CI_Upper'] - sex_data['Rate'],
-                            arrayminus=sex_data['Rate'] - sex_data['CI_Lower'],
+                            array=error_plus[rows],
+                            arrayminus=error_minus[rows],
                             visible=True
                         ),
                         showlegend=False,
-                        marker_color='rgba(0,0,0,0)',
-                        hoverinfo='skip'
-                    )
+                        marker=dict(color='rgba(0,0,0,0)'),
+                        hoverinfo='skip',
+                        hovertemplate=hover_template
+                    ))
             
-        elif display_option == "Gender Ratio (F:M)":
-            # Calculate gender ratios
-            female_data = filtered_df[filtered_df['Sex'] == 'Female'].set_index('Age_Group')['Rate']
-            male_data = filtered_df[filtered_df['Sex'] == 'Male'].set_index('Age_Group')['Rate']
-            ratio_data = (female_data / male_data).reset_index()
-            ratio_data.columns = ['Age_Group', 'Ratio']
+            title = f'Mental Health Hospitalizations by Age and Gender - {selected_year}'
+            legend_title = dict(title=dict(text='Sex'))
+            barmode = 'group'
+            shapes = []
             
-            fig = px.bar(
-                ratio_data,
-                x='Age_Group',
-                y='Ratio',
-                title=f'Female to Male Hospitalization Ratio by Age - {selected_year}',
-                labels={'Ratio': 'Female:Male Ratio', 'Age_Group': 'Age Group'},
-                color_discrete_sequence=['#9C27B0']
-            )
+        elif display_option == "Gender Ratio (F:M)":
+            # Calculate gender ratios, aligned on age group
+            female_rows = sex_rows.get('Female', no_rows)
+            male_rows = sex_rows.get('Male', no_rows)
+            female_data = pd.Series(rates[female_rows], index=age_groups[female_rows])
+            male_data = pd.Series(rates[male_rows], index=age_groups[male_rows])
+            ratio_data = female_data / male_data
             
-            # Add horizontal line at ratio = 1
-            fig.add_hline(y=1, line_dash="dash", line_color="#FF9800", line_width=3)
+            traces = [_single_bar(ratio_data.index.to_numpy(), ratio_data.to_numpy(), 'Female:Male Ratio', '#9C27B0')]
+            title = f'Female to Male Hospitalization Ratio by Age - {selected_year}'
+            legend_title = {}
+            barmode = 'relative'
+            # Horizontal line at ratio = 1
+            shapes = [dict(type='line', xref='x domain', x0=0, x1=1, yref='y', y0=1, y1=1,
+                           line=dict(color='#FF9800', dash='dash', width=3))]
             
         else:  # Both Sexes Combined
             # Combine sexes using 'Total' category
-            total_data = table10_df[
-                (table10_df['Year'] == selected_year) & 
-                (table10_df['Sex'] == 'Total')
-            ].copy()
+            total_data = select_rows(table10_df, where={'Year': selected_year, 'Sex': 'Total'})
             
-            fig = px.bar(
-                total_data,
-                x='Age_Group',
-                y='Rate',
-                title=f'Mental Health Hospitalizations by Age (Both Sexes) - {selected_year}',
-                labels={'Rate': 'Rate per 100,000 population', 'Age_Group': 'Age Group'},
-                color_discrete_sequence=['#607D8B']
-            )
-        
-        # Update layout
-        fig.update_layout(
-            xaxis_title='Age Group',
-            yaxis_title='Rate per 100,000 population',
+            traces = [_single_bar(total_data['Age_Group'].to_numpy(), total_data['Rate'].to_numpy(),
+                                  'Rate per 100,000 population', '#607D8B')]
+            title = f'Mental Health Hospitalizations by Age (Both Sexes) - {selected_year}'
+            legend_title = {}
+            barmode = 'relative'
+            shapes = []
+        
+        layout = dict(
+            title=dict(text=title),
+            xaxis=dict(anchor='y', domain=[0.0, 1.0], title=dict(text='Age Group'),
+                       showgrid=True, gridwidth=1, gridcolor='lightgray'),
+            yaxis=dict(anchor='x', domain=[0.0, 1.0], title=dict(text='Rate per 100,000 population'),
+                       showgrid=True, gridwidth=1, gridcolor='lightgray'),
+            barmode=barmode,
             plot_bgcolor='white',
             paper_bgcolor='white',
             font=dict(size=12),
             legend=dict(
+                **legend_title,
+                tracegroupgap=0,
                 orientation="h",
                 yanchor="bottom",
                 y=1.02,
@@ -400,78 +499,78 @@ def create_age_gender_chart(selected_year, display_option, show_ci, table10_df):
             ),
             height=500
         )
+        if shapes:
+            layout['shapes'] = shapes
+        fig = _figure(traces, layout)
         
-        # Add grid lines
-        fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='lightgray')
-        fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='lightgray')
-        
-        # Custom hover template
-        if display_option == "Absolute Rates":
-            hover_template = (
-                "<b>%{fullData.name}</b><br>"
-                "Age Group: %{x}<br>"
-                "Rate: %{y:,.0f} per 100k<br>"
-                "<extra></extra>"
-            )
-            fig.update_traces(hovertemplate=hover_template)
-        
-        print("✅ Age/gender chart created successfully")
+        logger.debug("✅ Age/gender chart created successfully")
         return fig
         
     except Exception as e:
-        print(f"❌ ERROR creating age/gender chart: {str(e)}")
-        import traceback
-        print(f"🔍 Full error traceback:")
-        traceback.print_exc()
+        logger.exception("❌ ERROR creating age/gender chart: %s", e)
+        skip_response_cache()
+
+def _reference_line(y):
+    """A dashed grey line across the plot at y, as fig.add_hline() adds it"""
+    return dict(type='line', xref='x domain', x0=0, x1=1, yref='y', y0=y, y1=y,
+                line=dict(color='gray', dash='dash', width=2))
 
+def _by_year(years, values):
+    """Values indexed by fiscal year, so two residence types align by year when combined"""
+    return pd.Series(values, index=years)
+
+@cached_figure()
 def create_urban_rural_disparity_chart(display_mode, show_ci, highlight_gap, show_percentage, table11_df):
     """Create urban vs rural disparity line chart"""
-    print(f"🔄 Creating urban/rural chart - mode: {display_mode}, CI: {show_ci}, gap: {highlight_gap}, %: {show_percentage}")
+    logger.info("🔄 Creating urban/rural chart - mode: %s, CI: %s, gap: %s, %%: %s", display_mode, show_ci, highlight_gap, show_percentage, extra=SAMPLED)
     
     try:
         if table11_df.empty:
-            print("❌ Table 11 DataFrame is empty")
+            logger.warning("❌ Table 11 DataFrame is empty")
             return create_placeholder_chart("Urban vs Rural Analysis - Data not available")
         
-        print(f"✅ Table 11 has {len(table11_df)} records")
+        logger.debug("✅ Table 11 has %s records", len(table11_df))
+        
+        # Get data for each residence type, as arrays shared by every display mode
+        urban_data = select_rows(table11_df, where={'Residence_Type': 'Urban'}).sort_values('Year')
+        rural_data = select_rows(table11_df, where={'Residence_Type': 'Rural/remote'}).sort_values('Year')
+        urban_years, urban_rates = urban_data['Year'].to_numpy(), urban_data['Rate'].to_numpy()
+        rural_years, rural_rates = rural_data['Year'].to_numpy(), rural_data['Rate'].to_numpy()
         
         if display_mode == "Absolute Rates":
-            # Create dual-line chart
-            fig = go.Figure()
-            
-            # Get data for each residence type
-            urban_data = table11_df[table11_df['Residence_Type'] == 'Urban'].sort_values('Year')
-            rural_data = table11_df[table11_df['Residence_Type'] == 'Rural/remote'].sort_values('Year')
-            
-            # Add Urban line
-            fig.add_trace(go.Scatter(
-                x=urban_data['Year'],
-                y=urban_data['Rate'],
-                mode='lines+markers',
-                name='Urban',
-                line=dict(color='#2196F3', width=3),
-                marker=dict(size=8),
-                hovertemplate='<b>Urban</b><br>Year: %{x}<br>Rate: %{y:.0f} per 100k<br>95% CI: [%{customdata[0]:.0f}-%{customdata[1]:.0f}]<extra></extra>',
-                customdata=urban_data[['CI_Lower', 'CI_Upper']].values
-            ))
             
-            # Add Rural line
-            fig.add_trace(go.Scatter(
-                x=rural_data['Year'],
-                y=rural_data['Rate'],
-                mode='lines+markers',
-                name='Rural/Remote',
-                line=dict(color='#F44336', width=3),
-                marker=dict(size=8),
-                hovertemplate='<b>Rural/Remote</b><br>Year: %{x}<br>Rate: %{y:.0f} per 100k<br>95% CI: [%{customdata[0]:.0f}-%{customdata[1]:.0f}]<extra></extra>',
-                customdata=rural_data[['CI_Lower', 'CI_Upper']].values
-            ))
+            # Dual-line chart: Urban and Rural lines
+            traces = [
+                dict(
+                    type='scatter',
+                    x=urban_years,
+                    y=urban_rates,
+                    mode='lines+markers',
+                    name='Urban',
+                    line=dict(color='#2196F3', width=3),
+                    marker=dict(size=8),
+                    hovertemplate='<b>Urban</b><br>Year: %{x}<br>Rate: %{y:.0f} per 100k<br>95% CI: [%{customdata[0]:.0f}-%{customdata[1]:.0f}]<extra></extra>',
+                    customdata=urban_data[['CI_Lower', 'CI_Upper']].values
+                ),
+                dict(
+                    type='scatter',
+                    x=rural_years,
+                    y=rural_rates,
+                    mode='lines+markers',
+                    name='Rural/Remote',
+                    line=dict(color='#F44336', width=3),
+                    marker=dict(size=8),
+                    hovertemplate='<b>Rural/Remote</b><br>Year: %{x}<br>Rate: %{y:.0f} per 100k<br>95% CI: [%{customdata[0]:.0f}-%{customdata[1]:.0f}]<extra></extra>',
+                    customdata=rural_data[['CI_Lower', 'CI_Upper']].values
+                )
+            ]
             
             # Add gap fill if requested
             if highlight_gap:
-                fig.add_trace(go.Scatter(
-                    x=urban_data['Year'].tolist() + rural_data['Year'].tolist()[::-1],
-                    y=urban_data['Rate'].tolist() + rural_data['Rate'].tolist()[::-1],
+                traces.append(dict(
+                    type='scatter',
+                    x=np.concatenate([urban_years, rural_years[::-1]]),
+                    y=np.concatenate([urban_rates, rural_rates[::-1]]),
                     fill='toself',
                     fillcolor='rgba(156, 39, 176, 0.3)',  # Purple with transparency
                     line=dict(color='rgba(255,255,255,0)'),
@@ -483,9 +582,10 @@ def create_urban_rural_disparity_chart(display_mode, show_ci, highlight_gap, sho
             # Add confidence intervals if requested
             if show_ci:
                 # Urban CI
-                fig.add_trace(go.Scatter(
-                    x=urban_data['Year'].tolist() + urban_data['Year'].tolist()[::-1],
-                    y=urban_data['CI_Upper'].tolist() + urban_data['CI_Lower'].tolist()[::-1],
+                traces.append(dict(
+                    type='scatter',
+                    x=np.concatenate([urban_years, urban_years[::-1]]),
+                    y=np.concatenate([urban_data['CI_Upper'].to_numpy(), urban_data['CI_Lower'].to_numpy()[::-1]]),
                     fill='toself',
                     fillcolor='rgba(33, 150, 243, 0.2)',
                     line=dict(color='rgba(255,255,255,0)'),
@@ -495,9 +595,10 @@ def create_urban_rural_disparity_chart(display_mode, show_ci, highlight_gap, sho
                 ))
                 
                 # Rural CI
-                fig.add_trace(go.Scatter(
-                    x=rural_data['Year'].tolist() + rural_data['Year'].tolist()[::-1],
-                    y=rural_data['CI_Upper'].tolist() + rural_data['CI_Lower'].tolist()[::-1],
+                traces.append(dict(
+                    type='scatter',
+                    x=np.concatenate([rural_years, rural_years[::-1]]),
+                    y=np.concatenate([rural_data['CI_Upper'].to_numpy(), rural_data['CI_Lower'].to_numpy()[::-1]]),
                     fill='toself',
                     fillcolor='rgba(244, 67, 54, 0.2)',
                     line=dict(color='rgba(255,255,255,0)'),
@@ -506,67 +607,59 @@ def create_urban_rural_disparity_chart(display_mode, show_ci, highlight_gap, sho
                     hoverinfo='skip'
                 ))
             
+            shapes = []
             title = 'Urban vs Rural Mental Health Hospitalization Rates'
             y_title = 'Rate per 100,000 population'
             
         elif display_mode == "Ratio View (Rural:Urban)":
-            # Calculate ratios
-            urban_data = table11_df[table11_df['Residence_Type'] == 'Urban'].sort_values('Year')
-            rural_data = table11_df[table11_df['Residence_Type'] == 'Rural/remote'].sort_values('Year')
+            # Calculate ratios for the years both residence types report
+            ratio = _by_year(rural_years, rural_rates) / _by_year(urban_years, urban_rates)
+            ratio = ratio.dropna()
             
-            # Merge data to calculate ratios
-            merged = pd.merge(urban_data[['Year', 'Rate']], rural_data[['Year', 'Rate']], on='Year', suffixes=['_Urban', '_Rural'])
-            merged['Ratio'] = merged['Rate_Rural'] / merged['Rate_Urban']
-            
-            fig = go.Figure()
-            
-            fig.add_trace(go.Scatter(
-                x=merged['Year'],
-                y=merged['Ratio'],
+            traces = [dict(
+                type='scatter',
+                x=ratio.index.to_numpy(),
+                y=ratio.to_numpy(),
                 mode='lines+markers',
                 name='Rural:Urban Ratio',
                 line=dict(color='#9C27B0', width=3),
                 marker=dict(size=8),
                 hovertemplate='<b>Rural:Urban Ratio</b><br>Year: %{x}<br>Ratio: %{y:.2f}<br><extra></extra>'
-            ))
+            )]
             
             # Add reference line at 1.0
-            fig.add_hline(y=1, line_dash="dash", line_color="gray", line_width=2)
+            shapes = [_reference_line(1)]
             
             title = 'Rural to Urban Hospitalization Rate Ratio'
             y_title = 'Rural:Urban Ratio'
             
         else:  # Percentage Above Urban
-            # Calculate percentage differences
-            urban_data = table11_df[table11_df['Residence_Type'] == 'Urban'].sort_values('Year')
-            rural_data = table11_df[table11_df['Residence_Type'] == 'Rural/remote'].sort_values('Year')
-            
-            merged = pd.merge(urban_data[['Year', 'Rate']], rural_data[['Year', 'Rate']], on='Year', suffixes=['_Urban', '_Rural'])
-            merged['Percentage_Diff'] = ((merged['Rate_Rural'] - merged['Rate_Urban']) / merged['Rate_Urban']) * 100
+            # Calculate percentage differences for the years both residence types report
+            urban_by_year = _by_year(urban_years, urban_rates)
+            percentage_diff = ((_by_year(rural_years, rural_rates) - urban_by_year) / urban_by_year) * 100
+            percentage_diff = percentage_diff.dropna()
             
-            fig = go.Figure()
-            
-            fig.add_trace(go.Scatter(
-                x=merged['Year'],
-                y=merged['Percentage_Diff'],
+            traces = [dict(
+                type='scatter',
+                x=percentage_diff.index.to_numpy(),
+                y=percentage_diff.to_numpy(),
                 mode='lines+markers',
                 name='Rural Excess (%)',
                 line=dict(color='#FF5722', width=3),
                 marker=dict(size=8),
                 hovertemplate='<b>Rural Excess</b><br>Year: %{x}<br>Percentage: %{y:.1f}%<br><extra></extra>'
-            ))
+            )]
             
             # Add reference line at 0%
-            fig.add_hline(y=0, line_dash="dash", line_color="gray", line_width=2)
+            shapes = [_reference_line(0)]
             
             title = 'Rural Mental Health Hospitalization Excess (% Above Urban)'
             y_title = 'Percentage Above Urban Rate'
         
-        # Update layout
-        fig.update_layout(
-            title=title,
-            xaxis_title='Fiscal Year',
-            yaxis_title=y_title,
+        layout = dict(
+            title=dict(text=title),
+            xaxis=dict(title=dict(text='Fiscal Year'), showgrid=True, gridwidth=1, gridcolor='lightgray'),
+            yaxis=dict(title=dict(text=y_title), showgrid=True, gridwidth=1, gridcolor='lightgray'),
             plot_bgcolor='white',
             paper_bgcolor='white',
             font=dict(size=12),
@@ -581,74 +674,51 @@ def create_urban_rural_disparity_chart(display_mode, show_ci, highlight_gap, sho
             margin=dict(r=150),
             height=500
         )
+        if shapes:
+            layout['shapes'] = shapes
+        fig = _figure(traces, layout)
         
-        # Add grid lines
-        fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='lightgray')
-        fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='lightgray')
-        
-        print("✅ Urban/rural chart created successfully")
+        logger.debug("✅ Urban/rural chart created successfully")
         return fig
         
     except Exception as e:
-        print(f"❌ ERROR creating urban/rural chart: {str(e)}")
-        import traceback
-        print(f"🔍 Full error traceback:")
-        traceback.print_exc()
+        logger.exception("❌ ERROR creating urban/rural chart: %s", e)
+        skip_response_cache()
 
+@cached_figure()
 def create_income_quintile_contribution_donut(selected_year, table12_df):
     """Create donut chart for income quintile contributions"""
-    print(f"🔄 Creating income quintile contribution donut chart for year: {selected_year}")
+    logger.info("🔄 Creating income quintile contribution donut chart for year: %s", selected_year, extra=SAMPLED)
     
     try:
         if table12_df.empty:
-            print("❌ Table 12 DataFrame is empty")
+            logger.warning("❌ Table 12 DataFrame is empty")
             return create_placeholder_chart("Income Quintile Contributions - Data not available")
         
         # Filter data for selected year
-        filtered_df = table12_df[table12_df['Year'] == selected_year].copy()
+        filtered_df = select_rows(table12_df, where={'Year': selected_year})
         
-        print(f"🔍 Filtered to {len(filtered_df)} quintiles for year {selected_year}")
+        logger.debug("🔍 Filtered to %s quintiles for year %s", len(filtered_df), selected_year)
         
         if filtered_df.empty:
-            print("❌ No data after filtering")
+            logger.debug("❌ No data after filtering")
             return create_placeholder_chart(f"No income quintile data available for {selected_year}")
         
-        # Color mapping consistent with Visual Element 6
-        quintile_colors = {
-            'Q1': '#E74C3C',  # Red (highest rates)
-            'Q2': '#FF8C00',  # Orange
-            'Q3': '#FFD700',  # Yellow/Gold
-            'Q4': '#90EE90',  # Light Green
-            'Q5': '#228B22'   # Green (lowest rates)
-        }
-        
-        # Create color list in correct order
-        colors = [quintile_colors[q] for q in filtered_df['Income_Quintile']]
+        # Colors (consistent with Visual Element 6) and expressive labels,
+        # mapped once per quintile category rather than once per row
+        quintiles = filtered_df['Income_Quintile']
+        colors = quintiles.map(QUINTILE_COLORS).to_numpy()
+        quintile_labels = quintiles.map(lambda q: QUINTILE_LABELS.get(q, f'{q}')).to_numpy()
         
         # Always use Rate per 100,000 as values
         values = filtered_df['Rate']
         title_suffix = 'by Rate per 100,000'
         
-        # Create quintile labels with more expressive names
-        quintile_labels = []
-        for q in filtered_df['Income_Quintile']:
-            if q == 'Q1':
-                quintile_labels.append('Q1 (Lowest Income)')
-            elif q == 'Q2':
-                quintile_labels.append('Q2 (Lower-Middle Income)')
-            elif q == 'Q3':
-                quintile_labels.append('Q3 (Middle Income)')
-            elif q == 'Q4':
-                quintile_labels.append('Q4 (Upper-Middle Income)')
-            elif q == 'Q5':
-                quintile_labels.append('Q5 (Highest Income)')
-            else:
-                quintile_labels.append(f'{q}')  # fallback
-        
-        # Create donut chart using plotly graph objects
-        fig = go.Figure(data=[go.Pie(
+        # Create donut chart
+        fig = _figure([dict(
+            type='pie',
             labels=quintile_labels,
-            values=values,
+            values=values.to_numpy(),
             hole=0.4,  # Creates the donut hole (0.4 = 40% hole)
             marker=dict(
                 colors=colors,
@@ -666,20 +736,16 @@ def create_income_quintile_contribution_donut(selected_year, table12_df):
             ),
             direction='clockwise',
             sort=False  # Maintain quintile order Q1-Q5
-        )])
-        
-        # Add center text showing only the year
-        fig.add_annotation(
-            text=f"<b>{selected_year}</b>",
-            x=0.5, y=0.5,
-            font=dict(size=16, color=COLORS['primary'], family='Arial Black'),
-            showarrow=False,
-            align='center'
-        )
-        
-        # Update layout
-        fig.update_layout(
-            title=f'Income Quintile Mental Health Hospitalization Contributions - {selected_year}<br><sub>{title_suffix}</sub>',
+        )], dict(
+            title=dict(text=f'Income Quintile Mental Health Hospitalization Contributions - {selected_year}<br><sub>{title_suffix}</sub>'),
+            # Center text showing only the year
+            annotations=[dict(
+                text=f"<b>{selected_year}</b>",
+                x=0.5, y=0.5,
+                font=dict(size=16, color=COLORS['primary'], family='Arial Black'),
+                showarrow=False,
+                align='center'
+            )],
             font=dict(size=12),
             legend=dict(
                 orientation="v",
@@ -695,51 +761,55 @@ def create_income_quintile_contribution_donut(selected_year, table12_df):
             width=900,
             plot_bgcolor='white',
             paper_bgcolor='white'
-        )
+        ))
         
-        print("✅ Income quintile contribution donut chart created successfully")
+        logger.debug("✅ Income quintile contribution donut chart created successfully")
         return fig
         
     except Exception as e:
-        print(f"❌ ERROR creating income quintile contribution donut chart: {str(e)}")
-        import traceback
-        print(f"🔍 Full error traceback:")
-        traceback.print_exc()
-        return create_placeholder_chart(f"Error creating donut chart: {str(e)}")
+        logger.exception("❌ ERROR creating income quintile contribution donut chart: %s", e)
+        skip_response_cache()
 
+@cached_figure(unordered=('selected_diagnoses',))
 def create_clinical_diagnostic_heatmap(selected_year, selected_sex, selected_diagnoses, table13_df):
     """Create simplified clinical diagnostic patterns heat map"""
-    print(f"🔄 Creating clinical diagnostic heatmap for year: {selected_year}, sex: {selected_sex}")
+    logger.info("🔄 Creating clinical diagnostic heatmap for year: %s, sex: %s", selected_year, selected_sex, extra=SAMPLED)
     
     try:
         if table13_df.empty:
-            print("❌ Table 13 DataFrame is empty")
+            logger.warning("❌ Table 13 DataFrame is empty")
             return create_placeholder_chart("Clinical Diagnostic Patterns - Data not available")
         
-        # Filter out "Other disorders" from the data
-        filtered_df = table13_df[
-            (table13_df['Year'] == selected_year) & 
-            (table13_df['Sex'] == selected_sex) &
-            (table13_df['Diagnosis'].isin(selected_diagnoses)) &
-            (table13_df['Diagnosis'] != 'Other disorders') &  # Exclude "Other disorders"
-            (table13_df['Age_Group'] != '5-24')  # Exclude total age group for cleaner heat map
-        ].copy()
+        # Slice the year x sex x diagnosis x age cube instead of filtering the long table
+        cube = get_table13_cube(table13_df)
+        age_order = ['5-9', '10-14', '15-17', '18-24']  # Exclude total age group for cleaner heat map
+        diagnoses = [d for d in selected_diagnoses if d != 'Other disorders']  # Exclude "Other disorders"
         
-        print(f"🔍 Filtered to {len(filtered_df)} records")
+        if cube.position('Year', selected_year) is None or cube.position('Sex', selected_sex) is None:
+            rows = np.empty(0, dtype=np.intp)
+        else:
+            present = cube.present_view(Year=selected_year, Sex=selected_sex)
+            age_positions = cube.positions('Age_Group', age_order)
+            rows = cube.positions('Diagnosis', diagnoses)
+            # Keep diagnoses with at least one age group on record, like a pivot of the rows would
+            rows = rows[present[np.ix_(rows, age_positions)].any(axis=1)]
         
-        if filtered_df.empty:
-            print("❌ No data after filtering")
-            return create_placeholder_chart(f"No clinical data available for {selected_year}, {selected_sex}")
+        logger.debug("🔍 Filtered to %s diagnoses", len(rows))
         
-        # Create pivot table for heat map
-        heatmap_data = filtered_df.pivot(index='Diagnosis', columns='Age_Group', values='Rate')
+        if len(rows) == 0:
+            logger.debug("❌ No data after filtering")
+            return create_placeholder_chart(f"No clinical data available for {selected_year}, {selected_sex}")
         
-        # Ensure consistent column order
-        age_order = ['5-9', '10-14', '15-17', '18-24']
-        heatmap_data = heatmap_data.reindex(columns=age_order)
+        # Diagnosis x age group rates for the selected year and sex
+        rates = cube.view('Rate', Year=selected_year, Sex=selected_sex)
+        diagnosis_labels = cube.labels('Diagnosis')
+        age_labels = cube.labels('Age_Group')
+        heatmap_values = rates[np.ix_(rows, age_positions)]
+        diagnoses_shown = np.asarray(diagnosis_labels, dtype=object)[rows]
+        age_groups_shown = np.asarray(age_labels, dtype=object)[age_positions]
         
         # Always use linear scale (simplified)
-        display_values = heatmap_data.copy()
+        display_values = heatmap_values
         scale_title = "Rate per 100,000"
         
         # Create custom color scale (blue to red)
@@ -751,114 +821,89 @@ def create_clinical_diagnostic_heatmap(selected_year, selected_sex, selected_dia
                      [1.0, '#D32F2F']]   # Dark red (high)
         
         # Create heat map
-        fig = go.Figure(data=go.Heatmap(
-            z=display_values.values,
-            x=display_values.columns,
-            y=display_values.index,
+        heatmap = dict(
+            type='heatmap',
+            z=display_values,
+            x=age_groups_shown,
+            y=diagnoses_shown,
             colorscale=colorscale,
             hovertemplate='<b>%{y}</b><br>' +
                          'Age Group: %{x}<br>' +
                          f'Sex: {selected_sex}<br>' +
                          'Rate: %{customdata:.0f} per 100k<br>' +
                          '<extra></extra>',
-            customdata=heatmap_data.values,  # Use original values for hover
+            customdata=heatmap_values,  # Use original values for hover
+            # Rates printed in every cell; with no font colour set, Plotly
+            # picks black or white against each cell's background
+            texttemplate='%{z:.0f}',
+            textfont=dict(size=11, family="Arial Black"),
             colorbar=dict(
-                title=scale_title,
+                title=dict(text=scale_title),
                 thickness=15,
                 len=0.9
             )
-        ))
+        )
         
-        # Add text annotations with actual rates
-        annotations = []
-        for i, diagnosis in enumerate(display_values.index):
-            for j, age_group in enumerate(display_values.columns):
-                rate = heatmap_data.iloc[i, j]
-                if not pd.isna(rate):
-                    # Choose text color based on background intensity
-                    text_color = 'white' if rate > 150 else 'black'
-                    annotations.append(
-                        dict(
-                            x=age_group,
-                            y=diagnosis,
-                            text=f'{rate:.0f}',
-                            showarrow=False,
-                            font=dict(color=text_color, size=11, family="Arial Black")
-                        )
-                    )
-        
-        # Update layout
-        fig.update_layout(
-            title=f'Clinical Diagnostic Patterns by Age Group - {selected_sex}, {selected_year}<br><sub>Mental Health Hospitalization Rates per 100,000</sub>',
-            xaxis_title='Age Group',
-            yaxis_title='Diagnosis Category',
+        fig = _figure([heatmap], dict(
+            title=dict(text=f'Clinical Diagnostic Patterns by Age Group - {selected_sex}, {selected_year}<br><sub>Mental Health Hospitalization Rates per 100,000</sub>'),
+            xaxis=dict(title=dict(text='Age Group'), side='bottom'),
+            yaxis=dict(title=dict(text='Diagnosis Category'), tickmode='linear'),
             font=dict(size=12),
             height=600,
             width=900,
-            annotations=annotations,
             plot_bgcolor='white',
             paper_bgcolor='white'
-        )
-        
-        # Style axes
-        fig.update_xaxes(side='bottom')
-        fig.update_yaxes(tickmode='linear')
+        ))
         
-        print("✅ Clinical diagnostic heatmap created successfully")
+        logger.debug("✅ Clinical diagnostic heatmap created successfully")
         return fig
         
     except Exception as e:
-        print(f"❌ ERROR creating clinical diagnostic heatmap: {str(e)}")
-        import traceback
-        print(f"🔍 Full error traceback:")
-        traceback.print_exc()
-        return create_placeholder_chart(f"Error creating heatmap: {str(e)}")
+        logger.exception("❌ ERROR creating clinical diagnostic heatmap: %s", e)
+        skip_response_cache()
 
+@cached_figure()
 def create_income_gradient_chart(table12_df):
     """Create simplified income gradient multi-line chart"""
-    print(f"🔄 Creating simplified income gradient chart")
+    logger.info("🔄 Creating simplified income gradient chart", extra=SAMPLED)
     
     try:
         if table12_df.empty:
-            print("❌ Table 12 DataFrame is empty")
+            logger.warning("❌ Table 12 DataFrame is empty")
             return create_placeholder_chart("Income Gradient Analysis - Data not available")
         
-        print(f"✅ Table 12 has {len(table12_df)} records")
+        logger.debug("✅ Table 12 has %s records", len(table12_df))
         
-        # Color mapping for income quintiles (red to green gradient)
-        quintile_colors = {
-            'Q1': '#E74C3C',  # Red (highest rates, lowest income)
-            'Q2': '#FF8C00',  # Orange
-            'Q3': '#FFD700',  # Yellow/Gold
-            'Q4': '#90EE90',  # Light Green
-            'Q5': '#228B22'   # Green (lowest rates, highest income)
-        }
+        # Rows of each quintile from one groupby pass over the year-sorted table
+        sorted_df = table12_df.sort_values('Year', kind='stable')
+        years = sorted_df['Year'].to_numpy()
+        rates = sorted_df['Rate'].to_numpy()
+        quintile_rows = sorted_df.groupby('Income_Quintile', observed=True).indices
         
         # Create multi-line chart (always absolute rates)
-        fig = go.Figure()
+        traces = []
         
         for quintile in ['Q1', 'Q2', 'Q3', 'Q4', 'Q5']:
-            quintile_data = table12_df[table12_df['Income_Quintile'] == quintile].sort_values('Year')
-            
-            if not quintile_data.empty:
+            if quintile in quintile_rows:
+                rows = quintile_rows[quintile]
                 # Determine line width - make Q1 and Q5 thicker to emphasize endpoints
                 line_width = 4 if quintile in ['Q1', 'Q5'] else 3
                 
-                fig.add_trace(go.Scatter(
-                    x=quintile_data['Year'],
-                    y=quintile_data['Rate'],
+                traces.append(dict(
+                    type='scatter',
+                    x=years[rows],
+                    y=rates[rows],
                     mode='lines+markers',
-                    name=f'{quintile} ({"Lowest Income" if quintile=="Q1" else "Lower-Middle Income" if quintile=="Q2" else "Middle Income" if quintile=="Q3" else "Upper-Middle Income" if quintile=="Q4" else "Highest Income"})',
-                    line=dict(color=quintile_colors[quintile], width=line_width),
+                    name=QUINTILE_LABELS[quintile],
+                    line=dict(color=QUINTILE_COLORS[quintile], width=line_width),
                     marker=dict(size=8),
                     hovertemplate=f'<b>Income {quintile}</b><br>Year: %{{x}}<br>Rate: %{{y:.0f}} per 100k<extra></extra>'
                 ))
         
-        # Update layout
-        fig.update_layout(
-            title='Mental Health Hospitalizations by Income Quintile (Canada)',
-            xaxis_title='Fiscal Year',
-            yaxis_title='Rate per 100,000 population',
+        fig = _figure(traces, dict(
+            title=dict(text='Mental Health Hospitalizations by Income Quintile (Canada)'),
+            xaxis=dict(title=dict(text='Fiscal Year'), showgrid=True, gridwidth=1, gridcolor='lightgray'),
+            yaxis=dict(title=dict(text='Rate per 100,000 population'), showgrid=True, gridwidth=1, gridcolor='lightgray'),
             plot_bgcolor='white',
             paper_bgcolor='white',
             font=dict(size=12),
@@ -872,18 +917,11 @@ def create_income_gradient_chart(table12_df):
             ),
             margin=dict(r=200),
             height=600
-        )
-        
-        # Add grid lines
-        fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='lightgray')
-        fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='lightgray')
+        ))
         
-        print("✅ Income gradient chart created successfully")
+        logger.debug("✅ Income gradient chart created successfully")
         return fig
         
     except Exception as e:
-        print(f"❌ ERROR creating income gradient chart: {str(e)}")
-        import traceback
-        print(f"🔍 Full error traceback:")
-        traceback.print_exc()
-        return create_placeholder_chart(f"Error creating chart: {str(e)}")
\ No newline at end of file
+        logger.exception("❌ ERROR creating income gradient chart: %s", e)
+        skip_response_cache()
\ No newline at end of file
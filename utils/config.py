@@ -3,6 +3,8 @@ Configuration file for CIHI Mental Health Dashboard
 Contains colors, styles, and constants
 """
 
+import os
+
 # Color scheme
 COLORS = {
     'primary': '#2E86AB',
@@ -30,40 +32,7 @@ STYLE_CARD = {
     'boxShadow': '0 2px 4px rgba(0,0,0,0.1)'
 }
 
-# Enhanced navigation button styles with better contrast
-STYLE_NAV_BUTTON_BASE = {
-    'display': 'flex',
-    'alignItems': 'center',
-    'padding': '16px 24px',
-    'borderRadius': '12px',
-    'transition': 'all 0.3s ease',
-    'margin': '0 16px 8px 16px',
-    'backgroundColor': 'transparent',
-    'border': '2px solid transparent',
-    'color': 'white',
-    'textDecoration': 'none',
-    'fontSize': '15px',
-    'fontWeight': '600'
-}
-
-STYLE_NAV_BUTTON_ACTIVE = {
-    'display': 'flex',
-    'alignItems': 'center',
-    'padding': '16px 24px',
-    'borderRadius': '12px',
-    'transition': 'all 0.3s ease',
-    'margin': '0 16px 8px 16px',
-    'backgroundColor': 'white',
-    'border': '2px solid #FFD700',
-    'color': COLORS['primary'],
-    'textDecoration': 'none',
-    'fontSize': '15px',
-    'fontWeight': '700',
-    'boxShadow': '0 4px 12px rgba(0, 0, 0, 0.2)'
-}
-
-# Legacy style for backward compatibility
-STYLE_NAV_BUTTON = STYLE_NAV_BUTTON_BASE
+# Sidebar navigation styles, including the active item, are in assets/style.css
 
 # Data configuration
 DATA_FILES = {
@@ -71,10 +40,139 @@ DATA_FILES = {
     'table4': 'data/table_04.json',
     'table10': 'data/table_10.json',
     'table11': 'data/table_11.json',
-    'table12': 'data/table_12.json',
-    'table13': 'data/table_13.json'
+    'table12': 'data/table_12.json'
 }
 
+# Path to the CIHI data tables workbook (.xlsx). When set, tables are read
+# from the workbook (see utils/excel_ingest.py) instead of the JSON files in data/
+DATA_WORKBOOK = None
+
+# Parsed tables are cached here as binary columns, keyed by source file hash
+TABLE_CACHE_DIR = 'data/.cache'
+TABLE_CACHE_ENABLED = True
+# Tables loaded from the cache are read-only memory maps of its column files,
+# shared by every worker process instead of copied into each
+TABLE_MMAP_ENABLED = True
+
+# Application factory (app.create_app) settings; a config passed to it overrides them.
+# DEBUG turns on Dash's debug mode and dev tools (python app.py does);
+# PRELOAD_DATA loads every table and warms the figure cache inside the factory,
+# so a gunicorn master started with --preload shares them with its workers (wsgi.py)
+DEBUG = False
+PRELOAD_DATA = False
+APP_SETTINGS = ['DEBUG', 'PRELOAD_DATA', 'WARMUP_ENABLED', 'PREFETCH_DATA', 'PREFETCH_DELAY_SECONDS', 'DATA_RELOAD_ENABLED',
+                'RESPONSE_CACHE_ENABLED', 'RESPONSE_COMPRESSION_ENABLED', 'RESULT_STORE_ENABLED',
+                'SINGLE_FLIGHT_ENABLED']
+
+# Load the remaining tables in the background once the server is up
+PREFETCH_DATA = True
+PREFETCH_DELAY_SECONDS = 1.0
+
+# Poll data/ for changed source files and swap in re-parsed tables without a restart
+DATA_RELOAD_ENABLED = True
+DATA_RELOAD_INTERVAL_SECONDS = 5.0
+
+# Provinces and territories in the order the trends chart checklist offers them;
+# each keeps the trend line colour of its position here, whatever is selected
+PROVINCES = ['Alberta', 'British Columbia', 'Manitoba', 'New Brunswick', 'Newfoundland and Labrador',
+             'Northwest Territories', 'Nova Scotia', 'Nunavut', 'Ontario', 'Prince Edward Island', 'Quebec',
+             'Saskatchewan', 'Yukon', 'Canada']
+
+# Table 13 is published as one file per fiscal year, e.g. data/table_13-2021-2022.json,
+# so it has no DATA_FILES entry: every file matching the pattern is discovered at load time
+TABLE13_FILE_PATTERN = 'data/table_13-*.json'
+
+# Logging: set CIHI_LOG_LEVEL=WARNING in production to drop the per-callback messages
+LOG_LEVEL = os.environ.get('CIHI_LOG_LEVEL', 'INFO')
+LOG_FORMAT = '%(asctime)s %(levelname)-7s %(name)s | %(message)s'
+# Only 1 in N of each per-callback message ("Creating chart ...") is logged
+LOG_SAMPLE_EVERY = 10
+
+# Built chart figures are memoized per selection and data version; the
+# least recently used are evicted beyond either bound. The byte bound is an
+# estimate of everything an entry keeps alive: the Plotly figure, its JSON
+# payload and the payload's plain-dict copy
+FIGURE_CACHE_ENABLED = True
+FIGURE_CACHE_MAX_ENTRIES = 512
+FIGURE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# JSON encoder for Plotly and Dash responses: 'orjson' (optional dependency,
+# much faster), 'json', or 'auto' for orjson when it is installed
+JSON_ENGINE = 'auto'
+# Hit/miss statistics are logged every N lookups
+FIGURE_CACHE_STATS_EVERY = 500
+
+# Page layouts are built once per page and data snapshot and served from memory
+LAYOUT_CACHE_ENABLED = True
+
+# Callback responses are cached per request and data version, and sent with an
+# ETag and this Cache-Control max-age (seconds) so a reverse proxy can serve repeats
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+RESPONSE_CACHE_MAX_AGE = 60
+# Text responses at least this large are sent brotli (optional dependency) or
+# gzip compressed when the client accepts it
+RESPONSE_COMPRESSION_ENABLED = True
+RESPONSE_COMPRESSION_MIN_BYTES = 1024
+RESPONSE_GZIP_LEVEL = 6
+RESPONSE_BROTLI_QUALITY = 5
+# Callback responses are also kept in a SQLite database shared by every worker
+# process and kept across restarts; entries expire after the TTL and the least
+# recently used are deleted beyond the byte budget (checked every N writes)
+RESULT_STORE_ENABLED = True
+RESULT_STORE_PATH = os.path.join(TABLE_CACHE_DIR, 'results.sqlite3')
+RESULT_STORE_TTL_SECONDS = 7 * 24 * 3600
+RESULT_STORE_MAX_BYTES = 256 * 1024 * 1024
+RESULT_STORE_PRUNE_EVERY = 100
+# Stored results are keyed by a fingerprint of the app's code and library
+# versions; bump this to discard them after a change the fingerprint misses
+RESULT_STORE_SCHEMA = 1
+# Entries of other builds are deleted once unread for this long, so workers of
+# the old and new build can share the store during a rolling deploy
+RESULT_STORE_BUILD_GRACE_SECONDS = 3600
+# Identical callback requests arriving together are computed once: the first
+# computes, duplicates (in any worker process) wait up to the timeout for its
+# response. Workers coordinate through one lock file per request in the directory
+SINGLE_FLIGHT_ENABLED = True
+SINGLE_FLIGHT_DIR = os.path.join(TABLE_CACHE_DIR, 'flights')
+SINGLE_FLIGHT_TIMEOUT_SECONDS = 30.0
+
+# Ship every year of the pie, income donut and demographics charts with the
+# page and switch years in the browser instead of calling back to the server
+CLIENTSIDE_YEAR_SWITCHING = True
+
+# Startup warm-up: every combination of the closed-domain controls is rendered
+# into the figure cache before /ready reports the server ready
+WARMUP_ENABLED = True
+# Executor of the pre-fork warm-up (create_app with PRELOAD_DATA); the warm-up
+# of a process that is already serving always runs on threads
+WARMUP_EXECUTOR = 'process'
+WARMUP_MAX_WORKERS = None  # defaults to the number of CPUs
+
+# Parallel loading of source files by load_all_tables():
+# 'process' parses files on separate cores, 'thread' avoids process start-up cost.
+# Loads started from a background thread of a serving process (prefetch,
+# warm-up, data reload) always use threads
+LOAD_EXECUTOR = 'process'
+LOAD_MAX_WORKERS = None  # defaults to the number of CPUs
+
+# Rows accumulated in Python lists before being flushed to a typed column chunk
+PARSE_CHUNK_ROWS = 65536
+
 # Years configuration
 FISCAL_YEARS = ["2018-2019", "2019-2020", "2020-2021", "2021-2022", "2022-2023", "2023-2024"]
-FISCAL_YEARS_DISPLAY = ["2018-19", "2019-20", "2020-21", "2021-22", "2022-23", "2023-24"]
\ No newline at end of file
+FISCAL_YEARS_DISPLAY = ["2018-19", "2019-20", "2020-21", "2021-22", "2022-23", "2023-24"]
+
+# Table 13 age group keys and their display labels
+TABLE13_AGE_KEYS = ['age_5_9', 'age_10_14', 'age_15_17', 'age_18_24', 'age_5_24']
+TABLE13_AGE_LABELS = ['5-9', '10-14', '15-17', '18-24', '5-24']
+# Diagnosis categories offered (and selected by default) on the Clinical Patterns page
+CLINICAL_DIAGNOSES = ['Neurocognitive disorders', 'Substance-related disorders', 'Schizophrenic and psychotic disorders',
+                      'Mood disorders', 'Anxiety disorders', 'Personality disorders']
+# Dimension columns are stored as categoricals with their categories in this
+# order; values not listed here follow in order of first appearance
+CATEGORY_ORDERS = {
+    'Year': FISCAL_YEARS_DISPLAY,
+    'Age_Group': TABLE13_AGE_LABELS,
+    'Sex': ['Female', 'Male', 'Total'],
+    'Income_Quintile': ['Q1', 'Q2', 'Q3', 'Q4', 'Q5']
+}
@@ -3,120 +3,567 @@ Data loading functions for CIHI Mental Health Dashboard
 """
 
 import pandas as pd
+import numpy as np
+import glob
 import json
 import os
-import traceback
-from utils.config import DATA_FILES, FISCAL_YEARS, FISCAL_YEARS_DISPLAY
+import re
+import time
+import logging
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from utils.config import DATA_FILES, TABLE13_FILE_PATTERN, DATA_WORKBOOK, PARSE_CHUNK_ROWS, LOAD_EXECUTOR, LOAD_MAX_WORKERS, FISCAL_YEARS, FISCAL_YEARS_DISPLAY, TABLE13_AGE_KEYS, TABLE13_AGE_LABELS, TABLE_CACHE_ENABLED, CATEGORY_ORDERS
+from utils.table_cache import load_cached_table, store_cached_table, source_fingerprints, cache_lock
+
+logger = logging.getLogger(__name__)
+
+def _clean_age_label(age_group):
+    """Turn 'Age 5-9 years' style labels into '5-9'"""
+    return age_group.replace('Age ', '').replace(' years', '')
+
+def _quintile_label(income_quintile):
+    """Turn a raw income quintile number into a 'Q1' style label"""
+    return f"Q{income_quintile}"
+
+def _is_total_age_group(entry):
+    """Table 10 rows for the total age group are left out of the dashboard"""
+    return 'Total age' in entry['age_group']
+
+def discover_table13_files(pattern=TABLE13_FILE_PATTERN):
+    """
+    Find every annual Table 13 file, oldest first.
+
+    The fiscal year comes from the file name: table_13-2021-2022.json -> '2021-22'.
+    """
+    files = []
+    for file_path in sorted(glob.glob(pattern)):
+        match = re.search(r'(\d{4})-(\d{4})\.json$', file_path)
+        if not match:
+            logger.warning("⚠️ WARNING: Skipping Table 13 file with no fiscal year in its name: %s", file_path)
+            continue
+        files.append((file_path, {'Year': f"{match.group(1)}-{match.group(2)[2:]}"}))
+    return files
+
+# Fiscal year columns in the source JSON, e.g. "2018-2019" -> "2018-19"
+YEAR_EXPANSION = {'column': 'Year', 'keys': FISCAL_YEARS, 'labels': FISCAL_YEARS_DISPLAY}
+
+# Nested age group objects in the Table 13 source JSON, e.g. "age_5_9" -> "5-9"
+AGE_EXPANSION = {'column': 'Age_Group', 'keys': TABLE13_AGE_KEYS, 'labels': TABLE13_AGE_LABELS}
+
+CI_MEASURES = [('Rate', 'Rate'), ('CI_Lower', 'CI_lower'), ('CI_Upper', 'CI_upper')]
+
+# Declarative description of every table the dashboard reads.
+#   files       - list of (path, constant columns for every row of that file),
+#                 or a function returning that list when files are discovered
+#   file_columns - names of the per-file constant columns, if any
+#   dimensions  - list of (column, source key, optional value transform)
+#   expand      - nested keys of each entry that become one row each
+#   measures    - list of (column, source key) read from each nested object
+#   skip        - optional predicate for entries to leave out
+#   stream      - parse the 'data' array incrementally instead of json.load
+# Output columns are ordered: file constants, dimensions, expansion, measures.
+TABLE_SCHEMAS = {
+    'table3': {
+        'description': 'provincial trends',
+        'files': [(DATA_FILES['table3'], {})],
+        'dimensions': [('Province', 'province', None)],
+        'expand': YEAR_EXPANSION,
+        'measures': [('N', 'N'), ('Rate', 'Rate')]
+    },
+    'table4': {
+        'description': 'other conditions',
+        'files': [(DATA_FILES['table4'], {})],
+        'dimensions': [('Province', 'province', None)],
+        'expand': YEAR_EXPANSION,
+        'measures': [('N', 'N'), ('Rate', 'Rate')]
+    },
+    'table10': {
+        'description': 'age and gender analysis',
+        'files': [(DATA_FILES['table10'], {})],
+        'dimensions': [('Age_Group', 'age_group', _clean_age_label), ('Sex', 'sex', None)],
+        'expand': YEAR_EXPANSION,
+        'measures': CI_MEASURES,
+        'skip': _is_total_age_group
+    },
+    'table11': {
+        'description': 'urban vs rural analysis',
+        'files': [(DATA_FILES['table11'], {})],
+        'dimensions': [('Residence_Type', 'residence_type', None)],
+        'expand': YEAR_EXPANSION,
+        'measures': CI_MEASURES
+    },
+    'table12': {
+        'description': 'income quintile analysis',
+        'files': [(DATA_FILES['table12'], {})],
+        'dimensions': [('Income_Quintile', 'income_quintile', _quintile_label)],
+        'expand': YEAR_EXPANSION,
+        'measures': CI_MEASURES
+    },
+    'table13': {
+        'description': 'clinical diagnostic patterns',
+        'files': discover_table13_files,
+        'file_columns': ['Year'],
+        'dimensions': [('Diagnosis', 'diagnosis', None), ('Sex', 'sex', None)],
+        'expand': AGE_EXPANSION,
+        'measures': CI_MEASURES,
+        'stream': True
+    }
+}
+
+def get_schema_files(schema):
+    """Return the (path, constants) list of a schema, running discovery if needed"""
+    files = schema['files']
+    return files() if callable(files) else files
+
+def get_table_files(table_name):
+    """
+    Return the (path, constants) sources of a table.
+
+    When DATA_WORKBOOK is set every table is read from the CIHI workbook
+    instead of the hand-converted JSON files.
+    """
+    if DATA_WORKBOOK:
+        return [(DATA_WORKBOOK, {})]
+    return get_schema_files(TABLE_SCHEMAS[table_name])
+
+def get_table_columns(schema):
+    """Return the output column order for a table schema"""
+    return (list(schema.get('file_columns', []))
+            + [column for column, _, _ in schema['dimensions']]
+            + [schema['expand']['column']]
+            + [column for column, _ in schema['measures']])
+
+_JSON_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r'\s*')
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+class _StreamReader:
+    """Incrementally buffered text reader that decodes one JSON value at a time"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, min_chars):
+        # Drop consumed text so the buffer only ever holds the current value
+        if self.pos:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        while not self.eof and len(self.buffer) < min_chars:
+            chunk = self.f.read(max(self.chunk_size, min_chars - len(self.buffer)))
+            if not chunk:
+                self.eof = True
+            self.buffer += chunk
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                raise ValueError("Unexpected end of JSON document")
+            self._fill(1)
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}, found '{self.buffer[self.pos]}'")
+        self.pos += 1
+
+    def decode(self):
+        """Decode the next complete JSON value, reading more text as needed"""
+        self.peek()
+        wanted = len(self.buffer) + self.chunk_size
+        while True:
+            try:
+                value, end = _JSON_DECODER.raw_decode(self.buffer, self.pos)
+                # A number could be cut off at the buffer edge ("4." of "4.5");
+                # only trust it once a non-numeric character follows it
+                if self.eof or (end < len(self.buffer) and self.buffer[end] not in _NUMBER_CHARS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill(wanted - self.pos)
+            wanted = (len(self.buffer) - self.pos) * 2 + self.chunk_size
+
+def iter_json_array(file_path, array_key='data', chunk_size=64 * 1024):
+    """
+    Yield the items of a top-level array (e.g. the 'data' array) one at a time.
+
+    Only the item currently being decoded is held in memory, so the cost of
+    reading a file no longer grows with the size of the whole document.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        reader = _StreamReader(f, chunk_size)
+        reader.expect('{')
+        while reader.peek() != '}':
+            key = reader.decode()
+            reader.expect(':')
+            if key != array_key:
+                reader.decode()  # skip metadata and other top-level values
+            else:
+                reader.expect('[')
+                if reader.peek() == ']':
+                    return
+                while True:
+                    yield reader.decode()
+                    if reader.peek() == ']':
+                        return
+                    reader.expect(',')
+            if reader.peek() == ',':
+                reader.expect(',')
+    raise KeyError(f"No '{array_key}' array found in {file_path}")
+
+def parse_table_entries(schema, entries, constants, chunk_rows=PARSE_CHUNK_ROWS):
+    """
+    Turn source entries into typed column arrays.
+
+    Dimension values are collected once per entry and the expanded rows only
+    record integer positions, so no per-row dicts are ever built. Rows are
+    flushed to NumPy chunks every chunk_rows rows to keep the Python-object
+    working set bounded when entries are streamed.
+    """
+    dimensions = schema['dimensions']
+    expand = schema['expand']
+    measures = schema['measures']
+    skip = schema.get('skip')
+    expand_labels = np.asarray(expand['labels'], dtype=object)
+
+    chunks = []
+    entry_values = {column: [] for column, _, _ in dimensions}
+    entry_positions = []
+    expand_positions = []
+    measure_values = {column: [] for column, _ in measures}
+
+    def flush():
+        positions = np.asarray(entry_positions, dtype=np.intp)
+        chunk = {}
+        for column, value in constants.items():
+            chunk[column] = np.full(len(positions), value, dtype=object)
+        for column, _, _ in dimensions:
+            chunk[column] = np.asarray(entry_values[column], dtype=object)[positions]
+            entry_values[column].clear()
+        chunk[expand['column']] = expand_labels[np.asarray(expand_positions, dtype=np.intp)]
+        for column, _ in measures:
+            chunk[column] = np.asarray(measure_values[column])
+            measure_values[column].clear()
+        entry_positions.clear()
+        expand_positions.clear()
+        chunks.append(chunk)
+
+    first_dimension = dimensions[0][0]
+    for entry in entries:
+        if skip is not None and skip(entry):
+            continue
+
+        entry_position = len(entry_values[first_dimension])
+        for column, key, transform in dimensions:
+            value = entry[key]
+            entry_values[column].append(transform(value) if transform else value)
+
+        for expand_position, expand_key in enumerate(expand['keys']):
+            if expand_key in entry:
+                nested = entry[expand_key]
+                entry_positions.append(entry_position)
+                expand_positions.append(expand_position)
+                for column, key in measures:
+                    measure_values[column].append(nested[key])
+
+        if len(entry_positions) >= chunk_rows:
+            flush()
+
+    flush()
+    if len(chunks) == 1:
+        return chunks[0]
+    return {column: np.concatenate([chunk[column] for chunk in chunks]) for column in chunks[0]}
+
+def parse_table_file(schema, file_path, constants):
+    """Parse one source JSON file into typed column arrays"""
+    if schema.get('stream'):
+        return parse_table_entries(schema, iter_json_array(file_path), constants)
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return parse_table_entries(schema, data['data'], constants)
+
+def parse_source_file(table_name, file_path, constants):
+    """Parse one source of a table, either a JSON file or the CIHI workbook"""
+    if file_path.lower().endswith(('.xlsx', '.xlsm')):
+        from utils.excel_ingest import parse_workbook_table
+        return parse_workbook_table(file_path, table_name)
+    return parse_table_file(TABLE_SCHEMAS[table_name], file_path, constants)
+
+def to_categorical(values, order=()):
+    """Dictionary-encode a dimension column, categories in the configured order first"""
+    present = pd.unique(values)
+    seen = set(present)
+    listed = [value for value in order if value in seen]
+    listed_set = set(listed)
+    return pd.Categorical(values, categories=listed + [value for value in present if value not in listed_set])
+
+def downcast_measure(values):
+    """
+    Store a measure in a narrower dtype when no value changes.
+
+    Integers go no narrower than int32 so sums such as Total_N keep headroom;
+    floats become float32 only if every value survives the round trip.
+    """
+    if values.dtype.kind in 'iu' and values.dtype.itemsize > 4:
+        limits = np.iinfo(np.int32)
+        if values.size == 0 or (values.min() >= limits.min and values.max() <= limits.max):
+            return values.astype(np.int32)
+    elif values.dtype == np.float64:
+        narrow = values.astype(np.float32)
+        if np.array_equal(narrow.astype(np.float64), values, equal_nan=True):
+            return narrow
+    return values
+
+def build_table(schema, parsed_files):
+    """
+    Concatenate per-file column arrays into a single compact DataFrame.
+
+    Dimension columns become categoricals (see CATEGORY_ORDERS) and measures
+    are downcast where that loses nothing.
+    """
+    if not parsed_files:
+        return pd.DataFrame()
+
+    measures = {column for column, _ in schema['measures']}
+    columns = {}
+    for column in get_table_columns(schema):
+        values = np.concatenate([parsed[column] for parsed in parsed_files])
+        if column in measures:
+            columns[column] = downcast_measure(values)
+        else:
+            columns[column] = to_categorical(values, CATEGORY_ORDERS.get(column, ()))
+    return pd.DataFrame(columns, copy=False)
+
+def table_memory_usage(df):
+    """Bytes held by a table, including the strings behind object columns"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def log_memory_report(tables):
+    """Log the resident memory of each table, largest first"""
+    usage = {table_name: table_memory_usage(df) for table_name, df in tables.items()}
+    logger.info("📊 Resident table memory: %.1f KB across %s tables", sum(usage.values()) / 1024, len(usage))
+    for table_name, n_bytes in sorted(usage.items(), key=lambda item: item[1], reverse=True):
+        df = tables[table_name]
+        logger.info("   %8.1f KB  %-9s %8d rows  %s", n_bytes / 1024, table_name, len(df),
+                    ', '.join(f'{column}:{dtype}' for column, dtype in df.dtypes.astype(str).items()))
+    return usage
+
+def get_table_sources(table_name):
+    """Return the source file paths a table (or the combined table) is built from"""
+    if table_name == 'combined':
+        return get_table_sources('table3') + get_table_sources('table4')
+    return [file_path for file_path, _ in get_table_files(table_name)]
+
+def _cache_lock(use_cache):
+    """
+    Serialize cache lookups and parses across worker processes, so a table is
+    parsed once and every other worker maps the cached copy. Yields whether
+    to use the cache.
+    """
+    return cache_lock() if use_cache else nullcontext(False)
+
+def load_table(table_name, use_cache=TABLE_CACHE_ENABLED):
+    """Load and process any table described in TABLE_SCHEMAS"""
+    with _cache_lock(use_cache) as use_cache:
+        return _load_table(table_name, use_cache)
+
+def _load_table(table_name, use_cache):
+    schema = TABLE_SCHEMAS[table_name]
+    logger.info("🔄 Attempting to load %s data (%s)...", table_name, schema['description'])
+
+    files = get_table_files(table_name)
+    sources = [file_path for file_path, _ in files]
+
+    if use_cache:
+        df = load_cached_table(table_name, sources)
+        if df is not None:
+            logger.info("⚡ Loaded %s from cache: %s", table_name, df.shape)
+            return df
+        fingerprints = source_fingerprints(sources)
 
-def load_table3_data():
-    """Load and process Table 3 data for provincial trends"""
-    print("🔄 Attempting to load Table 3 data...")
-    
     try:
-        # Check if file exists
-        file_path = DATA_FILES['table3']
-        if not os.path.exists(file_path):
-            print(f"❌ ERROR: File not found: {file_path}")
-            print(f"📁 Current working directory: {os.getcwd()}")
-            print(f"📁 Files in current directory: {os.listdir('.')}")
+        parsed_files = []
+        for file_path, constants in files:
+            if not os.path.exists(file_path):
+                logger.error("❌ ERROR: File not found: %s", file_path)
+                continue
+            parsed_files.append(parse_source_file(table_name, file_path, constants))
+
+        if not parsed_files:
+            logger.error("❌ ERROR: No source files found for %s", table_name)
+            logger.error("📁 Current working directory: %s", os.getcwd())
             if os.path.exists('data'):
-                print(f"📁 Files in data directory: {os.listdir('data')}")
+                logger.error("📁 Files in data directory: %s", os.listdir('data'))
             else:
-                print("📁 Data directory does not exist!")
+                logger.error("📁 Data directory does not exist!")
             return pd.DataFrame()
-        
-        print(f"✅ File found: {file_path}")
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        print(f"✅ JSON loaded successfully")
-        print(f"📊 Data keys: {list(data.keys())}")
-        
-        # Extract data and create DataFrame
-        records = []
-        
-        print(f"📅 Processing years: {FISCAL_YEARS}")
-        
-        for i, province_data in enumerate(data['data']):
-            province = province_data['province']
-            print(f"🔄 Processing province {i+1}: {province}")
-            
-            for year, year_display in zip(FISCAL_YEARS, FISCAL_YEARS_DISPLAY):
-                if year in province_data:
-                    records.append({
-                        'Province': province,
-                        'Year': year_display,
-                        'N': province_data[year]['N'],
-                        'Rate': province_data[year]['Rate']
-                    })
-        
-        df = pd.DataFrame(records)
-        print(f"✅ DataFrame created successfully")
-        print(f"📊 Shape: {df.shape}")
-        print(f"📊 Columns: {list(df.columns)}")
-        print(f"📊 Sample data:")
-        print(df.head())
-        
+
+        df = build_table(schema, parsed_files)
+        logger.info("✅ %s DataFrame created successfully", table_name)
+        logger.debug("📊 Shape: %s", df.shape)
+
+        if use_cache:
+            store_cached_table(table_name, sources, df, fingerprints=fingerprints)
+
         return df
-    
+
     except Exception as e:
-        print(f"❌ ERROR loading Table 3 data: {str(e)}")
-        print(f"🔍 Full error traceback:")
-        traceback.print_exc()
+        logger.exception("❌ ERROR loading %s data: %s", table_name, e)
         return pd.DataFrame()
 
+def _timed_parse(table_name, file_path, constants):
+    """Parse one source file; runs inside a pool worker"""
+    start = time.perf_counter()
+    columns = parse_source_file(table_name, file_path, constants)
+    return columns, time.perf_counter() - start
+
+def create_executor(executor, max_workers, thread_name_prefix='table-loader'):
+    """Create a process pool, or a thread pool if executor is 'thread' or processes are unavailable"""
+    if executor == 'process':
+        try:
+            return ProcessPoolExecutor(max_workers=max_workers)
+        except (OSError, NotImplementedError) as e:
+            logger.warning("⚠️ WARNING: Process pool unavailable (%s), using threads", e)
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+
+def load_all_tables(table_names=None, executor=LOAD_EXECUTOR, max_workers=LOAD_MAX_WORKERS,
+                    use_cache=TABLE_CACHE_ENABLED, include_combined=True):
+    """
+    Load several tables at once, parsing their source files in parallel.
+
+    Tables with a valid cache entry are read directly. Every remaining source
+    file (including each Table 13 year file) becomes its own pool task, and
+    results are merged back in schema file order so the output never depends
+    on which task finished first.
+
+    Returns (tables, timings) where tables maps table name to DataFrame and
+    timings is a list of per-file dicts with table, file, source, rows and
+    seconds. With the cache on, the whole load holds cache_lock(), so workers
+    refreshing the same change wait for one parse and then read its output.
+    """
+    with _cache_lock(use_cache) as use_cache:
+        return _load_all_tables(table_names, executor, max_workers, use_cache, include_combined)
+
+def _load_all_tables(table_names, executor, max_workers, use_cache, include_combined):
+    table_names = list(table_names or TABLE_SCHEMAS)
+    start = time.perf_counter()
+    tables = {}
+    timings = []
+    pending = {}
+    fingerprints = {}
+
+    for table_name in table_names:
+        files = get_table_files(table_name)
+        sources = [file_path for file_path, _ in files]
+        if use_cache:
+            cache_start = time.perf_counter()
+            df = load_cached_table(table_name, sources)
+            if df is not None:
+                tables[table_name] = df
+                timings.append({'table': table_name, 'file': ', '.join(sources), 'source': 'cache',
+                                'rows': len(df), 'seconds': time.perf_counter() - cache_start})
+                continue
+            fingerprints[table_name] = source_fingerprints(sources)
+
+        existing = [(file_path, constants) for file_path, constants in files if os.path.exists(file_path)]
+        for file_path, _ in files:
+            if not os.path.exists(file_path):
+                logger.error("❌ ERROR: File not found: %s", file_path)
+        pending[table_name] = existing
+
+    if any(pending.values()):
+        n_tasks = sum(len(files) for files in pending.values())
+        workers = min(max_workers or os.cpu_count() or 1, n_tasks)
+        logger.info("🔄 Parsing %s source files with %s %s workers...", n_tasks, workers, executor)
+
+        with create_executor(executor, workers) as pool:
+            futures = {
+                table_name: [pool.submit(_timed_parse, table_name, file_path, constants)
+                             for file_path, constants in files]
+                for table_name, files in pending.items()
+            }
+
+            for table_name, files in pending.items():
+                try:
+                    parsed_files = []
+                    for (file_path, _), future in zip(files, futures[table_name]):
+                        columns, seconds = future.result()
+                        parsed_files.append(columns)
+                        rows = len(next(iter(columns.values()))) if columns else 0
+                        timings.append({'table': table_name, 'file': file_path, 'source': 'parsed',
+                                        'rows': rows, 'seconds': seconds})
+
+                    df = build_table(TABLE_SCHEMAS[table_name], parsed_files)
+                    if use_cache:
+                        store_cached_table(table_name, get_table_sources(table_name), df,
+                                           fingerprints=fingerprints[table_name])
+                    tables[table_name] = df
+
+                except Exception as e:
+                    logger.exception("❌ ERROR loading %s data: %s", table_name, e)
+                    tables[table_name] = pd.DataFrame()
+    else:
+        for table_name in pending:
+            tables[table_name] = pd.DataFrame()
+
+    if include_combined and 'table3' in tables and 'table4' in tables:
+        combined_start = time.perf_counter()
+        combined_fingerprints = None
+        if 'table3' in fingerprints and 'table4' in fingerprints:
+            combined_fingerprints = fingerprints['table3'] + fingerprints['table4']
+        tables['combined'] = load_combined_data(tables['table3'], tables['table4'], use_cache=use_cache,
+                                                fingerprints=combined_fingerprints)
+        timings.append({'table': 'combined', 'file': '(table3 + table4)', 'source': 'derived',
+                        'rows': len(tables['combined']), 'seconds': time.perf_counter() - combined_start})
+
+    log_load_timings(timings, time.perf_counter() - start)
+    return {table_name: tables[table_name] for table_name in table_names + ['combined'] if table_name in tables}, timings
+
+def log_load_timings(timings, total_seconds):
+    """Log per-file load timings, slowest first"""
+    logger.info("⏱️ Loaded %s sources in %.1f ms", len(timings), total_seconds * 1000)
+    for timing in sorted(timings, key=lambda t: t['seconds'], reverse=True):
+        logger.info("   %8.1f ms  %-7s %-9s %8d rows  %s", timing['seconds'] * 1000, timing['source'],
+                    timing['table'], timing['rows'], timing['file'])
+
+def load_table3_data():
+    """Load and process Table 3 data for provincial trends"""
+    return load_table('table3')
+
 def load_table4_data():
     """Load and process Table 4 data for other conditions"""
-    print("🔄 Attempting to load Table 4 data...")
-    
-    try:
-        # Check if file exists
-        file_path = DATA_FILES['table4']
-        if not os.path.exists(file_path):
-            print(f"❌ ERROR: File not found: {file_path}")
-            return pd.DataFrame()
-        
-        print(f"✅ File found: {file_path}")
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        print(f"✅ JSON loaded successfully")
-        
-        # Extract data and create DataFrame
-        records = []
-        
-        for i, province_data in enumerate(data['data']):
-            province = province_data['province']
-            print(f"🔄 Processing province {i+1}: {province}")
-            
-            for year, year_display in zip(FISCAL_YEARS, FISCAL_YEARS_DISPLAY):
-                if year in province_data:
-                    records.append({
-                        'Province': province,
-                        'Year': year_display,
-                        'N': province_data[year]['N'],
-                        'Rate': province_data[year]['Rate']
-                    })
-        
-        df = pd.DataFrame(records)
-        print(f"✅ Table 4 DataFrame created successfully")
-        print(f"📊 Shape: {df.shape}")
-        
-        return df
-    
-    except Exception as e:
-        print(f"❌ ERROR loading Table 4 data: {str(e)}")
-        print(f"🔍 Full error traceback:")
-        traceback.print_exc()
-        return pd.DataFrame()
+    return load_table('table4')
+
+def load_table10_data():
+    """Load and process Table 10 data for age and gender analysis"""
+    return load_table('table10')
+
+def load_table11_data():
+    """Load and process Table 11 data for urban vs rural analysis"""
+    return load_table('table11')
+
+def load_table12_data():
+    """Load and process Table 12 data for income quintile analysis"""
+    return load_table('table12')
+
+def load_table13_data():
+    """Load and process Table 13 data for clinical diagnostic patterns"""
+    return load_table('table13')
 
 def combine_mental_health_other_data(table3_df, table4_df):
     """Combine mental health and other conditions data for comparison"""
     try:
         if table3_df.empty or table4_df.empty:
-            print("❌ One or both dataframes are empty")
+            logger.warning("❌ One or both dataframes are empty")
             return pd.DataFrame()
         
         # Merge the dataframes
@@ -141,16 +588,58 @@ def combine_mental_health_other_data(table3_df, table4_df):
         combined['Total_Rate'] = combined['MH_Rate'] + combined['Other_Rate']
         combined['MH_Percentage'] = (combined['MH_N'] / combined['Total_N'] * 100).round(1)
         
-        print(f"✅ Combined data created successfully")
-        print(f"📊 Combined shape: {combined.shape}")
+        logger.info("✅ Combined data created successfully")
+        logger.debug("📊 Combined shape: %s", combined.shape)
         
         return combined
     
     except Exception as e:
-        print(f"❌ ERROR combining data: {str(e)}")
-        traceback.print_exc()
+        logger.exception("❌ ERROR combining data: %s", e)
         return pd.DataFrame()
 
+def load_combined_data(table3_df=None, table4_df=None, use_cache=TABLE_CACHE_ENABLED, get_table=None,
+                       fingerprints=None):
+    """
+    Load the combined Table 3/Table 4 comparison data, using the cache when possible.
+
+    Tables 3 and 4 are only needed on a cache miss; when they are not passed in
+    they are fetched with get_table (defaults to load_table). fingerprints are
+    those of the Table 3 and 4 sources taken before the tables were read; the
+    sources are fingerprinted here, before fetching the tables, when not given.
+    """
+    sources = get_table_sources('combined')
+    if use_cache:
+        with cache_lock() as use_cache:
+            combined = _load_cached_combined(sources) if use_cache else None
+        if combined is not None:
+            return combined
+        if use_cache and fingerprints is None:
+            fingerprints = source_fingerprints(sources)
+
+    # Not under the lock: get_table may wait for a table another thread is
+    # loading, and that thread needs the lock to finish
+    if get_table is None:
+        get_table = lambda table_name: load_table(table_name, use_cache=use_cache)
+    if table3_df is None:
+        table3_df = get_table('table3')
+    if table4_df is None:
+        table4_df = get_table('table4')
+
+    with _cache_lock(use_cache) as use_cache:
+        # Another worker may have stored it while the tables were fetched
+        combined = _load_cached_combined(sources) if use_cache else None
+        if combined is None:
+            combined = combine_mental_health_other_data(table3_df, table4_df)
+            if use_cache:
+                store_cached_table('combined', sources, combined, fingerprints=fingerprints)
+    return combined
+
+def _load_cached_combined(sources):
+    combined = load_cached_table('combined', sources)
+    if combined is not None:
+        logger.info("⚡ Loaded combined data from cache: %s", combined.shape)
+    return combined
+
 def get_province_options(df):
     """Get province options for dropdown"""
     if df.empty:
@@ -159,223 +648,6 @@ def get_province_options(df):
     provinces = sorted(df['Province'].unique())
     return [{'label': province, 'value': province} for province in provinces]
 
-def load_table10_data():
-    """Load and process Table 10 data for age and gender analysis"""
-    print("🔄 Attempting to load Table 10 data...")
-    
-    try:
-        # Check if file exists
-        file_path = DATA_FILES['table10']
-        if not os.path.exists(file_path):
-            print(f"❌ ERROR: File not found: {file_path}")
-            return pd.DataFrame()
-        
-        print(f"✅ File found: {file_path}")
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        print(f"✅ JSON loaded successfully")
-        
-        # Extract data and create DataFrame
-        records = []
-        
-        for entry in data['data']:
-            age_group = entry['age_group']
-            sex = entry['sex']
-            
-            # Skip total age group for now (we'll focus on specific age groups)
-            if 'Total age' in age_group:
-                continue
-                
-            # Clean age group names
-            age_clean = age_group.replace('Age ', '').replace(' years', '')
-            
-            for year, year_display in zip(FISCAL_YEARS, FISCAL_YEARS_DISPLAY):
-                if year in entry:
-                    year_data = entry[year]
-                    records.append({
-                        'Age_Group': age_clean,
-                        'Sex': sex,
-                        'Year': year_display,
-                        'Rate': year_data['Rate'],
-                        'CI_Lower': year_data['CI_lower'],
-                        'CI_Upper': year_data['CI_upper']
-                    })
-        
-        df = pd.DataFrame(records)
-        print(f"✅ Table 10 DataFrame created successfully")
-        print(f"📊 Shape: {df.shape}")
-        print(f"📊 Age groups: {sorted(df['Age_Group'].unique())}")
-        print(f"📊 Sex categories: {sorted(df['Sex'].unique())}")
-        
-        return df
-    
-    except Exception as e:
-        print(f"❌ ERROR loading Table 10 data: {str(e)}")
-        print(f"🔍 Full error traceback:")
-        traceback.print_exc()
-        return pd.DataFrame()
-
-def load_table11_data():
-    """Load and process Table 11 data for urban vs rural analysis"""
-    print("🔄 Attempting to load Table 11 data...")
-    
-    try:
-        # Check if file exists
-        file_path = DATA_FILES['table11']
-        if not os.path.exists(file_path):
-            print(f"❌ ERROR: File not found: {file_path}")
-            return pd.DataFrame()
-        
-        print(f"✅ File found: {file_path}")
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        print(f"✅ JSON loaded successfully")
-        
-        # Extract data and create DataFrame
-        records = []
-        
-        for entry in data['data']:
-            residence_type = entry['residence_type']
-            
-            for year, year_display in zip(FISCAL_YEARS, FISCAL_YEARS_DISPLAY):
-                if year in entry:
-                    year_data = entry[year]
-                    records.append({
-                        'Residence_Type': residence_type,
-                        'Year': year_display,
-                        'Rate': year_data['Rate'],
-                        'CI_Lower': year_data['CI_lower'],
-                        'CI_Upper': year_data['CI_upper']
-                    })
-        
-        df = pd.DataFrame(records)
-        print(f"✅ Table 11 DataFrame created successfully")
-        print(f"📊 Shape: {df.shape}")
-        print(f"📊 Residence types: {sorted(df['Residence_Type'].unique())}")
-        
-        return df
-    
-    except Exception as e:
-        print(f"❌ ERROR loading Table 11 data: {str(e)}")
-        print(f"🔍 Full error traceback:")
-        traceback.print_exc()
-        return pd.DataFrame()
-
-def load_table12_data():
-    """Load and process Table 12 data for income quintile analysis"""
-    print("🔄 Attempting to load Table 12 data...")
-    
-    try:
-        # Check if file exists
-        file_path = DATA_FILES['table12']
-        if not os.path.exists(file_path):
-            print(f"❌ ERROR: File not found: {file_path}")
-            return pd.DataFrame()
-        
-        print(f"✅ File found: {file_path}")
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        print(f"✅ JSON loaded successfully")
-        
-        # Extract data and create DataFrame
-        records = []
-        
-        for entry in data['data']:
-            income_quintile = f"Q{entry['income_quintile']}"
-            
-            for year, year_display in zip(FISCAL_YEARS, FISCAL_YEARS_DISPLAY):
-                if year in entry:
-                    year_data = entry[year]
-                    records.append({
-                        'Income_Quintile': income_quintile,
-                        'Year': year_display,
-                        'Rate': year_data['Rate'],
-                        'CI_Lower': year_data['CI_lower'],
-                        'CI_Upper': year_data['CI_upper']
-                    })
-        
-        df = pd.DataFrame(records)
-        print(f"✅ Table 12 DataFrame created successfully")
-        print(f"📊 Shape: {df.shape}")
-        print(f"📊 Income quintiles: {sorted(df['Income_Quintile'].unique())}")
-        
-        return df
-    
-    except Exception as e:
-        print(f"❌ ERROR loading Table 12 data: {str(e)}")
-        print(f"🔍 Full error traceback:")
-        traceback.print_exc()
-        return pd.DataFrame()
-
-def load_table13_data():
-    """Load and process Table 13 data for clinical diagnostic patterns"""
-    print("🔄 Attempting to load Table 13 data...")
-    
-    try:
-        # Load data from multiple years (we have 2021-22, 2022-23, 2023-24)
-        years_data = {}
-        year_files = {
-            '2021-22': 'data/table_13-2021-2022.json',
-            '2022-23': 'data/table_13-2022-2023.json', 
-            '2023-24': 'data/table_13-2023-2024.json'
-        }
-        
-        all_records = []
-        
-        for year_display, file_path in year_files.items():
-            if not os.path.exists(file_path):
-                print(f"⚠️ WARNING: File not found: {file_path}")
-                continue
-                
-            print(f"✅ Loading {file_path}")
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Extract data and create records
-            for entry in data['data']:
-                diagnosis = entry['diagnosis']
-                sex = entry['sex']
-                
-                # Process each age group
-                age_groups = ['age_5_9', 'age_10_14', 'age_15_17', 'age_18_24', 'age_5_24']
-                age_labels = ['5-9', '10-14', '15-17', '18-24', '5-24']
-                
-                for age_key, age_label in zip(age_groups, age_labels):
-                    if age_key in entry:
-                        age_data = entry[age_key]
-                        all_records.append({
-                            'Year': year_display,
-                            'Diagnosis': diagnosis,
-                            'Sex': sex,
-                            'Age_Group': age_label,
-                            'Rate': age_data['Rate'],
-                            'CI_Lower': age_data['CI_lower'],
-                            'CI_Upper': age_data['CI_upper']
-                        })
-        
-        df = pd.DataFrame(all_records)
-        print(f"✅ Table 13 DataFrame created successfully")
-        print(f"📊 Shape: {df.shape}")
-        print(f"📊 Years: {sorted(df['Year'].unique())}")
-        print(f"📊 Diagnoses: {sorted(df['Diagnosis'].unique())}")
-        print(f"📊 Age groups: {sorted(df['Age_Group'].unique())}")
-        print(f"📊 Sex categories: {sorted(df['Sex'].unique())}")
-        
-        return df
-    
-    except Exception as e:
-        print(f"❌ ERROR loading Table 13 data: {str(e)}")
-        print(f"🔍 Full error traceback:")
-        traceback.print_exc()
-        return pd.DataFrame()
-
 def get_default_provinces(df):
     """Get default province selection"""
     if df.empty:
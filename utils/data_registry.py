@@ -0,0 +1,363 @@
+"""
+Lazy data registry for CIHI Mental Health Dashboard
+
+Tables are loaded the first time a layout or callback asks for them and then
+stay resident for the life of the process. An optional background prefetch
+loads the remaining tables once the server is up.
+
+The resident tables live in an immutable DataSnapshot. A background watcher
+polls the source files and, when some of them change, re-parses only the
+affected tables into a new snapshot off to the side and swaps it in with a
+single reference assignment. Callbacks that already hold the previous
+snapshot keep reading it undisturbed and never wait on file I/O.
+
+A table loaded lazily is only added to a snapshot if its source files still
+have the contents the snapshot was fingerprinted from. Otherwise it is
+refused (the caller gets an empty table) and a refresh is started, so rows
+of the new files never go out under the old version.
+"""
+
+import hashlib
+import threading
+import time
+import logging
+import pandas as pd
+from utils.config import DATA_RELOAD_INTERVAL_SECONDS
+from utils.data_loader import load_table, load_combined_data, load_all_tables, get_table_sources, log_memory_report
+from utils.table_cache import source_fingerprints
+from utils.table_index import set_data_version
+
+logger = logging.getLogger(__name__)
+
+# Every table the pages can ask for; 'combined' is derived from table3 and table4
+TABLE_NAMES = ['table3', 'table4', 'table10', 'table11', 'table12', 'table13', 'combined']
+
+def fingerprint_tables(table_names, known=None):
+    """
+    Fingerprint the source files of each table.
+
+    Files shared by several tables (table3/table4 and 'combined', or a single
+    workbook) are only fingerprinted once. Files whose mtime and size match a
+    known fingerprint are not re-hashed.
+    """
+    known = [fp for fingerprints in (known or {}).values() for fp in fingerprints]
+    by_path = {}
+    table_sources = {table_name: get_table_sources(table_name) for table_name in table_names}
+    for sources in table_sources.values():
+        pending = [file_path for file_path in sources if file_path not in by_path]
+        for fp in source_fingerprints(pending, known=known):
+            by_path[fp['path']] = fp
+    return {table_name: [by_path[file_path] for file_path in sources]
+            for table_name, sources in table_sources.items()}
+
+def _content(fingerprints):
+    """The part of a table's fingerprints that changes only when its data does"""
+    return [(fp['path'], fp.get('sha256')) for fp in fingerprints]
+
+def _table_version(table_name, fingerprints):
+    """Short content hash identifying the source data of one table"""
+    return hashlib.sha256(f"{table_name}={_content(fingerprints)}".encode()).hexdigest()[:12]
+
+def _sources_changed(table_name, fingerprints):
+    """Whether a table's source files no longer have the fingerprinted contents"""
+    current = source_fingerprints(get_table_sources(table_name), known=fingerprints)
+    return _content(current) != _content(fingerprints)
+
+def _snapshot_version(fingerprints):
+    """Short content hash identifying the source data of a snapshot"""
+    digest = hashlib.sha256()
+    for table_name in sorted(fingerprints):
+        digest.update(f"{table_name}={_content(fingerprints[table_name])}".encode())
+    return digest.hexdigest()[:12]
+
+class DataSnapshot:
+    """
+    One consistent set of tables built from one version of the source files.
+
+    Tables missing from a snapshot are loaded on first use, but a table that
+    is in a snapshot is never replaced; a refresh builds a new snapshot
+    instead. The version is derived from the file contents, so every process
+    serving the same files reports the same version.
+
+    on_stale is called when a table cannot be loaded because its source
+    files changed after the snapshot was taken.
+    """
+
+    def __init__(self, fingerprints, tables=None, on_stale=None):
+        self.fingerprints = fingerprints
+        self._on_stale = on_stale
+        self.version = _snapshot_version(fingerprints)
+        self.created_at = time.time()
+        self._tables = {}
+        for table_name, df in (tables or {}).items():
+            self._add(table_name, df)
+        # One lock per table so a slow load never blocks pages that need other tables
+        self._locks = {table_name: threading.Lock() for table_name in fingerprints}
+
+    def get(self, table_name):
+        """Return a table, loading it on first use"""
+        df = self._tables.get(table_name)
+        if df is not None:
+            return df
+
+        with self._locks[table_name]:
+            df = self._tables.get(table_name)
+            if df is None:
+                df = self._load(table_name)
+                if self._stale(table_name):
+                    # Not kept: a later call on this snapshot tries again
+                    return pd.DataFrame()
+                self._add(table_name, df)
+        return df
+
+    def _stale(self, table_name):
+        """Whether a table just loaded may not match this snapshot's fingerprints"""
+        if not _sources_changed(table_name, self.fingerprints[table_name]):
+            return False
+        logger.warning("⚠️ WARNING: %s changed after snapshot %s was taken, refusing to serve it from it",
+                       table_name, self.version)
+        if self._on_stale is not None:
+            self._on_stale()
+        return True
+
+    def _add(self, table_name, df):
+        """Make a table resident, tagged with the version of its source data"""
+        set_data_version(df, _table_version(table_name, self.fingerprints[table_name]))
+        self._tables.setdefault(table_name, df)
+
+    def _load(self, table_name):
+        start = time.perf_counter()
+        try:
+            if table_name == 'combined':
+                # Stored under the fingerprints this snapshot's tables were loaded for
+                df = load_combined_data(get_table=self.get, fingerprints=self.fingerprints['combined'])
+            else:
+                df = load_table(table_name)
+        except Exception as e:
+            logger.exception("❌ ERROR loading %s into registry: %s", table_name, e)
+            df = pd.DataFrame()
+
+        logger.info("📦 Registry loaded %s in %.1f ms", table_name, (time.perf_counter() - start) * 1000)
+        return df
+
+    def load_all(self, table_names=None, **load_options):
+        """
+        Load every table that is not resident yet in one parallel batch.
+
+        Extra keyword arguments are passed to load_all_tables (executor,
+        max_workers, ...). Returns the per-file timings.
+        """
+        table_names = [table_name for table_name in (table_names or self._locks)
+                       if not self.is_loaded(table_name)]
+        if not table_names:
+            return []
+
+        file_tables = [table_name for table_name in table_names if table_name != 'combined']
+        tables, timings = load_all_tables(file_tables, include_combined=False, **load_options)
+        for table_name, df in tables.items():
+            # A callback may have loaded the same table meanwhile; keep the first copy
+            if not self._stale(table_name):
+                self._add(table_name, df)
+
+        if 'combined' in table_names:
+            self.get('combined')
+        return timings
+
+    def is_loaded(self, table_name):
+        return table_name in self._tables
+
+    def loaded_tables(self):
+        """Names of the tables currently resident in memory"""
+        return [table_name for table_name in self._locks if table_name in self._tables]
+
+    def memory_report(self):
+        """Log and return the bytes held by each resident table"""
+        return log_memory_report({table_name: self._tables[table_name] for table_name in self.loaded_tables()})
+
+class DataRegistry:
+    """Serves tables from the current snapshot and swaps in refreshed ones"""
+
+    def __init__(self, table_names=TABLE_NAMES):
+        self._table_names = list(table_names)
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+        # Serializes refreshes; readers never take it
+        self._refresh_lock = threading.Lock()
+        # Fingerprints of the last poll, so files only touched since are not re-hashed
+        self._known_fingerprints = None
+        self._prefetch_thread = None
+        self._refresh_thread = None
+        self._watch_thread = None
+        self._watch_stop = threading.Event()
+
+    def snapshot(self):
+        """
+        Return the current snapshot.
+
+        Callbacks that read more than one table should take the snapshot once
+        and read every table from it, so a refresh in between cannot mix
+        versions.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+
+        with self._snapshot_lock:
+            if self._snapshot is None:
+                self._snapshot = DataSnapshot(fingerprint_tables(self._table_names), on_stale=self.refresh_soon)
+            return self._snapshot
+
+    @property
+    def version(self):
+        return self.snapshot().version
+
+    def get(self, table_name):
+        """Return a table from the current snapshot, loading it on first use"""
+        return self.snapshot().get(table_name)
+
+    def load_all(self, table_names=None, **load_options):
+        """Load every table of the current snapshot that is not resident yet"""
+        return self.snapshot().load_all(table_names, **load_options)
+
+    def is_loaded(self, table_name):
+        return self.snapshot().is_loaded(table_name)
+
+    def loaded_tables(self):
+        """Names of the tables currently resident in memory"""
+        return self.snapshot().loaded_tables()
+
+    def memory_report(self):
+        """Log and return the bytes held by each resident table"""
+        return self.snapshot().memory_report()
+
+    def prefetch(self, table_names=None, delay=0.0):
+        """Load tables in a background daemon thread, after an optional delay"""
+        if self._prefetch_thread is not None and self._prefetch_thread.is_alive():
+            return self._prefetch_thread
+
+        table_names = list(table_names or self._table_names)
+
+        def run():
+            if delay:
+                time.sleep(delay)
+            logger.info("🔄 Prefetching tables in background: %s", table_names)
+            try:
+                # Threads rather than processes: forking a serving process is not safe
+                self.load_all(table_names, executor='thread')
+                logger.info("✅ Background prefetch complete")
+                self.memory_report()
+            except Exception as e:
+                logger.exception("❌ ERROR during background prefetch: %s", e)
+
+        self._prefetch_thread = threading.Thread(target=run, name='data-prefetch', daemon=True)
+        self._prefetch_thread.start()
+        return self._prefetch_thread
+
+    def refresh(self):
+        """
+        Re-parse the tables whose source files changed and swap in a new snapshot.
+
+        Only tables that are resident are re-parsed; changed tables nobody has
+        asked for yet are simply left to load lazily from the new snapshot.
+        Tables that fail to parse (e.g. a file caught mid-write) keep their
+        previous data and fingerprints, so the next poll tries again. Returns
+        the names of the tables whose data changed.
+        """
+        with self._refresh_lock:
+            current = self.snapshot()
+            fingerprints = fingerprint_tables(self._table_names,
+                                              known=self._known_fingerprints or current.fingerprints)
+            # Touched but unchanged files: the next poll is back to a stat per file
+            self._known_fingerprints = dict(fingerprints)
+            changed = [table_name for table_name in self._table_names
+                       if _content(fingerprints[table_name]) != _content(current.fingerprints[table_name])]
+
+            if not changed:
+                return []
+
+            start = time.perf_counter()
+            tables = {table_name: current.get(table_name) for table_name in current.loaded_tables()
+                      if table_name not in changed}
+            reparse = [table_name for table_name in changed
+                       if table_name != 'combined' and current.is_loaded(table_name)]
+            failed = []
+            if reparse:
+                # Threads rather than processes: forking a serving process is not safe
+                parsed, _ = load_all_tables(reparse, executor='thread', include_combined=False)
+                for table_name in reparse:
+                    df = parsed.get(table_name)
+                    # Changed again while parsing: the next poll picks up the latest version
+                    if df is None or df.empty or _sources_changed(table_name, fingerprints[table_name]):
+                        failed.append(table_name)
+                    else:
+                        tables[table_name] = df
+            if 'combined' in changed and ('table3' in failed or 'table4' in failed):
+                failed.append('combined')
+
+            for table_name in failed:
+                logger.warning("⚠️ WARNING: Could not re-parse %s, keeping previous data", table_name)
+                fingerprints[table_name] = current.fingerprints[table_name]
+                if current.is_loaded(table_name):
+                    tables[table_name] = current.get(table_name)
+            changed = [table_name for table_name in changed if table_name not in failed]
+            if not changed:
+                return []
+
+            snapshot = DataSnapshot(fingerprints, tables, on_stale=self.refresh_soon)
+            if 'combined' in changed and current.is_loaded('combined'):
+                # Derive it now rather than in the first callback that needs it
+                snapshot.get('combined')
+
+            self._snapshot = snapshot
+            logger.info("🔄 Data refreshed in %.1f ms: %s (version %s → %s)",
+                        (time.perf_counter() - start) * 1000, changed, current.version, snapshot.version)
+            return changed
+
+    def refresh_soon(self):
+        """Refresh in a background thread, unless one is already running"""
+        with self._snapshot_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return self._refresh_thread
+
+            def run():
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.exception("❌ ERROR refreshing data: %s", e)
+
+            self._refresh_thread = threading.Thread(target=run, name='data-refresh', daemon=True)
+            self._refresh_thread.start()
+            return self._refresh_thread
+
+    def watch(self, interval=DATA_RELOAD_INTERVAL_SECONDS):
+        """Poll the source files in a background daemon thread and refresh on change"""
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return self._watch_thread
+
+        self._watch_stop.clear()
+
+        def run():
+            logger.info("👀 Watching data files for changes every %gs", interval)
+            while not self._watch_stop.wait(interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.exception("❌ ERROR refreshing data: %s", e)
+
+        self._watch_thread = threading.Thread(target=run, name='data-watcher', daemon=True)
+        self._watch_thread.start()
+        return self._watch_thread
+
+    def stop_watching(self):
+        self._watch_stop.set()
+
+# Shared registry used by the app and every page
+registry = DataRegistry()
+
+def get_table(table_name):
+    """Return a table from the shared registry, loading it on first use"""
+    return registry.get(table_name)
+
+def current_snapshot():
+    """Return the shared registry's current snapshot"""
+    return registry.snapshot()
@@ -0,0 +1,323 @@
+"""
+Excel ingest for CIHI Mental Health Dashboard
+
+Reads the CIHI data tables workbook in read-only, row-streaming mode and
+produces the same tables as the JSON loaders in utils/data_loader.py. Each
+data row of a sheet is turned into an entry shaped like the entries of the
+hand-converted JSON files and fed through the same TABLE_SCHEMAS parser, so
+column names, label clean-up and row order cannot drift between the two
+sources.
+
+Usage:
+    python -m utils.excel_ingest care-children-youth-with-mental-disorders-data-tables-en.xlsx
+
+The parsed tables are written to the binary table cache, keyed by the
+workbook's fingerprint. Set DATA_WORKBOOK in utils/config.py to the same path
+to serve the dashboard from them.
+"""
+
+import argparse
+import logging
+import re
+import sys
+import time
+import numpy as np
+from utils.config import TABLE_CACHE_DIR
+from utils.data_loader import TABLE_SCHEMAS, get_table_columns, parse_table_entries, build_table, combine_mental_health_other_data
+from utils.table_cache import store_cached_table
+from utils.logging_config import configure_logging
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+# Sheets holding each table, matched against the sheet name or, failing that,
+# the title in the first rows of the sheet. Table 13 may span several sheets.
+SHEET_PATTERNS = {
+    'table3': r'Table\s*3(?![\d])',
+    'table4': r'Table\s*4(?![\d])',
+    'table10': r'Table\s*10(?![\d])',
+    'table11': r'Table\s*11(?![\d])',
+    'table12': r'Table\s*12(?![\d])',
+    'table13': r'Table\s*13(?![\d])'
+}
+
+TITLE_SCAN_ROWS = 5
+
+_DASHES = str.maketrans({'‐': '-', '‑': '-', '‒': '-', '–': '-', '—': '-', '−': '-'})
+_FOOTNOTE_MARKS = '*†‡§'
+_FISCAL_YEAR = re.compile(r'(\d{4})\s*-\s*(\d{4})')
+_AGE_RANGE = re.compile(r'(?:total\s*)?(?:age\s*)?(\d+)\s*-\s*(\d+)(?:\s*years?)?', re.IGNORECASE)
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+_CI_RANGE = re.compile(r'(-?[\d.]+)\s*(?:-|to)\s*(-?[\d.]+)')
+
+def _text(value):
+    """Normalize a cell to single-spaced text with plain hyphens"""
+    if value is None:
+        return ''
+    return ' '.join(str(value).translate(_DASHES).split())
+
+def _label(value):
+    """Normalize a dimension label and drop trailing footnote markers"""
+    return _text(value).rstrip(_FOOTNOTE_MARKS).strip()
+
+def _number(value):
+    """Convert a measure cell to a number; suppressed or blank cells become NaN"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    text = _text(value).replace(',', '').replace(' ', '')
+    if _NUMBER.fullmatch(text):
+        return float(text) if '.' in text else int(text)
+    return float('nan')
+
+def _ci_bounds(value):
+    """Split a '21-27' style 95% CI cell into its lower and upper bounds"""
+    match = _CI_RANGE.search(_text(value).replace(',', ''))
+    if not match:
+        return float('nan'), float('nan')
+    return _number(match.group(1)), _number(match.group(2))
+
+def _normalize_age_group(value):
+    """Workbook '5-9' / 'Total 5-24' labels in the JSON 'Age 5-9' / 'Total age 5-24' form"""
+    text = _label(value)
+    match = _AGE_RANGE.search(text)
+    if not match:
+        return text
+    prefix = 'Total age' if 'total' in text.lower() else 'Age'
+    return f"{prefix} {match.group(1)}-{match.group(2)}"
+
+def _normalize_quintile(value):
+    """Workbook 'Q1 (lowest)' / '1' labels as the bare JSON quintile number"""
+    match = re.search(r'\d', _text(value))
+    return match.group(0) if match else _label(value)
+
+def _normalize_sex(value):
+    text = _label(value)
+    return 'Total' if text.lower() in ('both', 'both sexes', 'total', 'all') else text
+
+# Per source key clean-up so workbook labels match the JSON source values
+VALUE_NORMALIZERS = {
+    'age_group': _normalize_age_group,
+    'income_quintile': _normalize_quintile,
+    'sex': _normalize_sex
+}
+
+def _expand_key(schema, text):
+    """Map a group header ('2018-2019', '5-9 years') to the schema expansion key"""
+    keys = schema['expand']['keys']
+    if text in keys:
+        return text
+    match = _AGE_RANGE.fullmatch(text)
+    if match:
+        key = f"age_{match.group(1)}_{match.group(2)}"
+        if key in keys:
+            return key
+    return None
+
+def _measure_keys(schema, text):
+    """Map a measure header ('N', 'Rate', '95% CI') to the schema source keys it fills"""
+    source_keys = [key for _, key in schema['measures']]
+    lowered = text.lower()
+    if 'ci' in lowered.split() or 'confidence' in lowered:
+        if 'lower' in lowered:
+            return ['CI_lower']
+        if 'upper' in lowered:
+            return ['CI_upper']
+        return ['CI_lower', 'CI_upper']
+    for key in source_keys:
+        if lowered == key.lower():
+            return [key]
+    if lowered == 'lower':
+        return ['CI_lower']
+    if lowered == 'upper':
+        return ['CI_upper']
+    return []
+
+def _build_column_map(schema, group_row, measure_row):
+    """
+    Work out which spreadsheet columns hold which (expansion key, measure keys).
+
+    Group headers are often merged across their measure columns, so in
+    read-only mode only the first cell carries the label; the label is
+    carried forward until the next one.
+    """
+    column_map = {}
+    current_key = None
+    first_group_column = None
+    for column, cell in enumerate(group_row):
+        text = _text(cell)
+        if text:
+            current_key = _expand_key(schema, text)
+            if current_key is not None and first_group_column is None:
+                first_group_column = column
+        if current_key is None:
+            continue
+        measure_text = _text(measure_row[column]) if column < len(measure_row) else ''
+        measure_keys = _measure_keys(schema, measure_text)
+        if measure_keys:
+            column_map[column] = (current_key, measure_keys)
+    return column_map, first_group_column
+
+def _matches_table(title_text, table_name):
+    return re.search(SHEET_PATTERNS[table_name], title_text, re.IGNORECASE) is not None
+
+def find_table_sheets(workbook, table_name):
+    """Return the worksheets holding a table, by sheet name or title text"""
+    sheets = [ws for ws in workbook.worksheets if _matches_table(_text(ws.title), table_name)]
+    if sheets:
+        return sheets
+
+    for ws in workbook.worksheets:
+        for row in ws.iter_rows(max_row=TITLE_SCAN_ROWS, values_only=True):
+            if any(_matches_table(_text(cell), table_name) for cell in row if cell is not None):
+                sheets.append(ws)
+                break
+    return sheets
+
+def iter_sheet_blocks(schema, worksheet):
+    """
+    Stream a worksheet and yield (constants, entries) for every table block.
+
+    Rows are consumed one at a time; a block starts at a header row with at
+    least two group labels (fiscal years or age groups) and ends at the first
+    blank or note row. The most recent fiscal year seen in the title rows is
+    used for per-file constant columns (the Year of Table 13).
+    """
+    dimensions = schema['dimensions']
+    rows = worksheet.iter_rows(values_only=True)
+    title_year = None
+
+    for row in rows:
+        texts = [_text(cell) for cell in row]
+        group_cells = [text for text in texts if text and _expand_key(schema, text)]
+        if len(group_cells) < 2:
+            for text in texts:
+                years = _FISCAL_YEAR.findall(text)
+                if years:
+                    start, end = years[-1]
+                    title_year = f"{start}-{end[2:]}"
+            continue
+
+        measure_row = next(rows, None)
+        if measure_row is None:
+            return
+        column_map, first_group_column = _build_column_map(schema, row, measure_row)
+        dimension_columns = list(range(min(len(dimensions), first_group_column or 0)))
+        constants = {column: title_year for column in schema.get('file_columns', [])}
+        yield constants, _iter_block_entries(schema, rows, column_map, dimension_columns)
+
+def _iter_block_entries(schema, rows, column_map, dimension_columns):
+    """Turn the data rows of one block into JSON-shaped entries"""
+    dimensions = schema['dimensions']
+    previous = [None] * len(dimensions)
+
+    for row in rows:
+        first = _text(row[0]) if row else ''
+        if not any(cell is not None and _text(cell) for cell in row):
+            return
+        if first.lower().startswith(('note', 'source', 'for more information')):
+            return
+
+        entry = {}
+        for position, (_, key, _) in enumerate(dimensions):
+            column = dimension_columns[position] if position < len(dimension_columns) else position
+            value = row[column] if column < len(row) else None
+            # Merged dimension cells only carry a value on their first row
+            if value is None or _text(value) == '':
+                value = previous[position]
+            previous[position] = value
+            normalize = VALUE_NORMALIZERS.get(key, _label)
+            entry[key] = normalize(value)
+
+        for column, (expand_key, measure_keys) in column_map.items():
+            if column >= len(row):
+                continue
+            nested = entry.setdefault(expand_key, {})
+            if len(measure_keys) == 2:
+                nested['CI_lower'], nested['CI_upper'] = _ci_bounds(row[column])
+            else:
+                nested[measure_keys[0]] = _number(row[column])
+
+        # Fill measures that have no column in this sheet so every row has the same shape
+        for expand_key in list(entry):
+            if isinstance(entry[expand_key], dict):
+                for _, key in schema['measures']:
+                    entry[expand_key].setdefault(key, float('nan'))
+
+        yield entry
+
+def _open_workbook(workbook_path):
+    if openpyxl is None:
+        raise ImportError("openpyxl is required to read the CIHI workbook: pip install openpyxl")
+    return openpyxl.load_workbook(workbook_path, read_only=True, data_only=True)
+
+def parse_workbook_table(workbook_path, table_name, workbook=None):
+    """Parse one table from the workbook into typed column arrays"""
+    schema = TABLE_SCHEMAS[table_name]
+    own_workbook = workbook is None
+    if own_workbook:
+        workbook = _open_workbook(workbook_path)
+
+    try:
+        sheets = find_table_sheets(workbook, table_name)
+        if not sheets:
+            raise ValueError(f"No sheet for {table_name} found in {workbook_path}")
+
+        parsed_blocks = []
+        for worksheet in sheets:
+            for constants, entries in iter_sheet_blocks(schema, worksheet):
+                parsed_blocks.append(parse_table_entries(schema, entries, constants))
+    finally:
+        if own_workbook:
+            workbook.close()
+
+    return {column: np.concatenate([block[column] for block in parsed_blocks])
+            for column in get_table_columns(schema)}
+
+def ingest_workbook(workbook_path, table_names=None, cache_dir=TABLE_CACHE_DIR):
+    """Parse every table from the workbook and write them to the binary cache"""
+    table_names = list(table_names or TABLE_SCHEMAS)
+    workbook = _open_workbook(workbook_path)
+    tables = {}
+    try:
+        for table_name in table_names:
+            start = time.perf_counter()
+            try:
+                columns = parse_workbook_table(workbook_path, table_name, workbook=workbook)
+                tables[table_name] = build_table(TABLE_SCHEMAS[table_name], [columns])
+            except Exception as e:
+                logger.error("❌ ERROR ingesting %s: %s", table_name, e)
+                continue
+            store_cached_table(table_name, [workbook_path], tables[table_name], cache_dir=cache_dir)
+            logger.info("✅ %s: %s records in %.1f ms", table_name, len(tables[table_name]), (time.perf_counter() - start) * 1000)
+    finally:
+        workbook.close()
+
+    if 'table3' in tables and 'table4' in tables:
+        tables['combined'] = combine_mental_health_other_data(tables['table3'], tables['table4'])
+        store_cached_table('combined', [workbook_path, workbook_path], tables['combined'], cache_dir=cache_dir)
+
+    return tables
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest the CIHI data tables workbook into the dashboard's table cache")
+    parser.add_argument('workbook', help="path to the CIHI .xlsx data tables")
+    parser.add_argument('--tables', nargs='+', choices=sorted(TABLE_SCHEMAS), help="tables to ingest (default: all)")
+    parser.add_argument('--cache-dir', default=TABLE_CACHE_DIR, help="table cache directory")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    tables = ingest_workbook(args.workbook, args.tables, args.cache_dir)
+    missing = [table_name for table_name in (args.tables or TABLE_SCHEMAS) if table_name not in tables]
+    if missing:
+        logger.warning("⚠️ WARNING: Could not ingest %s", missing)
+        return 1
+
+    logger.info("💡 Set DATA_WORKBOOK = %r in utils/config.py to serve these tables", args.workbook)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""
+Figure cache for CIHI Mental Health Dashboard chart builders
+
+The chart builders are pure functions of their selections and a table, and
+the selection space is tiny, so built figures are memoized. Entries are keyed
+by the builder, a canonical form of its arguments and the data version of
+each table argument (a hash of its source files for registry tables), so a
+data refresh never serves a figure built from the previous snapshot. Entries
+are evicted least-recently-used once either the entry or the byte budget is
+exceeded; an entry's size is estimated once, when it is stored.
+
+Each entry also keeps the figure serialized exactly as Dash would send it,
+and a JSON-native copy of it. Callbacks return figure_response(figure), so a
+cached figure is not walked and re-encoded on every response.
+
+Cached figures are shared between callbacks and must be treated as
+read-only.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+from plotly.io.json import to_json_plotly
+from utils.config import (FIGURE_CACHE_ENABLED, FIGURE_CACHE_MAX_ENTRIES, FIGURE_CACHE_MAX_BYTES,
+                          FIGURE_CACHE_STATS_EVERY, JSON_ENGINE)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Raw JSON splicing needs a recent orjson
+_Fragment = getattr(orjson, 'Fragment', None)
+from utils.table_index import data_version
+
+logger = logging.getLogger(__name__)
+
+def _canonical(value, unordered=False):
+    """Hashable form of an argument; unordered collections become sorted tuples"""
+    if isinstance(value, pd.DataFrame):
+        return ('df', data_version(value))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = tuple(_canonical(item) for item in value)
+        if unordered:
+            items = tuple(sorted(set(items), key=repr))
+        return items
+    if isinstance(value, dict):
+        return tuple(sorted((key, _canonical(item)) for key, item in value.items()))
+    return value
+
+def serialize_figure(figure):
+    """Encode a figure exactly as Dash would for a response, as UTF-8 bytes"""
+    return to_json_plotly(figure).encode('utf-8')
+
+def deep_sizeof(value, seen=None):
+    """
+    Approximate memory held by a tree of dicts, lists and tuples: their own
+    size plus their items', and an array's buffer. Shared objects count once.
+    """
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, np.ndarray):
+        size += value.nbytes if value.base is not None else 0
+    elif isinstance(value, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(deep_sizeof(item, seen) for item in value)
+    return size
+
+def _figure_sizeof(figure, seen):
+    """Approximate memory held by a Plotly figure's trace and layout properties"""
+    try:
+        return deep_sizeof(figure._data, seen) + deep_sizeof(figure._layout, seen)
+    except AttributeError:
+        # Not a Plotly figure object (e.g. a dict)
+        return deep_sizeof(figure, seen)
+
+class CachedFigure:
+    """A built figure together with its serialized payload"""
+
+    __slots__ = ('figure', 'payload', 'plain', 'n_bytes')
+
+    def __init__(self, figure, payload=None):
+        self.figure = figure
+        self.payload = payload if payload is not None else serialize_figure(figure)
+        # JSON-native copy: Dash encodes it without walking the Plotly object tree
+        self.plain = json.loads(self.payload)
+        # What the entry keeps alive: the figure, the payload and the plain copy
+        seen = set()
+        self.n_bytes = _figure_sizeof(figure, seen) + len(self.payload) + deep_sizeof(self.plain, seen)
+
+class FigureCache:
+    """Thread-safe LRU cache bounded by entry count and approximate bytes"""
+
+    def __init__(self, max_entries=FIGURE_CACHE_MAX_ENTRIES, max_bytes=FIGURE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        # Entries by id() of their figure, so a figure handed out can be mapped back to its payload
+        self._by_figure = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the CachedFigure for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def entry_for(self, figure):
+        """Return the CachedFigure holding a figure object, or None if it is not cached"""
+        return self._by_figure.get(id(figure))
+
+    def contains(self, key):
+        """Whether key is cached, without counting a lookup or refreshing its recency"""
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, entry):
+        if entry.n_bytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._forget(previous)
+            self._entries[key] = entry
+            self._by_figure[id(entry.figure)] = entry
+            self._bytes += entry.n_bytes
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._forget(evicted)
+                self.evictions += 1
+
+    def _forget(self, entry):
+        self._bytes -= entry.n_bytes
+        if self._by_figure.get(id(entry.figure)) is entry:
+            del self._by_figure[id(entry.figure)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_figure.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+    def log_stats(self):
+        stats = self.stats()
+        logger.info("🗂️ Figure cache: %d entries, %.1f KB, %d hits / %d misses (%.0f%% hit rate), %d evictions",
+                    stats['entries'], stats['bytes'] / 1024, stats['hits'], stats['misses'],
+                    stats['hit_rate'] * 100, stats['evictions'])
+        return stats
+
+# Shared by every builder
+figure_cache = FigureCache()
+
+def cached_figure(unordered=()):
+    """
+    Memoize a chart builder in the shared figure cache.
+
+    unordered names the list arguments whose order and duplicates do not
+    change the figure (e.g. selected provinces), so equivalent selections
+    share an entry. Builders that fail return None, which is never cached.
+    """
+    def decorator(builder):
+        signature = inspect.signature(builder)
+
+        def cache_key(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return (builder.__name__,) + tuple(_canonical(value, name in unordered)
+                                               for name, value in bound.arguments.items())
+
+        @functools.wraps(builder)
+        def wrapper(*args, **kwargs):
+            if not FIGURE_CACHE_ENABLED:
+                return builder(*args, **kwargs)
+
+            key = cache_key(*args, **kwargs)
+            entry = figure_cache.get(key)
+            if (figure_cache.hits + figure_cache.misses) % FIGURE_CACHE_STATS_EVERY == 0:
+                figure_cache.log_stats()
+            if entry is not None:
+                logger.debug("⚡ Figure cache hit for %s", builder.__name__)
+                return entry.figure
+
+            figure = builder(*args, **kwargs)
+            if figure is not None:
+                figure_cache.put(key, CachedFigure(figure))
+            return figure
+
+        def prime(figure, *args, payload=None, **kwargs):
+            """
+            Store a figure built elsewhere (e.g. by a warm-up worker) for these
+            arguments, with its payload if it was already serialized.
+            """
+            if FIGURE_CACHE_ENABLED and figure is not None:
+                figure_cache.put(cache_key(*args, **kwargs), CachedFigure(figure, payload))
+
+        def is_cached(*args, **kwargs):
+            return figure_cache.contains(cache_key(*args, **kwargs))
+
+        wrapper.uncached = builder
+        wrapper.cache_key = cache_key
+        wrapper.prime = prime
+        wrapper.is_cached = is_cached
+        return wrapper
+    return decorator
+
+def plain_figure(figure):
+    """Return the JSON-native form of a figure, from the cache when it holds it"""
+    entry = figure_cache.entry_for(figure)
+    return entry.plain if entry is not None else json.loads(serialize_figure(figure))
+
+def figure_response(figure):
+    """
+    Return the cheapest form of a figure to hand to Dash as a property value.
+
+    A cached figure is replaced by its pre-serialized payload: spliced in
+    verbatim as an orjson Fragment where the installed orjson supports it,
+    otherwise as its JSON-native dict, which encodes in a fraction of the time
+    of the Plotly object tree. Any other value is returned unchanged.
+    """
+    entry = figure_cache.entry_for(figure)
+    if entry is None:
+        return figure
+    if _Fragment is not None and _json_engine() == 'orjson':
+        return _Fragment(entry.payload)
+    return entry.plain
+
+def _json_engine():
+    engine = pio.json.config.default_engine
+    if engine == 'auto':
+        return 'orjson' if orjson is not None else 'json'
+    return engine
+
+def configure_json_engine(engine=JSON_ENGINE):
+    """
+    Select the JSON encoder Plotly and Dash use for every response.
+
+    'orjson' is much faster on plain data but is an optional dependency;
+    'auto' uses it when installed and falls back to the standard library.
+    """
+    if engine == 'orjson' and orjson is None:
+        logger.warning("⚠️ WARNING: orjson is not installed, using the standard json encoder")
+        engine = 'json'
+    pio.json.config.default_engine = engine
+    logger.info("🧾 JSON engine: %s", _json_engine())
+    return engine
@@ -0,0 +1,121 @@
+"""
+Figure diffs for CIHI Mental Health Dashboard
+
+Two figures from the same builder differ in only a handful of leaves (a
+trace's values, a title), so instead of sending a whole figure again the
+server can describe the difference as a short list of operations on a
+figure the browser already has. diff_figures() works on serialized (plain
+JSON) figures; assets/clientside.js applies its output in the browser.
+
+An operation is [path, value] to set a leaf, [path] to delete it, or
+[path, value, 'insert'] to insert an item into a list at index path[-1],
+where path is a list of dict keys and list indexes. Operations apply in
+order. to_patch() turns them into a Dash Patch for server callbacks.
+"""
+
+import difflib
+import json
+from dash import Patch, no_update
+from utils.figure_cache import plain_figure, figure_response
+
+def _is_leaf(value):
+    # Typed arrays ({'dtype': ..., 'bdata': ...}) are compared and replaced whole
+    return not isinstance(value, dict) or 'bdata' in value
+
+def diff_figures(base, target, path=()):
+    """Return the operations that turn the plain figure base into target"""
+    if isinstance(base, dict) and isinstance(target, dict) and not (_is_leaf(base) or _is_leaf(target)):
+        ops = []
+        for key, value in target.items():
+            if key in base:
+                ops.extend(diff_figures(base[key], value, path + (key,)))
+            else:
+                ops.append([list(path + (key,)), value])
+        ops.extend([list(path + (key,))] for key in base if key not in target)
+        return ops
+
+    # Lists of objects (traces, annotations) are aligned item by item, so
+    # adding one trace is one insert rather than a new list
+    if (isinstance(base, list) and isinstance(target, list)
+            and any(isinstance(item, dict) for item in base + target)):
+        return _diff_lists(base, target, path)
+
+    return [] if base == target else [[list(path), target]]
+
+def _item_key(item):
+    """Identity of a list item for alignment: a trace's name, or its whole content"""
+    if isinstance(item, dict) and 'name' in item:
+        return f"name:{item['name']}"
+    return json.dumps(item, sort_keys=True)
+
+def _diff_lists(base, target, path):
+    matcher = difflib.SequenceMatcher(None, [_item_key(item) for item in base],
+                                      [_item_key(item) for item in target], autojunk=False)
+    ops = []
+    # Last block first, so the base indexes of the blocks still to come stay valid
+    for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+        if tag == 'equal' or (tag == 'replace' and i2 - i1 == j2 - j1):
+            for offset in range(i2 - i1):
+                ops.extend(diff_figures(base[i1 + offset], target[j1 + offset], path + (i1 + offset,)))
+        else:
+            ops.extend([list(path + (index,))] for index in reversed(range(i1, i2)))
+            ops.extend([list(path + (i1 + offset,)), target[j1 + offset], 'insert'] for offset in range(j2 - j1))
+    return ops
+
+def apply_diff(figure, ops):
+    """Apply operations to a plain figure in place and return it (the Python twin of the browser code)"""
+    for op in ops:
+        path = op[0]
+        parent = figure
+        for key in path[:-1]:
+            parent = parent[key]
+        if len(op) == 1:
+            del parent[path[-1]]
+        elif len(op) == 3:
+            parent.insert(path[-1], op[1])
+        else:
+            parent[path[-1]] = op[1]
+    return figure
+
+def to_patch(ops):
+    """Express operations as a Dash Patch"""
+    patch = Patch()
+    for op in ops:
+        path = op[0]
+        parent = patch
+        for key in path[:-1]:
+            parent = parent[key]
+        if len(op) == 1:
+            del parent[path[-1]]
+        elif len(op) == 3:
+            parent.insert(path[-1], op[1])
+        else:
+            parent[path[-1]] = op[1]
+    return patch
+
+def figure_update(figure, previous=None):
+    """
+    Return the update for a graph that shows previous and should show figure.
+
+    That is no_update if both are identical, a Patch with only what differs
+    otherwise, and the whole figure when what the graph shows is unknown
+    (previous is None).
+    """
+    if previous is None:
+        return figure_response(figure)
+    ops = diff_figures(plain_figure(previous), plain_figure(figure))
+    return to_patch(ops) if ops else no_update
+
+def year_figures(build, years, default_year):
+    """
+    Serialize one figure per year as the default year's figure plus a diff per year.
+
+    build(year) returns the figure for a year. The result is the data of a
+    dcc.Store read by the cihi.switchYear clientside callback.
+    """
+    base = plain_figure(build(default_year))
+    return {
+        'default': default_year,
+        'base': base,
+        'years': {year: diff_figures(base, plain_figure(build(year))) for year in years}
+    }
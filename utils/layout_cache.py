@@ -0,0 +1,73 @@
+"""
+Page layout cache for CIHI Mental Health Dashboard
+
+A page layout is a pure function of the tables it is built from, yet it was
+rebuilt (inline figures included) on every navigation. Layouts are now built
+once per page and data snapshot and kept in JSON-native form, which Dash
+encodes in a fraction of the time of the component tree, so a repeat visit
+is a lookup. Each entry is tagged with the snapshot version it was built
+from; a data refresh changes the version, and the next visit to each page
+rebuilds it.
+
+Cached layouts are shared between requests and must be treated as read-only.
+"""
+
+import json
+import logging
+import threading
+from plotly.io.json import to_json_plotly
+from utils.config import LAYOUT_CACHE_ENABLED
+from utils.data_registry import registry
+from utils.response_cache import response_cache_skipped
+
+logger = logging.getLogger(__name__)
+
+def plain_layout(layout):
+    """Return the JSON-native form of a component tree, as Dash would send it"""
+    return json.loads(to_json_plotly(layout))
+
+class LayoutCache:
+    """The latest layout of each page, with the snapshot version it was built from"""
+
+    def __init__(self, enabled=LAYOUT_CACHE_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._layouts = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, page, snapshot, build):
+        """
+        Return the layout of page for snapshot, calling build(snapshot) on a miss.
+
+        A layout built from a snapshot that has been replaced in the meantime,
+        or whose build marked the response as a failure, is returned but
+        not cached.
+        """
+        if not self.enabled:
+            return build(snapshot)
+
+        with self._lock:
+            entry = self._layouts.get(page)
+            if entry is not None and entry[0] == snapshot.version:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        layout = plain_layout(build(snapshot))
+        if snapshot.version == registry.version and not response_cache_skipped():
+            with self._lock:
+                self._layouts[page] = (snapshot.version, layout)
+            logger.debug("🧩 Cached %s layout for data version %s", page, snapshot.version)
+        return layout
+
+    def clear(self):
+        with self._lock:
+            self._layouts.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'pages': len(self._layouts), 'hits': self.hits, 'misses': self.misses}
+
+# Shared cache used by the page router
+layout_cache = LayoutCache()
@@ -0,0 +1,88 @@
+"""
+Logging setup for CIHI Mental Health Dashboard
+
+Modules log through the standard logging module (logger = logging.getLogger(__name__))
+with %-style arguments, so a message below the configured level costs one
+level check and is never formatted.
+
+configure_logging() puts a QueueHandler on the root logger: a request thread
+only appends the record to an in-memory queue, and a QueueListener thread
+writes it to stdout. A process that is going to fork (the gunicorn master
+preloading the app) logs synchronously instead, so no thread is running
+when it forks, and each child starts its own writer. Messages logged once per callback or chart build pass
+extra=SAMPLED, and only one in LOG_SAMPLE_EVERY of each such message gets
+through.
+"""
+
+import atexit
+import itertools
+import logging
+import logging.handlers
+import queue
+import sys
+from utils.config import LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_EVERY
+
+# Pass as extra= on hot-path messages that only need to be seen now and then
+SAMPLED = {'sampled': True}
+
+class SamplingFilter(logging.Filter):
+    """Let through 1 in every N records marked as sampled, counted per message"""
+
+    def __init__(self, every=LOG_SAMPLE_EVERY):
+        super().__init__()
+        self.every = max(1, int(every))
+        self._counters = {}
+
+    def filter(self, record):
+        if self.every == 1 or not getattr(record, 'sampled', False):
+            return True
+        counter = self._counters.get((record.name, record.msg))
+        if counter is None:
+            counter = self._counters.setdefault((record.name, record.msg), itertools.count())
+        return next(counter) % self.every == 0
+
+_listener = None
+_handler = None
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, sample_every=LOG_SAMPLE_EVERY, stream=None, background=True):
+    """
+    Route every log record through a queue to a background writer thread.
+
+    With background=False records are written by the logging thread itself
+    and no thread is started. Safe to call again (for example in a freshly
+    forked worker): the previous handler and listener are replaced.
+    Returns the listener, or None when not in the background.
+    """
+    global _listener, _handler
+    stop_logging()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(logging.Formatter(fmt))
+
+    if background:
+        log_queue = queue.SimpleQueue()
+        _handler = logging.handlers.QueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    else:
+        _handler = output
+    _handler.addFilter(SamplingFilter(sample_every))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_handler)
+
+    if _listener is not None:
+        _listener.start()
+    return _listener
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(stop_logging)
@@ -0,0 +1,298 @@
+"""
+HTTP response cache and compression for CIHI Mental Health Dashboard
+
+A callback response (/_dash-update-component) depends only on the callback's
+outputs, inputs and state and on the data snapshot, so identical requests get
+byte-identical responses. Responses are kept in a bounded LRU cache keyed by
+a hash of those fields and the registry's data version, and a repeat is
+answered before Dash dispatches the callback. Each callback response carries
+an ETag (a hash of its body) and Cache-Control, so a reverse proxy that
+caches POSTs by body can serve repeats and revalidate them with
+If-None-Match; a data refresh changes the version, so nothing built from the
+previous snapshot is served. Behind the in-memory cache, an optional
+persistent store (utils/result_store.py) shares responses between worker
+processes and across restarts, and identical requests arriving together
+are computed once (utils/single_flight.py).
+
+Text responses over RESPONSE_COMPRESSION_MIN_BYTES are compressed with brotli
+(optional dependency) or gzip, whichever the client prefers. Compressed
+forms of cached callback responses and of the fingerprinted (immutable)
+component bundles are kept with them, so each is compressed once.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+import flask
+from utils.config import (RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_MAX_AGE,
+                          RESPONSE_COMPRESSION_ENABLED, RESPONSE_COMPRESSION_MIN_BYTES,
+                          RESPONSE_GZIP_LEVEL, RESPONSE_BROTLI_QUALITY)
+from utils.data_registry import registry
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+CALLBACK_PATH = '_dash-update-component'
+# Request fields that determine a callback's response
+CALLBACK_KEY_FIELDS = ('output', 'outputs', 'inputs', 'state', 'changedPropIds')
+COMPRESSIBLE_TYPES = {'application/json', 'application/javascript', 'text/javascript', 'text/css',
+                      'text/html', 'text/plain', 'image/svg+xml'}
+# Preferred first
+ENCODINGS = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+def compress_body(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL, mtime=0)
+
+def callback_key(payload, version):
+    """Cache key of a callback request body, or None if it is not one"""
+    if not isinstance(payload, dict) or 'output' not in payload:
+        return None
+    fields = {name: payload.get(name) for name in CALLBACK_KEY_FIELDS}
+    digest = hashlib.sha256(json.dumps(fields, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+    return ('callback', version, digest.hexdigest())
+
+class CachedResponse:
+    """A response body with its ETag and the compressed forms made so far"""
+
+    __slots__ = ('body', 'etag', 'encoded')
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.encoded = {}
+
+    @property
+    def n_bytes(self):
+        return len(self.body) + sum(len(data) for data in self.encoded.values())
+
+class ResponseCache:
+    """Thread-safe LRU cache of response bodies bounded by bytes"""
+
+    def __init__(self, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.n_bytes
+            self._entries[key] = entry
+            self._bytes += entry.n_bytes
+            self._evict()
+
+    def encoded(self, key, entry, encoding):
+        """Return entry's body compressed with encoding, compressing it on first use"""
+        data = entry.encoded.get(encoding)
+        if data is None:
+            data = compress_body(entry.body, encoding)
+            with self._lock:
+                if encoding not in entry.encoded:
+                    entry.encoded[encoding] = data
+                    if self._entries.get(key) is entry:
+                        self._bytes += len(data)
+                        self._evict()
+        return data
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.n_bytes
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+# Shared by every request of this process
+response_cache = ResponseCache()
+
+def skip_response_cache():
+    """
+    Keep the current callback's response out of the response caches.
+
+    Callbacks call this when they answer with an error or "data not
+    available" placeholder, and chart builders when they fail, so a
+    transient failure is not served again.
+    """
+    if flask.has_request_context():
+        flask.g.response_cache_skip = True
+
+def response_cache_skipped():
+    """Whether the current request's response was marked by skip_response_cache()"""
+    return flask.has_request_context() and flask.g.get('response_cache_skip', False)
+
+def _store_key(key):
+    """Text form of a callback key for the persistent store"""
+    return f"{key[1]}:{key[2]}"
+
+def _accepted_encoding():
+    return flask.request.accept_encodings.best_match(ENCODINGS)
+
+def _not_modified(etag):
+    """Whether the request's If-None-Match names etag, in any encoding"""
+    tags = flask.request.if_none_match
+    if not tags:
+        return False
+    return tags.star_tag or any(tag.split('-')[0] == etag for tag in tags.as_set(include_weak=True))
+
+def _send_callback_response(response, key, entry, compress):
+    """Fill a callback response from its cache entry: caching headers, then a 304 or the (compressed) body"""
+    encoding = _accepted_encoding() if compress and len(entry.body) >= RESPONSE_COMPRESSION_MIN_BYTES else None
+    response.set_etag(entry.etag if encoding is None else f"{entry.etag}-{encoding}")
+    response.headers['Cache-Control'] = f"public, max-age={RESPONSE_CACHE_MAX_AGE}"
+    response.vary.add('Accept-Encoding')
+    if _not_modified(entry.etag):
+        response.status_code = 304
+        response.set_data(b'')
+        return response
+
+    if encoding is None:
+        response.set_data(entry.body)
+    else:
+        response.set_data(response_cache.encoded(key, entry, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+def _compress_response(response):
+    """Compress any other text response in place if the client accepts it"""
+    if (response.direct_passthrough or response.status_code != 200 or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return
+    encoding = _accepted_encoding()
+    if encoding is None:
+        return
+    body = response.get_data()
+    if len(body) < RESPONSE_COMPRESSION_MIN_BYTES:
+        return
+
+    if response.cache_control.max_age:
+        # Fingerprinted bundles never change under the same URL: compress each once
+        key = ('static', flask.request.path)
+        entry = response_cache.get(key)
+        if entry is None:
+            entry = CachedResponse(body)
+            response_cache.put(key, entry)
+        data = response_cache.encoded(key, entry, encoding)
+    else:
+        data = compress_body(body, encoding)
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+
+def install_response_cache(server, cache=RESPONSE_CACHE_ENABLED, compress=RESPONSE_COMPRESSION_ENABLED, store=None,
+                           flights=None):
+    """
+    Add the callback response cache and response compression to a Flask server.
+
+    store is a ResultStore consulted on in-memory misses and written with
+    every computed response; flights is a SingleFlight that makes concurrent
+    duplicates of a missed request wait for the first one, across worker
+    processes when there is a store. Both are only used when cache is on.
+    """
+    if not (cache or compress):
+        return
+    logger.info("📨 Response cache %s%s, compression %s (%s)", 'on' if cache else 'off',
+                f" (persistent: {store.path})" if cache and store is not None else '',
+                'on' if compress else 'off', ', '.join(ENCODINGS))
+
+    def lookup(key):
+        """The cached response for key, from memory or else from the store"""
+        entry = response_cache.get(key)
+        if entry is None and store is not None:
+            body = store.get(_store_key(key))
+            if body is not None:
+                entry = CachedResponse(body)
+                response_cache.put(key, entry)
+        return entry
+
+    @server.before_request
+    def serve_cached_response():
+        request = flask.request
+        if not cache or request.method != 'POST' or not request.path.endswith(CALLBACK_PATH):
+            return None
+        key = callback_key(request.get_json(silent=True), registry.version)
+        if key is None:
+            return None
+        flask.g.response_cache_key = key
+        entry = lookup(key)
+        if entry is None and flights is not None:
+            flight = flights.join(_store_key(key))
+            if flight.leader:
+                flask.g.response_flight = flight
+                # Another worker was computing the same response: it is in the store now
+                if store is not None and not flights.lock_processes(flight, key[2]):
+                    entry = lookup(key)
+            elif flights.wait(flight):
+                entry = lookup(key)
+        if entry is None:
+            return None
+        flask.g.response_cache_hit = True
+        logger.debug("⚡ Response cache hit for %s", request.get_json().get('output'))
+        return _send_callback_response(flask.Response(mimetype='application/json'), key, entry, compress)
+
+    @server.after_request
+    def cache_and_compress(response):
+        if flask.g.get('response_cache_hit'):
+            return response
+        key = flask.g.get('response_cache_key')
+        # A response computed while the data was refreshed may mix versions,
+        # and a failure placeholder may be transient: send them but don't keep them
+        if (key is not None and response.status_code == 200 and key[1] == registry.version
+                and not response_cache_skipped()):
+            entry = CachedResponse(response.get_data())
+            response_cache.put(key, entry)
+            if store is not None:
+                store.put(_store_key(key), flask.request.get_json().get('output'), key[1], entry.body)
+            return _send_callback_response(response, key, entry, compress)
+        if compress:
+            _compress_response(response)
+        return response
+
+    @server.teardown_request
+    def end_flight(exc):
+        # Runs after the response was stored, or after the request failed
+        flight = flask.g.pop('response_flight', None)
+        if flight is not None:
+            flights.finish(flight)
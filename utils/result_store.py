@@ -0,0 +1,211 @@
+"""
+Persistent callback result store for CIHI Mental Health Dashboard
+
+The in-memory response cache (utils/response_cache.py) is private to one
+process and empty after every restart, so each gunicorn worker used to warm
+up on its own. Callback responses are also written to a SQLite database on
+local disk, shared by every worker and kept across restarts: a response one
+worker computed is served by the others, and a rolling restart comes back
+warm. Keys include the data version, a hash of the source files, so a result
+is only ever served for the data it was built from, and the build
+fingerprint, a hash of the app's code and library versions, so a deploy
+never serves what the previous code rendered. Entries of other builds are
+deleted by the regular prune once nobody has read them for
+RESULT_STORE_BUILD_GRACE_SECONDS, so workers still running the previous
+build during a rolling deploy keep their entries.
+
+The database runs in WAL mode, so readers never block the single writer and
+all worker processes can read concurrently. Each process and thread uses its
+own connection. Entries expire after RESULT_STORE_TTL_SECONDS, and the least
+recently used are deleted once the stored bodies exceed RESULT_STORE_MAX_BYTES.
+The store is an optimization only: any database or file error is logged and
+treated as a miss, and a process that cannot open the database at all (an
+unwritable cache directory, say) stops using the store.
+"""
+
+import hashlib
+import importlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from utils.config import (RESULT_STORE_PATH, RESULT_STORE_TTL_SECONDS, RESULT_STORE_MAX_BYTES,
+                          RESULT_STORE_PRUNE_EVERY, RESULT_STORE_SCHEMA, RESULT_STORE_BUILD_GRACE_SECONDS)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    callback TEXT NOT NULL,
+    version TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+"""
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Code that renders callback responses, relative to APP_ROOT
+BUILD_SOURCES = ['app.py', 'components', 'utils', 'assets']
+BUILD_EXTENSIONS = ('.py', '.js')
+# Libraries whose version can change the JSON sent for the same figure
+BUILD_LIBRARIES = ['dash', 'plotly', 'pandas', 'numpy', 'orjson']
+
+def build_fingerprint(root=APP_ROOT):
+    """
+    Short hash of everything besides the data that a stored response depends
+    on: the app's Python and JavaScript sources, the library versions and
+    RESULT_STORE_SCHEMA.
+    """
+    digest = hashlib.sha256(f"schema={RESULT_STORE_SCHEMA}".encode())
+    for name in BUILD_LIBRARIES:
+        try:
+            version = importlib.import_module(name).__version__
+        except (ImportError, AttributeError):
+            version = None
+        digest.update(f"|{name}={version}".encode())
+
+    paths = []
+    for source in BUILD_SOURCES:
+        source_path = os.path.join(root, source)
+        if os.path.isfile(source_path):
+            paths.append(source_path)
+        for dir_path, dir_names, file_names in os.walk(source_path):
+            dir_names[:] = sorted(name for name in dir_names if name != '__pycache__')
+            paths.extend(os.path.join(dir_path, name) for name in sorted(file_names) if name.endswith(BUILD_EXTENSIONS))
+    for path in paths:
+        digest.update(f"|{os.path.relpath(path, root)}:".encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+# Fingerprint of the code this process is running, taken when it was loaded:
+# hashing later could pick up files a deploy replaced in the meantime
+BUILD = build_fingerprint()
+
+# Reads refresh an entry's access time at most this often, so most hits stay read-only
+TOUCH_INTERVAL_SECONDS = 60.0
+
+class ResultStore:
+    """SQLite-backed result cache shared by every process on the host"""
+
+    def __init__(self, path=RESULT_STORE_PATH, ttl=RESULT_STORE_TTL_SECONDS, max_bytes=RESULT_STORE_MAX_BYTES,
+                 prune_every=RESULT_STORE_PRUNE_EVERY, build=BUILD, build_grace=RESULT_STORE_BUILD_GRACE_SECONDS):
+        self.path = path
+        self.build = build
+        self.build_grace = build_grace
+        # Set when the database cannot be opened; every call is then a miss
+        self.disabled = False
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _connection(self):
+        """This thread's connection; a forked process opens its own"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(SCHEMA)
+            except (sqlite3.Error, OSError) as e:
+                self.disabled = True
+                logger.warning("⚠️ WARNING: Cannot open the result store at %s (%s), disabling it", self.path, e)
+                raise
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _key(self, key):
+        return f"{self.build}:{key}"
+
+    def get(self, key):
+        """Return the stored body for key, or None if it is missing or expired"""
+        if self.disabled:
+            return None
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute("SELECT body, accessed FROM results WHERE key = ? AND created > ?",
+                               (self._key(key), now - self.ttl)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if now - row[1] > TOUCH_INTERVAL_SECONDS:
+                conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, self._key(key)))
+            self.hits += 1
+            return row[0]
+        except (sqlite3.Error, OSError) as e:
+            self._failed("read", e)
+            return None
+
+    def put(self, key, callback, version, body):
+        if self.disabled:
+            return
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO results (key, callback, version, body, size, created, accessed) "
+                         "VALUES (?, ?, ?, ?, ?, ?, ?)", (self._key(key), callback, version, body, len(body), now, now))
+            self._puts += 1
+            if self._puts % self.prune_every == 1:
+                self.prune()
+        except (sqlite3.Error, OSError) as e:
+            self._failed("write", e)
+
+    def prune(self):
+        """
+        Delete expired entries and other builds' entries unread for the grace
+        period, then the least recently used beyond the byte budget
+        """
+        if self.disabled:
+            return
+        try:
+            conn = self._connection()
+            now = time.time()
+            expired = conn.execute("DELETE FROM results WHERE created <= ?", (now - self.ttl,)).rowcount
+            prefix = f"{self.build}:"
+            expired += conn.execute("DELETE FROM results WHERE substr(key, 1, ?) != ? AND accessed <= ?",
+                                    (len(prefix), prefix, now - self.build_grace)).rowcount
+            evicted = conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                " SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed DESC, key) AS total FROM results)"
+                " WHERE total > ?)", (self.max_bytes,)).rowcount
+        except (sqlite3.Error, OSError) as e:
+            self._failed("prune", e)
+            return
+        if expired or evicted:
+            logger.info("🧹 Result store: %d expired, %d evicted", expired, evicted)
+
+    def _failed(self, action, error):
+        self.errors += 1
+        logger.warning("⚠️ WARNING: Result store %s failed (%s), continuing without it", action, error)
+
+    def clear(self):
+        self._connection().execute("DELETE FROM results")
+
+    def stats(self):
+        count, size = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'entries': count,
+            'bytes': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+# Shared by every request of this process
+result_store = ResultStore()
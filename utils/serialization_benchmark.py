@@ -0,0 +1,89 @@
+"""
+Figure serialization benchmark for CIHI Mental Health Dashboard
+
+Builds one figure per chart builder from the current data, checks it once
+against Plotly's property validation (which the builders skip), and times
+what that validation would add to every build. It then compares how long the
+figure takes to encode for a response: from the Plotly figure object, as
+Dash does by default, and from the cached JSON-native copy the figure cache
+hands to Dash, with each available JSON engine. Payload sizes are reported
+raw and gzip-compressed.
+
+Usage: python -m utils.serialization_benchmark [--repeat N]
+"""
+
+import argparse
+import gzip
+import sys
+import time
+import logging
+from plotly.io.json import to_json_plotly
+from utils import chart_helpers
+from utils.chart_helpers import validate_figure
+from utils.data_registry import registry
+from utils.figure_cache import CachedFigure, orjson
+from utils.logging_config import configure_logging
+from utils.warmup import warmup_jobs
+
+logger = logging.getLogger(__name__)
+
+def _time_ms(func, repeat):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def benchmark_serialization(repeat=50):
+    """
+    Time building and encoding one figure per builder.
+
+    Returns a list of per-builder dicts with build_ms, validate_ms, one
+    encode time per (source, engine) pair, payload_bytes and gzip_bytes.
+    Raises ValueError if a builder produces an invalid figure.
+    """
+    engines = ['json'] + (['orjson'] if orjson is not None else [])
+    snapshot = registry.snapshot()
+    results = []
+    seen = set()
+    for builder_name, args, table_name in warmup_jobs(snapshot):
+        if builder_name in seen:
+            continue
+        seen.add(builder_name)
+
+        builder = getattr(chart_helpers, builder_name).uncached
+        df = snapshot.get(table_name)
+        build_ms = _time_ms(lambda: builder(*args, df), max(1, repeat // 10))
+        entry = CachedFigure(builder(*args, df))
+        validate_figure(entry.figure)
+        validate_ms = _time_ms(lambda: validate_figure(entry.figure), max(1, repeat // 10))
+
+        result = {'builder': builder_name, 'build_ms': build_ms, 'validate_ms': validate_ms,
+                  'payload_bytes': len(entry.payload), 'gzip_bytes': len(gzip.compress(entry.payload))}
+        for engine in engines:
+            result[f'figure_{engine}_ms'] = _time_ms(lambda: to_json_plotly(entry.figure, engine=engine), repeat)
+            result[f'cached_{engine}_ms'] = _time_ms(lambda: to_json_plotly(entry.plain, engine=engine), repeat)
+        results.append(result)
+    return results
+
+def log_benchmark(results):
+    """Log one line per builder, timings in milliseconds"""
+    columns = [key for key in results[0] if key.endswith('_ms')] if results else []
+    logger.info("⏱️ %-44s %s %9s %9s", 'builder', ' '.join(f"{column[:-3]:>14}" for column in columns), 'bytes', 'gzip')
+    for result in results:
+        logger.info("   %-44s %s %9d %9d", result['builder'],
+                    ' '.join(f"{result[column]:14.2f}" for column in columns),
+                    result['payload_bytes'], result['gzip_bytes'])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare figure build, validation, encode time and payload size per chart builder")
+    parser.add_argument('--repeat', type=int, default=50, help="encodes timed per measurement")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    results = benchmark_serialization(args.repeat)
+    log_benchmark(results)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Single-flight coalescing of identical callback requests for CIHI Mental Health Dashboard
+
+When a link to the dashboard goes out, hundreds of sessions open the same
+page at once and fire identical callback requests before any response has
+reached the cache. Each request for a cache key now joins a flight: the
+first becomes its leader and computes the response, and concurrent
+duplicates wait for the leader to finish and then read its response from
+the response cache instead of computing it again.
+
+Within a process, followers wait on the flight's event and never touch a
+file. Across gunicorn workers, the leader also holds a file lock named by
+the key's hash while it computes, and the leader of the same key in another
+worker waits for that lock and then reads the response from the shared
+result store; requests for other keys never wait on it. The lock is
+released when the process exits, even if it crashes. Waits are bounded by
+SINGLE_FLIGHT_TIMEOUT_SECONDS, after which a request computes on its own.
+
+Lock files of keys not requested for LOCK_FILE_MAX_AGE_SECONDS are deleted
+now and then. Deleting one just as another process opens it can at worst
+let a single duplicate computation through.
+"""
+
+import logging
+import os
+import threading
+import time
+from utils.config import SINGLE_FLIGHT_DIR, SINGLE_FLIGHT_TIMEOUT_SECONDS
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Polling interval while waiting for another process's lock
+LOCK_POLL_SECONDS = 0.01
+# Stale lock files are looked for once every this many flights led
+LOCK_PRUNE_EVERY = 1000
+LOCK_FILE_MAX_AGE_SECONDS = 3600
+
+class Flight:
+    """One in-progress computation of a key"""
+
+    __slots__ = ('key', 'leader', 'done', 'followers', 'lock_file')
+
+    def __init__(self, key, leader):
+        self.key = key
+        self.leader = leader
+        self.done = threading.Event()
+        self.followers = 0
+        self.lock_file = None
+
+class SingleFlight:
+    """Registry of in-progress computations, one per key"""
+
+    def __init__(self, lock_dir=SINGLE_FLIGHT_DIR, timeout=SINGLE_FLIGHT_TIMEOUT_SECONDS):
+        self.lock_dir = lock_dir
+        self.timeout = timeout
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.led = 0
+        self.coalesced = 0
+
+    def join(self, key):
+        """
+        Join the flight for key, starting it if there is none.
+
+        Returns a leader Flight, which must be passed to finish() once its
+        response has been stored, or a follower Flight to pass to wait().
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = Flight(key, leader=True)
+                self.led += 1
+                if self.led % LOCK_PRUNE_EVERY == 0:
+                    threading.Thread(target=self.prune_lock_files, name='flight-lock-prune', daemon=True).start()
+                return flight
+            flight.followers += 1
+            self.coalesced += 1
+        follower = Flight(key, leader=False)
+        follower.done = flight.done
+        return follower
+
+    def wait(self, flight):
+        """Wait for the leader of a follower's flight; False on timeout"""
+        finished = flight.done.wait(self.timeout)
+        if not finished:
+            logger.warning("⚠️ WARNING: Gave up waiting for the in-flight request after %.0f s", self.timeout)
+        return finished
+
+    def lock_processes(self, flight, digest):
+        """
+        Take the leader's lock for the key, whose hex hash is digest, across
+        worker processes. Only a leader calls this, so threads of one process
+        never wait on each other's file locks.
+
+        Returns False if another process held it: it has just finished the
+        same key (or the wait timed out), so the caller should look for its
+        response before computing. Without fcntl this is a no-op.
+        """
+        if fcntl is None:
+            return True
+        try:
+            os.makedirs(self.lock_dir, exist_ok=True)
+            flight.lock_file = open(os.path.join(self.lock_dir, f"flight-{digest}.lock"), 'a')
+            # The mtime tells prune_lock_files() the key is still in use
+            os.utime(flight.lock_file.fileno())
+        except OSError as e:
+            logger.warning("⚠️ WARNING: Could not open single-flight lock: %s", e)
+            return True
+
+        waited = False
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fcntl.flock(flight.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return not waited
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    return False
+                waited = True
+                time.sleep(LOCK_POLL_SECONDS)
+
+    def finish(self, flight):
+        """End a leader's flight and wake its followers"""
+        if flight.lock_file is not None:
+            flight.lock_file.close()  # releases the flock
+            flight.lock_file = None
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+        flight.done.set()
+        if flight.followers:
+            logger.debug("🛬 Served %d duplicate requests from one computation", flight.followers)
+
+    def prune_lock_files(self, max_age=LOCK_FILE_MAX_AGE_SECONDS):
+        """Delete the lock files of keys nobody has led for max_age seconds"""
+        cutoff = time.time() - max_age
+        removed = 0
+        try:
+            entries = list(os.scandir(self.lock_dir))
+        except OSError:
+            return 0
+        for entry in entries:
+            try:
+                if entry.name.startswith('flight-') and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                pass
+        if removed:
+            logger.info("🧹 Removed %d stale single-flight lock files", removed)
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._flights), 'led': self.led, 'coalesced': self.coalesced}
+
+# Shared by every request of this process
+single_flight = SingleFlight()
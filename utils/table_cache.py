@@ -0,0 +1,282 @@
+"""
+On-disk binary cache of parsed tables for CIHI Mental Health Dashboard
+
+Each cached table is a directory holding one uncompressed .npy file per column
+(categorical columns are stored as their integer codes plus a second .npy of
+categories), plus a small JSON metadata file that records the source file fingerprints it
+was built from. The metadata file is swapped in atomically, so readers either
+see the previous complete table or the new complete table.
+
+Column files are memory-mapped read-only rather than read into memory: every
+worker process maps the same page-cache pages, so adding workers does not add
+copies of the tables. Table directories are never modified once written; a
+data change writes a new directory and swaps the metadata, and processes
+still mapping the old files keep reading them until they drop the old
+snapshot. Sources are fingerprinted before they are parsed, and parsing
+and writing happen under cache_lock(), so when several
+workers notice the same change one parses it and the others map its output.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from utils.config import TABLE_CACHE_DIR, TABLE_MMAP_ENABLED
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the loader output (columns, dtypes, row order) changes
+CACHE_FORMAT_VERSION = 2
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def _hash_file(file_path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def source_fingerprints(source_paths, known=None):
+    """
+    Fingerprint source files by mtime, size and content hash.
+
+    Hashing is skipped for files whose mtime and size match a known
+    fingerprint, so validating an up-to-date cache only costs a stat per file.
+    """
+    known = {fp['path']: fp for fp in (known or []) if fp.get('exists')}
+    fingerprints = []
+    for file_path in source_paths:
+        if not os.path.exists(file_path):
+            fingerprints.append({'path': file_path, 'exists': False})
+            continue
+
+        stat = os.stat(file_path)
+        previous = known.get(file_path)
+        if previous and previous['mtime_ns'] == stat.st_mtime_ns and previous['size'] == stat.st_size:
+            sha256 = previous['sha256']
+        else:
+            sha256 = _hash_file(file_path)
+
+        fingerprints.append({
+            'path': file_path,
+            'exists': True,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': sha256
+        })
+    return fingerprints
+
+def _content_key(fingerprints):
+    """Key identifying the source contents (not their mtimes) a table was built from"""
+    digest = hashlib.sha256(f"format={CACHE_FORMAT_VERSION}".encode())
+    for fp in fingerprints:
+        digest.update(f"|{fp['path']}:{fp.get('sha256')}".encode())
+    return digest.hexdigest()[:16]
+
+def _meta_path(table_name, cache_dir):
+    return os.path.join(cache_dir, f"{table_name}.json")
+
+def _read_meta(table_name, cache_dir):
+    meta_path = _meta_path(table_name, cache_dir)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_json_atomic(file_path, payload):
+    tmp_path = f"{file_path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, file_path)
+
+def _encode_column(series):
+    """
+    Convert a column to arrays np.save can write without pickling.
+
+    Returns (values, categories); categories is None except for categorical
+    columns, whose values are the integer codes.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), np.asarray(series.cat.categories, dtype=str)
+    values = series.to_numpy()
+    if values.dtype.kind not in 'biufU':
+        values = np.asarray(values, dtype=str)
+    return values, None
+
+def _decode_column(table_dir, column, mmap=TABLE_MMAP_ENABLED):
+    """
+    Load one column; with mmap the values (or categorical codes) are a
+    read-only view of the file, which pandas wraps without copying.
+    """
+    values = np.load(os.path.join(table_dir, column['file']), mmap_mode='r' if mmap else None, allow_pickle=False)
+    if 'categories' in column:
+        categories = np.load(os.path.join(table_dir, column['categories']), allow_pickle=False)
+        values = pd.Categorical.from_codes(values, categories=categories.tolist())
+    return values
+
+_lock_state = threading.local()
+
+@contextlib.contextmanager
+def cache_lock(cache_dir=TABLE_CACHE_DIR):
+    """
+    Hold an exclusive lock on the cache directory, across processes and threads.
+
+    Yields whether the cache can be used: if the directory cannot be created
+    or locked (a read-only deploy, say), a warning is logged and the caller
+    should load without the cache. Re-entrant within a thread. Without fcntl
+    (Windows) nothing is locked and concurrent writers fall back to the atomic
+    rename in store_cached_table.
+    """
+    if getattr(_lock_state, 'depth', 0):
+        _lock_state.depth += 1
+        try:
+            yield _lock_state.usable
+        finally:
+            _lock_state.depth -= 1
+        return
+
+    lock_file = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        if fcntl is not None:
+            lock_file = open(os.path.join(cache_dir, '.lock'), 'a')
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        usable = True
+    except OSError as e:
+        logger.warning("⚠️ WARNING: Table cache unavailable (%s), loading without it", e)
+        if lock_file is not None:
+            lock_file.close()
+            lock_file = None
+        usable = False
+
+    _lock_state.depth = 1
+    _lock_state.usable = usable
+    try:
+        yield usable
+    finally:
+        _lock_state.depth = 0
+        if lock_file is not None:
+            lock_file.close()  # releases the flock
+
+def load_cached_table(table_name, source_paths, cache_dir=TABLE_CACHE_DIR):
+    """
+    Return the cached DataFrame for a table, or None if the cache is missing,
+    stale or unreadable.
+    """
+    meta = None
+    try:
+        meta = _read_meta(table_name, cache_dir)
+        if meta is None or meta.get('format') != CACHE_FORMAT_VERSION:
+            return None
+
+        fingerprints = source_fingerprints(source_paths, known=meta['sources'])
+        if _content_key(fingerprints) != meta['key']:
+            logger.info("♻️ Cache for %s is stale, re-parsing sources", table_name)
+            return None
+
+        table_dir = os.path.join(cache_dir, meta['dir'])
+        columns = {}
+        for column in meta['columns']:
+            values = _decode_column(table_dir, column)
+            if len(values) != meta['rows']:
+                raise ValueError(f"column {column['name']} has {len(values)} rows, expected {meta['rows']}")
+            columns[column['name']] = values
+        df = pd.DataFrame(columns, copy=False)
+
+        # Sources were touched but not changed: remember the new mtimes so the
+        # next start skips hashing again
+        if fingerprints != meta['sources']:
+            meta['sources'] = fingerprints
+            _write_json_atomic(_meta_path(table_name, cache_dir), meta)
+
+        return df
+
+    except Exception as e:
+        logger.warning("⚠️ WARNING: Ignoring unreadable cache for %s: %s", table_name, e)
+        _discard_cached_table(table_name, meta, cache_dir)
+        return None
+
+def _discard_cached_table(table_name, meta, cache_dir):
+    """Remove a corrupt cache entry so the next write starts from scratch"""
+    try:
+        os.remove(_meta_path(table_name, cache_dir))
+    except OSError:
+        pass
+    if meta and meta.get('dir'):
+        shutil.rmtree(os.path.join(cache_dir, meta['dir']), ignore_errors=True)
+
+def store_cached_table(table_name, source_paths, df, cache_dir=TABLE_CACHE_DIR, fingerprints=None):
+    """
+    Write a DataFrame to the cache; failures are reported but never raised.
+
+    fingerprints should be the sources' fingerprints taken before df was
+    parsed from them: if a file changed while it was being read, the entry is
+    then filed under the old contents and the next load re-parses it, instead
+    of the old rows being served for the new contents. Without them the
+    sources are fingerprinted now.
+    """
+    if df.empty:
+        return
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        if fingerprints is None:
+            fingerprints = source_fingerprints(source_paths)
+        key = _content_key(fingerprints)
+        dir_name = f"{table_name}-{key}"
+        table_dir = os.path.join(cache_dir, dir_name)
+
+        if not os.path.isdir(table_dir):
+            tmp_dir = f"{table_dir}.tmp-{os.getpid()}"
+            os.makedirs(tmp_dir, exist_ok=True)
+            for i, column in enumerate(df.columns):
+                values, categories = _encode_column(df[column])
+                np.save(os.path.join(tmp_dir, f"col{i:03d}.npy"), values, allow_pickle=False)
+                if categories is not None:
+                    np.save(os.path.join(tmp_dir, f"col{i:03d}.categories.npy"), categories, allow_pickle=False)
+            try:
+                os.rename(tmp_dir, table_dir)
+            except OSError:
+                # Another process finished writing the same table first
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        _write_json_atomic(_meta_path(table_name, cache_dir), {
+            'format': CACHE_FORMAT_VERSION,
+            'table': table_name,
+            'key': key,
+            'dir': dir_name,
+            'rows': len(df),
+            'columns': [_column_meta(i, column, df[column]) for i, column in enumerate(df.columns)],
+            'sources': fingerprints
+        })
+
+        _prune_stale_dirs(table_name, dir_name, cache_dir)
+        logger.info("💾 Cached %s (%s records)", table_name, len(df))
+
+    except Exception as e:
+        logger.warning("⚠️ WARNING: Could not write cache for %s: %s", table_name, e, exc_info=True)
+
+def _column_meta(i, column, series):
+    meta = {'name': column, 'file': f"col{i:03d}.npy"}
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        meta['categories'] = f"col{i:03d}.categories.npy"
+    return meta
+
+def _prune_stale_dirs(table_name, current_dir, cache_dir):
+    """Remove cache directories of a table that are no longer referenced"""
+    prefix = f"{table_name}-"
+    for entry in os.listdir(cache_dir):
+        if entry.startswith(prefix) and entry != current_dir and '.tmp-' not in entry:
+            shutil.rmtree(os.path.join(cache_dir, entry), ignore_errors=True)
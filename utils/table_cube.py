@@ -0,0 +1,113 @@
+"""
+Dense measure cubes for CIHI Mental Health Dashboard tables
+
+A long table with a full grid of dimensions (Table 13: year x sex x diagnosis
+x age group) is materialized once as one dense NumPy array per measure, with
+labelled axes. Fixing some axes is then plain array indexing that returns a
+view, instead of masking and pivoting the long frame on every callback.
+"""
+
+import numpy as np
+import pandas as pd
+from utils.config import TABLE13_AGE_LABELS
+from utils.table_index import get_derived
+
+class TableCube:
+    """Dense array per measure over the labelled dimension axes of a table"""
+
+    def __init__(self, axes, measures, present):
+        # axes: [(column, labels)], in array axis order
+        self.axes = [(column, list(labels)) for column, labels in axes]
+        self.measures = measures
+        # True where the long table had a row for the cell
+        self.present = present
+        self._positions = {column: {label: i for i, label in enumerate(labels)} for column, labels in self.axes}
+
+    def labels(self, column):
+        return self.axes[self._axis(column)][1]
+
+    def position(self, column, label):
+        """Position of a label along an axis, or None if it is not in the table"""
+        return self._positions[column].get(label)
+
+    def positions(self, column, labels):
+        """Positions of the labels present along an axis, in axis order"""
+        positions = self._positions[column]
+        return np.array(sorted(positions[label] for label in set(labels) if label in positions), dtype=np.intp)
+
+    def _axis(self, column):
+        return [name for name, _ in self.axes].index(column)
+
+    def _index(self, fixed):
+        return tuple(self._positions[column][fixed[column]] if column in fixed else slice(None)
+                     for column, _ in self.axes)
+
+    def view(self, measure, **fixed):
+        """
+        Return a measure with some axes fixed to a single label.
+
+        Fixing leading axes by scalar index returns a view of the cube, not a
+        copy. Raises KeyError for labels that are not in the table.
+        """
+        return self.measures[measure][self._index(fixed)]
+
+    def present_view(self, **fixed):
+        """Like view(), for the mask of cells that had a row in the table"""
+        return self.present[self._index(fixed)]
+
+def build_cube(df, axes, measures):
+    """
+    Materialize a long table as a TableCube.
+
+    axes is [(column, labels or None)]; None uses the column's values in
+    order of appearance. Measures keep their dtype when every cell of the
+    grid has a row, and become float64 with NaN for missing cells otherwise.
+    """
+    axis_labels = []
+    codes = []
+    for column, labels in axes:
+        if labels is None:
+            labels = list(pd.unique(df[column].to_numpy()))
+        else:
+            labels = list(labels)
+        column_codes = pd.Categorical(df[column], categories=labels).codes
+        axis_labels.append((column, labels))
+        codes.append(column_codes)
+
+    # Rows with a label outside the given axes are left out of the cube
+    keep = np.logical_and.reduce([column_codes >= 0 for column_codes in codes])
+    index = tuple(column_codes[keep] for column_codes in codes)
+    shape = tuple(len(labels) for _, labels in axis_labels)
+
+    present = np.zeros(shape, dtype=bool)
+    present[index] = True
+    complete = present.all()
+
+    cube_measures = {}
+    for column in measures:
+        values = df[column].to_numpy()[keep]
+        if complete:
+            cube = np.empty(shape, dtype=values.dtype)
+        else:
+            cube = np.full(shape, np.nan, dtype=np.result_type(values.dtype, np.float64))
+        cube[index] = values
+        cube_measures[column] = cube
+
+    return TableCube(axis_labels, cube_measures, present)
+
+def _build_table13_cube(table13_df):
+    return build_cube(
+        table13_df,
+        axes=[
+            ('Year', None),
+            ('Sex', None),
+            # Alphabetical, the row order the heatmap has always shown
+            ('Diagnosis', sorted(pd.unique(table13_df['Diagnosis'].to_numpy()))),
+            ('Age_Group', TABLE13_AGE_LABELS)
+        ],
+        measures=['Rate', 'CI_Lower', 'CI_Upper']
+    )
+
+def get_table13_cube(table13_df):
+    """Return the year x sex x diagnosis x age group cube of Table 13, built once per table"""
+    return get_derived(table13_df, 'table13_cube', _build_table13_cube)
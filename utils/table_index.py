@@ -0,0 +1,152 @@
+"""
+Filter indexes for CIHI Mental Health Dashboard tables
+
+Chart callbacks slice the same small set of dimension columns (Year,
+Province, Sex, Age_Group, ...) over and over. Instead of a full boolean scan
+per slice, each table gets an index that maps every dimension value, and
+every combination of values the callbacks ask for (e.g. Year x Sex), to its
+row positions. A slice then gathers only the k matching rows.
+
+Indexes are built lazily, once per column combination, and are tied to the
+DataFrame object itself. Registry snapshots never modify their tables, so an
+index stays valid for as long as its table lives and is dropped with it; a
+data refresh produces new table objects that get fresh indexes.
+"""
+
+import itertools
+import threading
+import weakref
+import numpy as np
+
+class TableIndex:
+    """Row positions of the values of a table's dimension columns"""
+
+    def __init__(self, df):
+        self._df = weakref.ref(df)
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    def _group_positions(self, columns):
+        """Map each value tuple of the columns to its (ascending) row positions"""
+        positions = self._positions.get(columns)
+        if positions is not None:
+            return positions
+
+        with self._lock:
+            positions = self._positions.get(columns)
+            if positions is None:
+                df = self._df()
+                grouped = df.groupby(list(columns), sort=False, observed=True).indices
+                # Single-column groupby keys are scalars; normalize to tuples
+                if len(columns) == 1:
+                    grouped = {(value,): rows for value, rows in grouped.items()}
+                positions = grouped
+                self._positions[columns] = positions
+        return positions
+
+    def positions(self, where):
+        """Row positions matching every column == value in where, in table order"""
+        columns = tuple(sorted(where))
+        key = tuple(where[column] for column in columns)
+        rows = self._group_positions(columns).get(key)
+        return rows if rows is not None else np.empty(0, dtype=np.intp)
+
+    def positions_in(self, column, values):
+        """Row positions whose column value is any of values, in table order"""
+        groups = self._group_positions((column,))
+        rows = [groups[(value,)] for value in dict.fromkeys(values) if (value,) in groups]
+        if not rows:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(np.concatenate(rows)) if len(rows) > 1 else rows[0]
+
+_derived = {}
+_derived_lock = threading.Lock()
+
+def get_derived(df, name, build):
+    """
+    Return a structure derived from a table (an index, a cube, ...), building
+    it with build(df) on first use.
+
+    Derived structures are keyed by the table object and forgotten when the
+    table is garbage collected, so they must only be used with tables that
+    are never modified in place, such as the registry's.
+    """
+    key = (id(df), name)
+    derived = _derived.get(key)
+    if derived is not None:
+        return derived
+
+    with _derived_lock:
+        derived = _derived.get(key)
+        if derived is None:
+            derived = build(df)
+            _derived[key] = derived
+            # Forget it when the table is garbage collected, before its id can be reused
+            weakref.finalize(df, _derived.pop, key, None)
+    return derived
+
+def get_table_index(df):
+    """Return the filter index of a table, creating it on first use"""
+    return get_derived(df, 'index', TableIndex)
+
+_local_versions = itertools.count(1)
+
+def set_data_version(df, version):
+    """
+    Record the data version of a table, e.g. a hash of its source files.
+
+    The first version recorded for a table object wins, which is safe because
+    tables are never modified in place.
+    """
+    return get_derived(df, 'data_version', lambda df: version)
+
+def data_version(df):
+    """
+    Return the data version of a table.
+
+    Registry tables carry a version derived from their source files; any
+    other table gets a process-local token that is never reused.
+    """
+    return get_derived(df, 'data_version', lambda df: f"local-{next(_local_versions)}")
+
+def _is_collection(value):
+    return isinstance(value, (list, tuple, set, frozenset))
+
+def select_rows(df, where=None, exclude=None):
+    """
+    Return the rows of df matching every filter, in table order.
+
+    where maps a column to a value (==) or a list of values (isin); exclude
+    maps a column to a value or list of values to drop (!=, ~isin). Equality
+    filters are resolved with a single index lookup; list and exclude filters
+    are then applied to the k gathered rows only.
+
+    Equivalent to df[mask] for the corresponding boolean mask.
+    """
+    where = dict(where or {})
+    exclude = dict(exclude or {})
+
+    equal = {column: value for column, value in where.items() if not _is_collection(value)}
+    any_of = {column: value for column, value in where.items() if _is_collection(value)}
+
+    if not equal and not any_of:
+        # Nothing to look up: an exclude-only filter has to look at every row anyway
+        mask = np.ones(len(df), dtype=bool)
+        for column, values in exclude.items():
+            mask &= ~df[column].isin(values if _is_collection(values) else [values]).to_numpy()
+        return df[mask]
+
+    index = get_table_index(df)
+    if equal:
+        rows = index.positions(equal)
+    else:
+        column = next(iter(any_of))
+        rows = index.positions_in(column, any_of.pop(column))
+
+    # Gather the k rows before comparing, so categorical columns are never decoded in full
+    for column, values in any_of.items():
+        rows = rows[df[column].take(rows).isin(list(values)).to_numpy()]
+    for column, values in exclude.items():
+        rows = rows[~df[column].take(rows).isin(list(values) if _is_collection(values) else [values]).to_numpy()]
+
+    return df.take(rows)
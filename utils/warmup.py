@@ -0,0 +1,194 @@
+"""
+Figure cache warm-up for CIHI Mental Health Dashboard
+
+Most chart controls have small, closed domains (a fiscal year, a sex, a
+display option). At startup every combination of them, plus the default
+figure of each page, is rendered across a worker pool and stored in the
+figure cache, so the first visitor after a deploy never pays the cold-render
+cost. Progress is reported by warmup_status() and served on /ready.
+
+Workers return serialized figures tagged with the data version of the table
+they were built from; a figure whose table changed in the meantime is
+dropped rather than cached under the new version.
+"""
+
+import json
+import os
+import threading
+import time
+import logging
+import plotly.graph_objects as go
+from utils import chart_helpers
+from utils.config import FISCAL_YEARS_DISPLAY, CLINICAL_DIAGNOSES, WARMUP_EXECUTOR, WARMUP_MAX_WORKERS
+from utils.data_loader import create_executor
+from utils.data_registry import registry, get_table
+from utils.table_index import data_version
+from utils.figure_cache import serialize_figure
+
+logger = logging.getLogger(__name__)
+
+RATE_METRIC = 'Rate per 100,000'
+DEMOGRAPHICS_DISPLAY_OPTIONS = ['Absolute Rates', 'Gender Ratio (F:M)']
+CLINICAL_SEXES = ['Female', 'Male', 'Total']
+
+# 'not-started': the app was created but start_warmup() not called (yet);
+# the server answers with a cold figure cache
+READY_STATES = ('ready', 'failed', 'disabled', 'not-started')
+
+def warmup_jobs(snapshot):
+    """
+    Enumerate the figures to pre-render as (builder name, args, table name).
+
+    The table is always the builder's last argument. Years come from the
+    tables themselves where the controls do (Clinical Patterns).
+    """
+    jobs = [
+        # Page defaults
+        ('create_provincial_trends_chart', (['Alberta'], RATE_METRIC), 'table3'),
+        ('create_mental_health_vs_other_chart', ('Canada', RATE_METRIC), 'combined'),
+        ('create_urban_rural_disparity_chart', ('Absolute Rates', False, True, False), 'table11'),
+        ('create_income_gradient_chart', (), 'table12')
+    ]
+    for year in FISCAL_YEARS_DISPLAY:
+        jobs.append(('create_provincial_contribution_pie_chart', (year, RATE_METRIC), 'table3'))
+        jobs.append(('create_income_quintile_contribution_donut', (year,), 'table12'))
+        for display_option in DEMOGRAPHICS_DISPLAY_OPTIONS:
+            jobs.append(('create_age_gender_chart', (year, display_option, False), 'table10'))
+
+    table13_df = snapshot.get('table13')
+    clinical_years = sorted(table13_df['Year'].unique(), reverse=True) if not table13_df.empty else []
+    for year in clinical_years:
+        for sex in CLINICAL_SEXES:
+            jobs.append(('create_clinical_diagnostic_heatmap', (year, sex, CLINICAL_DIAGNOSES), 'table13'))
+    return jobs
+
+def _render(builder_name, args, table_name):
+    """Render one figure; runs inside a pool worker"""
+    df = get_table(table_name)
+    figure = getattr(chart_helpers, builder_name).uncached(*args, df)
+    return data_version(df), (serialize_figure(figure) if figure is not None else None)
+
+class WarmupStatus:
+    """Progress of the warm-up, shared with the readiness endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = 'pending'
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def update(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+    def advance(self, ok=True):
+        with self._lock:
+            self.done += 1
+            if not ok:
+                self.failed += 1
+
+    @property
+    def ready(self):
+        # A failed warm-up only leaves the cache cold; the server can still serve
+        return self.state in READY_STATES
+
+    def as_dict(self):
+        with self._lock:
+            elapsed = None
+            if self.started_at is not None:
+                elapsed = round((self.finished_at or time.time()) - self.started_at, 2)
+            return {
+                'status': self.state,
+                'ready': self.state in READY_STATES,
+                'figures_done': self.done,
+                'figures_total': self.total,
+                'figures_failed': self.failed,
+                'progress': round(self.done / self.total, 3) if self.total else (1.0 if self.ready else 0.0),
+                'elapsed_seconds': elapsed
+            }
+
+_status = WarmupStatus()
+_warmup_thread = None
+
+def warmup_status():
+    """Return the shared warm-up status"""
+    return _status
+
+def warm_figure_cache(executor=WARMUP_EXECUTOR, max_workers=WARMUP_MAX_WORKERS, status=_status):
+    """
+    Load every table, then render every warm-up figure into the figure cache.
+
+    Tables are loaded and figures rendered with executor. A process pool is
+    only safe before the process starts any thread (the pre-fork preload in
+    create_app); start_warmup() uses threads. Figures that are already
+    cached (e.g. rendered by an early request) are skipped. Returns the
+    number of figures stored.
+    """
+    status.update(state='warming', started_at=time.time(), finished_at=None, done=0, failed=0)
+    registry.load_all(executor=executor)
+    snapshot = registry.snapshot()
+
+    jobs = []
+    for builder_name, args, table_name in warmup_jobs(snapshot):
+        df = snapshot.get(table_name)
+        if df.empty or getattr(chart_helpers, builder_name).is_cached(*args, df):
+            continue
+        jobs.append((builder_name, args, table_name))
+    status.update(total=len(jobs))
+    if not jobs:
+        status.update(state='ready', finished_at=time.time())
+        return 0
+
+    workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    logger.info("🔥 Warming figure cache: %s figures with %s %s workers...", len(jobs), workers, executor)
+    stored = 0
+    with create_executor(executor, workers, thread_name_prefix='figure-warmup') as pool:
+        futures = [(job, pool.submit(_render, *job)) for job in jobs]
+        for (builder_name, args, table_name), future in futures:
+            try:
+                version, payload = future.result()
+                df = snapshot.get(table_name)
+                # Drop figures built from data that has been refreshed since
+                if payload is not None and version == data_version(df):
+                    figure = go.Figure(json.loads(payload), _validate=False)
+                    getattr(chart_helpers, builder_name).prime(figure, *args, df, payload=payload)
+                    stored += 1
+                status.advance()
+            except Exception as e:
+                logger.exception("❌ ERROR warming %s%s: %s", builder_name, args, e)
+                status.advance(ok=False)
+
+    status.update(state='ready', finished_at=time.time())
+    logger.info("✅ Figure cache warm in %.1f s: %s figures stored", time.time() - status.started_at, stored)
+    return stored
+
+def start_warmup(delay=0.0):
+    """
+    Run the warm-up in a background daemon thread, after an optional delay.
+
+    The process is already serving (request, logging and watcher threads
+    are running), and forking it could leave a child holding a lock no
+    thread will release, so the warm-up runs on a thread pool.
+    """
+    global _warmup_thread
+    if _warmup_thread is not None and _warmup_thread.is_alive():
+        return _warmup_thread
+
+    def run():
+        if delay:
+            time.sleep(delay)
+        try:
+            warm_figure_cache(executor='thread')
+        except Exception as e:
+            logger.exception("❌ ERROR during figure cache warm-up: %s", e)
+            _status.update(state='failed', finished_at=time.time())
+
+    # Not ready from now on, not only once the delay has passed
+    _status.update(state='warming')
+    _warmup_thread = threading.Thread(target=run, name='figure-warmup', daemon=True)
+    _warmup_thread.start()
+    return _warmup_thread
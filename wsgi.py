@@ -0,0 +1,21 @@
+"""
+WSGI entry point for CIHI Mental Health Dashboard
+
+    gunicorn -c gunicorn.conf.py wsgi:server
+
+With preload_app (gunicorn.conf.py) this module is imported once in the
+gunicorn master: every table is loaded and the figure cache warmed there,
+and the forked workers share that memory copy-on-write. Debug mode and the
+Dash dev tools stay off.
+
+The master logs synchronously and starts no thread; each worker starts its
+logging writer and background tasks in post_fork. Under another WSGI server,
+call start_background_tasks(app) once the process serves (without it the
+data watcher never runs and, without PRELOAD_DATA, the figure cache stays
+cold, though /ready still reports ready).
+"""
+
+from app import create_app
+
+app = create_app({'DEBUG': False, 'PRELOAD_DATA': True})
+server = app.server